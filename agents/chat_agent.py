@@ -4,10 +4,16 @@ Answers contextual questions about uploaded study materials
 """
 
 from typing import List, Dict, Optional
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import HumanMessage, SystemMessage
 import os
 from dotenv import load_dotenv
+from pathlib import Path
+import sys
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from llm_gateway import get_llm_gateway
+from utils.llm_scheduler import INTERACTIVE
+from utils.tracing import get_tracer, traced
 
 load_dotenv()
 
@@ -20,15 +26,13 @@ class ChatAgent:
         
         api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("OPENAI_API_KEY")
         if api_key:
-            self.llm = ChatGoogleGenerativeAI(
-                model="gemini-2.0-flash",
-                temperature=0.2,
-                google_api_key=api_key
-            )
+            self.llm = get_llm_gateway().bind("gemini-2.0-flash", temperature=0.2, api_key=api_key, caller="chat_agent", cache=False, priority=INTERACTIVE)
         else:
             self.llm = None
     
-    def answer_question(self, question: str, n_chunks: int = 5, prioritize_source: Optional[str] = None) -> Dict:
+    @traced("chat_agent.answer_question")
+    def answer_question(self, question: str, n_chunks: int = 5, prioritize_source: Optional[str] = None,
+                        retrieved_chunks: Optional[List[Dict]] = None) -> Dict:
         """
         Answer a question using RAG from study materials
         
@@ -36,6 +40,7 @@ class ChatAgent:
             question: User's question
             n_chunks: Number of relevant chunks to retrieve
             prioritize_source: Optional filename to prioritize in search
+            retrieved_chunks: Search results already fetched for this question (skips the search)
             
         Returns:
             Dict with 'answer', 'sources', and 'chunks' keys
@@ -48,17 +53,20 @@ class ChatAgent:
             }
         
         # Retrieve relevant chunks (prioritize latest document if specified)
-        retrieved_chunks = self.vector_store.search(question, n_results=n_chunks, prioritize_source=prioritize_source)
+        if retrieved_chunks is None:
+            retrieved_chunks = self.vector_store.search(question, n_results=n_chunks, prioritize_source=prioritize_source)
         
         # Filter by relevance
-        relevant_chunks = []
-        for chunk in retrieved_chunks:
-            distance = chunk.get('distance', 1.0)
-            if distance is not None and distance < 0.8:
-                relevant_chunks.append(chunk)
-        
-        if not relevant_chunks and retrieved_chunks:
-            relevant_chunks = retrieved_chunks[:3]
+        with get_tracer().span("chat_agent.filter", retrieved=len(retrieved_chunks)) as span:
+            relevant_chunks = []
+            for chunk in retrieved_chunks:
+                distance = chunk.get('distance', 1.0)
+                if distance is not None and distance < 0.8:
+                    relevant_chunks.append(chunk)
+            
+            if not relevant_chunks and retrieved_chunks:
+                relevant_chunks = retrieved_chunks[:3]
+            span.set_attribute("relevant", len(relevant_chunks))
         
         # Format context
         if relevant_chunks:
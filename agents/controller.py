@@ -3,7 +3,10 @@ Central Controller
 Orchestrates multi-agent workflow and manages inter-agent communication
 """
 
+import os
+import logging
 from typing import List, Dict, Optional
+from functools import partial
 from .reader_agent import ReaderAgent
 from .flashcard_agent import FlashcardAgent
 from .quiz_agent import QuizAgent
@@ -14,14 +17,38 @@ from pathlib import Path
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 from vector_store import VectorStore
+from utils.dedup import NearDuplicateDetector
+from utils.chunk_table import ChunkTable
+from utils.chunking import chunk_id
+from utils.memory_snapshot import document_manifest, save_snapshot, load_snapshot
+from ingest_pipeline import IngestPipeline
+from question_bank import create_question_bank
+from query_router import create_query_router
+from alerts_manager import AlertsManager
+from rag_pipeline import RAGPipeline
+from utils.tracing import traced, current_span
+
+logger = logging.getLogger(__name__)
+
+
+def _chunk_id(chunk: Dict) -> str:
+    metadata = chunk.get('metadata', {})
+    return metadata.get('chunk_id') or chunk_id(chunk['text'], metadata.get('source', ''))
 
 
 class KnowledgeMemory:
     """Centralized knowledge memory module for sharing context between agents"""
     
-    def __init__(self):
+    def __init__(self, text_loader=None):
+        """
+        Args:
+            text_loader: Function returning chunk texts by chunk ID (e.g.
+                VectorStore.get_texts); chunk texts are kept in memory when None
+        """
         self.topics = []
-        self.chunks = []
+        self._topic_positions = {}
+        # Chunk metadata as interned columns; texts stay in the vector store
+        self.chunk_table = ChunkTable(text_loader)
         self.flashcards = []
         self.quizzes = []
         self.revision_plan = []
@@ -31,17 +58,38 @@ class KnowledgeMemory:
             'strong_topics': []
         }
     
+    @property
+    def chunks(self) -> List[Dict]:
+        """All chunks as dicts (texts are loaded on each access)"""
+        return self.chunk_table.materialize()
+    
+    @property
+    def chunk_count(self) -> int:
+        return len(self.chunk_table)
+    
     def add_topics(self, topics: List[Dict]):
-        """Add topics to memory"""
-        self.topics.extend(topics)
+        """Add topics to memory (a topic already in memory is replaced by its newer entry)"""
+        for topic in topics:
+            key = topic.get('topic', '').lower()
+            position = self._topic_positions.get(key)
+            if position is None:
+                self._topic_positions[key] = len(self.topics)
+                self.topics.append(topic)
+            else:
+                self.topics[position] = topic
     
     def add_chunks(self, chunks: List[Dict]):
-        """Add chunks to memory"""
-        self.chunks.extend(chunks)
+        """Add chunks to memory (re-added chunk IDs update their existing entry)"""
+        self.chunk_table.add(chunks, _chunk_id)
     
     def add_flashcards(self, flashcards: List[Dict]):
-        """Add flashcards to memory"""
-        self.flashcards.extend(flashcards)
+        """Add flashcards to memory (cards with a question already in memory are skipped)"""
+        known = {card['question'].strip().lower() for card in self.flashcards}
+        for card in flashcards:
+            key = card['question'].strip().lower()
+            if key not in known:
+                known.add(key)
+                self.flashcards.append(card)
     
     def add_quizzes(self, quizzes: List[Dict]):
         """Add quizzes to memory"""
@@ -60,21 +108,37 @@ class KnowledgeMemory:
                 # This would need topic info from questions
                 pass
     
+    def snapshot(self) -> Dict:
+        """Topics, chunk references and performance as JSON-serializable state"""
+        return {
+            'topics': self.topics,
+            'chunks': self.chunk_table.to_dict(),
+            'user_performance': self.user_performance
+        }
+    
+    def restore(self, state: Dict):
+        """Replace topics, chunks and performance with a snapshot() result"""
+        self.topics = []
+        self._topic_positions = {}
+        self.add_topics(state['topics'])
+        self.chunk_table = ChunkTable.from_dict(state['chunks'], self.chunk_table.text_loader)
+        self.user_performance = state['user_performance']
+    
     def get_topic_chunks(self, topic: str) -> List[Dict]:
         """Get all chunks for a specific topic"""
-        return [
-            chunk for chunk in self.chunks
-            if chunk.get('metadata', {}).get('topic', '').lower() == topic.lower()
-        ]
+        return self.chunk_table.materialize(self.chunk_table.topic_rows(topic))
+    
+    def get_chunks_by_id(self, chunk_ids: List[str]) -> List[Dict]:
+        """Get the chunks with the given IDs (unknown IDs are skipped)"""
+        return self.chunk_table.materialize(self.chunk_table.id_rows(chunk_ids))
+    
+    def get_source_chunks(self, source: str) -> List[Dict]:
+        """Get all chunks from a specific source file"""
+        return self.chunk_table.materialize(self.chunk_table.source_rows(source))
     
     def get_all_topics(self) -> List[str]:
         """Get list of all unique topics"""
-        topics = set()
-        for chunk in self.chunks:
-            topic = chunk.get('metadata', {}).get('topic', '')
-            if topic:
-                topics.add(topic)
-        return list(topics)
+        return self.chunk_table.topics()
 
 
 class AgentController:
@@ -85,48 +149,150 @@ class AgentController:
         self.reader_agent = ReaderAgent()
         self.flashcard_agent = FlashcardAgent()
         self.quiz_agent = QuizAgent()
+        # Quizzes are sampled from a pool filled in the background after ingest
+        self.question_bank = create_question_bank(partial(self.quiz_agent.generate_fresh_quiz, background=True))
+        self.quiz_agent.question_bank = self.question_bank
         self.planner_agent = PlannerAgent()
         self.chat_agent = ChatAgent(vector_store)
         
         # Initialize knowledge memory
-        self.memory = KnowledgeMemory()
+        self.memory = KnowledgeMemory(vector_store.get_texts if vector_store else None)
         
         # Vector store for semantic search
         self.vector_store = vector_store
+        
+        # Near-duplicate suppression for repeated letterheads, footers and policy text
+        self.deduplicator = NearDuplicateDetector()
+        
+        # Memory saved after each ingest and reloaded on start if the documents are unchanged
+        self.snapshot_path = os.getenv("MEMORY_SNAPSHOT_PATH", "outputs/memory_snapshot.json")
+        
+        # Chat questions go to the cheapest tier that can answer them:
+        # cache → deadline lookup → single-doc RAG → multi-doc synthesis
+        self.alerts_manager = AlertsManager()
+        multi_doc_pipeline = None
+        if vector_store is not None:
+            try:
+                multi_doc_pipeline = RAGPipeline(vector_store)
+            except ValueError as e:
+                logger.warning("Multi-document answers disabled: %s", e)
+        self.query_router = create_query_router(self.chat_agent, vector_store, self.alerts_manager, multi_doc_pipeline)
     
+    @traced("controller.process_study_materials")
     def process_study_materials(self, directory_path: str) -> Dict:
         """
         Complete workflow: Read → Extract → Structure
         
         Args:
             directory_path: Path to directory containing study materials
-            
+        
         Returns:
             Dict with processing results
         """
-        # Step 1: Reader Agent processes documents
-        result = self.reader_agent.process_directory(directory_path)
+        # Extract → chunk (near-duplicates skipped) → embed → upsert, with the
+        # stages overlapping; unchanged chunks are not re-embedded
+        pipeline = IngestPipeline(self.reader_agent, self.vector_store, self.deduplicator)
+        result = pipeline.run(directory_path)
         
-        chunks = result.get('chunks', [])
-        topics = result.get('topics', [])
+        chunks = result['chunks']
+        topics = result['topics']
         
-        # Store in memory
+        # Store in memory (the ingest result covers the whole directory, so it
+        # replaces chunks from earlier runs)
+        self.memory.chunk_table.clear()
         self.memory.add_chunks(chunks)
         self.memory.add_topics(topics)
+        self._after_ingest()
         
-        # Add to vector store if available
-        if self.vector_store:
-            self.vector_store.clear_collection()
-            self.vector_store.add_documents(chunks)
-            self.chat_agent.vector_store = self.vector_store
+        summary = {
+            'total_chunks': len(chunks),
+            'total_topics': len(topics),
+            'index_stats': result['index_stats'],
+            'duplicates_skipped': result['duplicates_skipped']
+        }
+        if self.snapshot_path and chunks:
+            try:
+                manifest = document_manifest(directory_path, self.reader_agent.supported_extensions)
+                save_snapshot(self.snapshot_path, {'memory': self.memory.snapshot(), 'summary': summary}, manifest)
+            except (OSError, TypeError, ValueError) as e:
+                logger.warning("Could not save memory snapshot: %s", e)
         
+        current_span().set_attributes(chunks=len(chunks), topics=len(topics), **result['index_stats'])
         return {
             'chunks': chunks,
             'topics': topics,
-            'total_chunks': len(chunks),
-            'total_topics': len(topics)
+            **summary,
+            'pipeline_metrics': result['metrics']
         }
     
+    def _after_ingest(self, warm_start: bool = False):
+        """
+        Refresh everything derived from the chunks in memory
+        
+        After a warm start the chunks are those of the last ingest, whose
+        deadlines are already stored, so no chunk text is loaded: the question
+        bank gets chunk ids and fetches texts only for the chunks it samples.
+        """
+        if warm_start:
+            if self.question_bank is not None:
+                self.question_bank.build_from_ids(self.memory.chunk_table.ids_by_topic(), self.memory.get_chunks_by_id)
+        else:
+            chunks = self.memory.chunks
+            if self.question_bank is not None:
+                self.question_bank.build(chunks)
+            # Dates for the router's deadline tier
+            self.alerts_manager.add_deadlines_from_documents(chunks)
+        # Cached answers may be stale now
+        self.query_router.clear_cache()
+        
+        if self.vector_store:
+            self.chat_agent.vector_store = self.vector_store
+    
+    @traced("controller.warm_start")
+    def warm_start(self, directory_path: str) -> Optional[Dict]:
+        """
+        Restore memory from the last ingest instead of re-processing
+        
+        The snapshot is used only if the documents in the directory match its
+        manifest (names, sizes, modification times) and the vector store still
+        holds the same number of chunks.
+        
+        Args:
+            directory_path: Path to directory containing study materials
+        
+        Returns:
+            Processing results like process_study_materials (without 'chunks'
+            and 'pipeline_metrics'), or None if a re-ingest is needed
+        """
+        if not self.snapshot_path:
+            return None
+        manifest = document_manifest(directory_path, self.reader_agent.supported_extensions)
+        if not manifest:
+            return None
+        state = load_snapshot(self.snapshot_path, manifest)
+        if state is None:
+            return None
+        
+        stored = len(state['memory']['chunks']['ids'])
+        if self.vector_store and self.vector_store.get_collection_count() != stored:
+            logger.info("Vector store no longer matches memory snapshot; re-ingest needed")
+            return None
+        try:
+            self.memory.restore(state['memory'])
+        except (KeyError, ValueError) as e:
+            logger.warning("Could not restore memory snapshot: %s", e)
+            return None
+        
+        self._after_ingest(warm_start=True)
+        current_span().set_attributes(chunks=stored, topics=len(self.memory.topics))
+        return {
+            'topics': self.memory.topics,
+            'chunks': [],
+            **state['summary'],
+            'warm_start': True
+        }
+    
+    @traced("controller.generate_flashcards")
     def generate_flashcards(self, num_flashcards: int = 10, topic: Optional[str] = None) -> List[Dict]:
         """
         Generate flashcards from processed materials
@@ -134,25 +300,42 @@ class AgentController:
         Args:
             num_flashcards: Number of flashcards to generate
             topic: Optional specific topic to focus on
-            
+        
         Returns:
             List of flashcards
         """
-        chunks = self.memory.chunks
-        
-        if topic:
+        embeddings = None
+        known_chunk_ids = None
+        if self.vector_store and self.vector_store.get_collection_count() > 0:
+            # Cluster the whole indexed corpus so cards cover every part of it
+            chunks, embeddings = self.vector_store.get_stored_chunks()
+            known_chunk_ids = [chunk['id'] for chunk in chunks]
+            if topic:
+                keep = [
+                    i for i, chunk in enumerate(chunks)
+                    if chunk['metadata'].get('topic', '').lower() == topic.lower()
+                ]
+                chunks, embeddings = [chunks[i] for i in keep], embeddings[keep]
+        elif topic:
+            known_chunk_ids = list(self.memory.chunk_table.ids)
             chunks = self.memory.get_topic_chunks(topic)
+        else:
+            chunks = self.memory.chunks
         
-        flashcards = self.flashcard_agent.generate_flashcards(chunks, num_flashcards)
+        # Only chunks without cards yet are sent to the LLM; saved cards for
+        # unchanged chunks are reused (and persisted by the agent)
+        flashcards = self.flashcard_agent.generate_incremental_flashcards(
+            chunks, embeddings, num_flashcards,
+            embed_fn=self.vector_store.embed_text if self.vector_store else None,
+            known_chunk_ids=known_chunk_ids
+        )
         
         # Store in memory
         self.memory.add_flashcards(flashcards)
         
-        # Save to file
-        self.flashcard_agent.save_flashcards(flashcards)
-        
         return flashcards
     
+    @traced("controller.generate_quiz")
     def generate_quiz(self, difficulty: str = "medium", num_questions: int = 5, adaptive: bool = True) -> List[Dict]:
         """
         Generate quiz from processed materials
@@ -161,7 +344,7 @@ class AgentController:
             difficulty: "easy", "medium", or "hard"
             num_questions: Number of questions
             adaptive: Whether to adapt based on user performance
-            
+        
         Returns:
             List of quiz questions
         """
@@ -185,6 +368,7 @@ class AgentController:
         
         return questions
     
+    @traced("controller.create_revision_plan")
     def create_revision_plan(self, exam_date: Optional[str] = None, study_days_per_week: int = 5) -> List[Dict]:
         """
         Create revision schedule
@@ -192,7 +376,7 @@ class AgentController:
         Args:
             exam_date: Exam date in YYYY-MM-DD format
             study_days_per_week: Number of study days per week
-            
+        
         Returns:
             List of revision plan items
         """
@@ -220,19 +404,22 @@ class AgentController:
         
         return plan
     
+    @traced("controller.answer_question")
     def answer_question(self, question: str, prioritize_source: Optional[str] = None) -> Dict:
         """
-        Answer a question using Chat Agent
+        Answer a question through the query router
         
         Args:
             question: User's question
             prioritize_source: Optional filename to prioritize in search
-            
+        
         Returns:
-            Dict with answer, sources, and chunks
+            Dict with answer, sources, chunks, and the 'tier' that answered
+            with its 'latency_ms'
         """
-        return self.chat_agent.answer_question(question, prioritize_source=prioritize_source)
+        return self.query_router.answer(question, prioritize_source=prioritize_source)
     
+    @traced("controller.evaluate_quiz")
     def evaluate_quiz(self, questions: List[Dict], user_answers: Dict[int, int]) -> Dict:
         """
         Evaluate quiz and update performance
@@ -240,7 +427,7 @@ class AgentController:
         Args:
             questions: List of quiz questions
             user_answers: Dict mapping question index to selected option index
-            
+        
         Returns:
             Evaluation results
         """
@@ -254,7 +441,7 @@ class AgentController:
     def get_statistics(self) -> Dict:
         """Get overall statistics"""
         stats = {
-            'total_chunks': len(self.memory.chunks),
+            'total_chunks': self.memory.chunk_count,
             'total_topics': len(self.memory.topics),
             'total_flashcards': len(self.memory.flashcards),
             'total_quizzes': len(self.memory.quizzes),
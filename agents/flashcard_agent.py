@@ -5,30 +5,47 @@ Automatically generates Q/A flashcards from study material
 
 import json
 import re
-from typing import List, Dict
-from langchain_google_genai import ChatGoogleGenerativeAI
+import math
+import uuid
+import contextvars
+from itertools import zip_longest
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Callable
+import numpy as np
 from langchain_core.messages import HumanMessage, SystemMessage
 import os
 from dotenv import load_dotenv
 from pathlib import Path
+import sys
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from llm_gateway import get_llm_gateway
+from utils.llm_scheduler import GENERATION
+from utils.tracing import traced, current_span
+from utils.clustering import representatives
+from utils.chunking import chunk_id
+from storage import get_storage
 
 load_dotenv()
 
 
+def _chunk_id(chunk: Dict) -> str:
+    """Content-addressed id of a chunk (stored id, metadata chunk_id, or hash of its text)"""
+    metadata = chunk.get('metadata') or {}
+    return chunk.get('id') or metadata.get('chunk_id') or chunk_id(chunk.get('text', ''), metadata.get('source', ''))
+
+
 class FlashcardAgent:
     """Generates concise Q/A flashcards for quick revision"""
     
     def __init__(self):
         api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("OPENAI_API_KEY")
         if api_key:
-            self.llm = ChatGoogleGenerativeAI(
-                model="gemini-2.0-flash",
-                temperature=0.3,
-                google_api_key=api_key
-            )
+            self.llm = get_llm_gateway().bind("gemini-2.0-flash", temperature=0.3, api_key=api_key, caller="flashcard_agent", priority=GENERATION)
         else:
             self.llm = None
     
+    @traced("flashcard_agent.generate_flashcards")
     def generate_flashcards(self, text_chunks: List[Dict], num_flashcards: int = 10) -> List[Dict]:
         """
         Generate flashcards from text chunks
@@ -36,15 +53,21 @@ class FlashcardAgent:
         Args:
             text_chunks: List of text chunks with metadata
             num_flashcards: Number of flashcards to generate
-            
+        
         Returns:
             List of flashcard dictionaries with 'question' and 'answer' keys
         """
-        if not self.llm:
+        flashcards = self._generate_from_chunks(text_chunks, num_flashcards) if self.llm else None
+        if flashcards is None:
+            # Fallback to simple generation
             return self._simple_flashcard_generation(text_chunks, num_flashcards)
-        
+        return flashcards
+    
+    def _generate_from_chunks(self, text_chunks: List[Dict], num_flashcards: int) -> Optional[List[Dict]]:
+        """Ask the LLM for flashcards from the first chunks; None if it fails"""
         # Combine chunks into context
         context_parts = []
+        source_ids = [_chunk_id(chunk) for chunk in text_chunks[:5]]
         for chunk in text_chunks[:5]:  # Use top 5 chunks
             topic = chunk.get('metadata', {}).get('topic', 'General')
             text = chunk.get('text', '')
@@ -97,14 +120,200 @@ Only return the JSON array, no additional text or explanation."""
                             'question': card['question'].strip(),
                             'answer': card['answer'].strip(),
                             'topic': card.get('topic', 'General'),
-                            'difficulty': card.get('difficulty', 'medium')
+                            'difficulty': card.get('difficulty', 'medium'),
+                            'chunk_ids': source_ids
                         })
                 return validated[:num_flashcards]
         except Exception as e:
             print(f"Error generating flashcards: {e}")
         
-        # Fallback to simple generation
-        return self._simple_flashcard_generation(text_chunks, num_flashcards)
+        return None
+    
+    @traced("flashcard_agent.generate_coverage_flashcards")
+    def generate_coverage_flashcards(
+        self,
+        chunks: List[Dict],
+        embeddings: np.ndarray,
+        num_flashcards: int = 10,
+        embed_fn: Optional[Callable[[List[str]], List[List[float]]]] = None,
+        num_clusters: Optional[int] = None,
+        chunks_per_cluster: int = 3,
+        similarity_threshold: float = 0.9
+    ) -> List[Dict]:
+        """
+        Generate flashcards covering the whole corpus
+        
+        Chunks are clustered by embedding and the chunks nearest each cluster
+        centre form one prompt. All clusters are generated concurrently, then
+        cards are interleaved across clusters and near-duplicates dropped.
+        
+        Args:
+            chunks: Chunks with 'text' and 'metadata' keys
+            embeddings: Embedding of each chunk, shape (len(chunks), dim)
+            num_flashcards: Number of flashcards to return
+            embed_fn: Embeds card texts for similarity deduplication
+                      (exact-question deduplication if omitted)
+            num_clusters: Clusters to draw from (default: one per 3 cards)
+            chunks_per_cluster: Chunks per cluster prompt
+            similarity_threshold: Cosine similarity above which cards are duplicates
+        
+        Returns:
+            List of flashcard dictionaries with 'question' and 'answer' keys
+        """
+        if not chunks:
+            return []
+        
+        clusters = representatives(embeddings, num_clusters or math.ceil(num_flashcards / 3), chunks_per_cluster)
+        groups = [[chunks[i] for i in members] for members in clusters]
+        # Oversample so duplicates can be dropped without falling short
+        per_cluster = math.ceil(num_flashcards * 1.5 / len(groups))
+        
+        results = [None] * len(groups)
+        if self.llm:
+            with ThreadPoolExecutor(max_workers=len(groups)) as pool:
+                futures = [
+                    pool.submit(contextvars.copy_context().run, self._generate_from_chunks, group, per_cluster)
+                    for group in groups
+                ]
+                results = [future.result() for future in futures]
+        results = [
+            cards if cards is not None else self._simple_flashcard_generation(group, per_cluster)
+            for cards, group in zip(results, groups)
+        ]
+        
+        # Interleave so every cluster contributes a card before any contributes a second
+        interleaved = [card for rank in zip_longest(*results) for card in rank if card]
+        return self._deduplicate(interleaved, embed_fn, similarity_threshold)[:num_flashcards]
+    
+    @traced("flashcard_agent.generate_incremental_flashcards")
+    def generate_incremental_flashcards(
+        self,
+        chunks: List[Dict],
+        embeddings: Optional[np.ndarray] = None,
+        num_flashcards: int = 10,
+        embed_fn: Optional[Callable[[List[str]], List[List[float]]]] = None,
+        known_chunk_ids: Optional[List[str]] = None
+    ) -> List[Dict]:
+        """
+        Generate flashcards only for chunks that have not had cards generated yet
+        
+        Every card records the chunk_ids it was generated from and the card set
+        (generation pass) it belongs to. Every chunk in scope for a pass is
+        persisted as generated by that set, even if clustering prompted only a
+        few representatives, so an unchanged corpus is answered from saved cards
+        without an LLM call. Cards for changed or removed chunks are dropped,
+        which reopens the other chunks of their set. New chunks get fresh cards,
+        and the set is topped up from the least-covered chunks only when too few
+        cards remain.
+        
+        Args:
+            chunks: Chunks in scope (e.g. one topic), with 'id' or metadata 'chunk_id'
+            embeddings: Embeddings of chunks for coverage clustering (None: first chunks only)
+            num_flashcards: Number of flashcards to return
+            embed_fn: Embeds card texts for near-duplicate removal
+            known_chunk_ids: Ids of every chunk still indexed (default: those in chunks)
+        
+        Returns:
+            Cards from new chunks first, then reused cards, up to num_flashcards
+        """
+        if not chunks:
+            return []
+        
+        ids = [_chunk_id(chunk) for chunk in chunks]
+        scope = set(ids)
+        known = set(known_chunk_ids) if known_chunk_ids is not None else scope
+        
+        # Cards without provenance or built from chunks that changed cannot be trusted
+        storage = get_storage()
+        saved, stale = [], []
+        for card in storage.get_flashcards():
+            valid = card.get('chunk_ids') and set(card['chunk_ids']) <= known
+            (saved if valid else stale).append(card)
+        previously_generated = storage.get_flashcard_chunks()
+        # A set that lost cards to changed chunks no longer covers its other chunks
+        reopened = {card.get('card_set') for card in stale} - {None}
+        generated = {
+            cid for cid, card_set in previously_generated.items()
+            if cid in known and card_set not in reopened
+        }
+        reused = [card for card in saved if set(card['chunk_ids']) <= scope]
+        
+        recorded = {}
+        new_cards = []
+        new_indices = [i for i, cid in enumerate(ids) if cid not in generated]
+        if new_indices:
+            share = math.ceil(num_flashcards * len(new_indices) / len(ids))
+            new_cards = self._new_card_set(
+                chunks, embeddings, new_indices, max(share, num_flashcards - len(reused)), ids, recorded
+            )
+        
+        extra = []
+        if len(reused) + len(new_cards) < num_flashcards:
+            # Top up from chunks no kept card came from, so prompts (and cache keys) differ
+            covered = {cid for card in reused + new_cards for cid in card['chunk_ids']}
+            uncovered = [i for i, cid in enumerate(ids) if cid not in covered] or list(range(len(ids)))
+            extra = self._new_card_set(
+                chunks, embeddings, uncovered, num_flashcards - len(reused) - len(new_cards), ids, recorded
+            )
+        
+        reused_ids = {id(card) for card in reused}
+        fresh = [
+            card for card in self._deduplicate(reused + new_cards + extra, embed_fn, 0.9)
+            if id(card) not in reused_ids
+        ]
+        current_span().set_attributes(reused=len(reused), new_chunks=len(new_indices), generated=len(fresh))
+        
+        # Only changed rows are written
+        storage.remove_flashcards(stale)
+        storage.add_flashcards(fresh)
+        storage.update_flashcard_chunks(
+            {cid: card_set for cid, card_set in recorded.items() if cid not in generated},
+            set(previously_generated) - known
+        )
+        return (fresh + reused)[:num_flashcards]
+    
+    def _new_card_set(self, chunks: List[Dict], embeddings: Optional[np.ndarray], indices: List[int],
+                      num_flashcards: int, ids: List[str], recorded: Dict[str, str]) -> List[Dict]:
+        """Generate one card set from the chunks at indices and record those chunks as covered by it"""
+        cards = self._generate_for(chunks, embeddings, indices, num_flashcards)
+        if not cards:
+            return []  # nothing was generated, so the chunks stay new
+        card_set = uuid.uuid4().hex[:12]
+        for card in cards:
+            card['card_set'] = card_set
+        for i in indices:
+            recorded.setdefault(ids[i], card_set)
+        return cards
+    
+    def _generate_for(self, chunks: List[Dict], embeddings: Optional[np.ndarray], indices: List[int],
+                      num_flashcards: int) -> List[Dict]:
+        """Generate cards from the chunks at indices (clustered when embeddings are given)"""
+        subset = [chunks[i] for i in indices]
+        if embeddings is not None and len(embeddings) == len(chunks):
+            return self.generate_coverage_flashcards(subset, embeddings[indices], num_flashcards)
+        return self.generate_flashcards(subset, num_flashcards)
+    
+    def _deduplicate(self, flashcards: List[Dict], embed_fn: Optional[Callable], threshold: float) -> List[Dict]:
+        """Drop cards whose question is a near-duplicate of an earlier card"""
+        if not flashcards:
+            return []
+        if embed_fn is None:
+            seen = set()
+            unique = []
+            for card in flashcards:
+                key = card['question'].strip().lower()
+                if key not in seen:
+                    seen.add(key)
+                    unique.append(card)
+            return unique
+        
+        vectors = np.asarray(embed_fn([card['question'] for card in flashcards]), dtype=np.float32)
+        vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        kept = []
+        for i in range(len(flashcards)):
+            if not kept or float(np.max(vectors[kept] @ vectors[i])) < threshold:
+                kept.append(i)
+        return [flashcards[i] for i in kept]
     
     def _simple_flashcard_generation(self, text_chunks: List[Dict], num_flashcards: int) -> List[Dict]:
         """Simple fallback flashcard generation"""
@@ -124,26 +333,21 @@ Only return the JSON array, no additional text or explanation."""
                     'question': question,
                     'answer': answer,
                     'topic': topic,
-                    'difficulty': 'medium'
+                    'difficulty': 'medium',
+                    'chunk_ids': [_chunk_id(chunk)]
                 })
         
         return flashcards
     
-    def save_flashcards(self, flashcards: List[Dict], file_path: str = "outputs/flashcards.json"):
-        """Save flashcards to JSON file"""
-        output_dir = Path(file_path).parent
-        output_dir.mkdir(parents=True, exist_ok=True)
-        
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(flashcards, f, indent=2, ensure_ascii=False)
+    def save_flashcards(self, flashcards: List[Dict]):
+        """Save flashcards for the current user (cards with the same question are replaced)"""
+        get_storage().add_flashcards(flashcards)
     
-    def load_flashcards(self, file_path: str = "outputs/flashcards.json") -> List[Dict]:
-        """Load flashcards from JSON file"""
-        if Path(file_path).exists():
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return []
+    def load_flashcards(self) -> List[Dict]:
+        """Load the current user's flashcards"""
+        return get_storage().get_flashcards()
     
+    @traced("flashcard_agent.generate_topic_flashcards")
     def generate_topic_flashcards(self, topic: str, chunks: List[Dict], num_flashcards: int = 5) -> List[Dict]:
         """Generate flashcards for a specific topic"""
         # Filter chunks by topic
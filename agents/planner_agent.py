@@ -3,19 +3,56 @@ Planner Agent
 Creates adaptive revision schedules based on topics and performance
 """
 
-import json
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 from pathlib import Path
+import sys
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from utils.tracing import traced
+from utils.cohort_planner import CohortPlans, plan_cohort
+from storage import get_storage
 
 
 class PlannerAgent:
     """Builds smart revision schedules based on topic weightage and progress"""
     
+    # Share of the remaining study days a topic gets, by progress status (default 1)
+    TOPIC_WEIGHTS = {'difficult': 2.0, 'completed': 0.5}
+    
     def __init__(self):
         self.revision_plan = []
         self.progress = {}
     
+    @property
+    def revision_plan(self) -> List[Dict]:
+        return self._plan
+    
+    @revision_plan.setter
+    def revision_plan(self, plan: List[Dict]):
+        """Replace the plan and rebuild its date/topic indexes"""
+        self._plan = plan
+        # Positions sorted by date, with a parallel list of dates for bisecting
+        order = sorted(range(len(plan)), key=lambda i: plan[i]['date'])
+        self._dates = [plan[i]['date'] for i in order]
+        self._date_order = order
+        self._by_key = {(item['date'], item['topic']): i for i, item in enumerate(plan)}
+        # topic -> sorted (date, position) pairs
+        self._by_topic = {}
+        self._topics = {}
+        for i in order:
+            item = plan[i]
+            self._by_topic.setdefault(item['topic'], []).append((item['date'], i))
+            # Subtopics/key points move with the topic when days are rebalanced
+            self._topics.setdefault(item['topic'], {
+                'subtopics': item.get('subtopics', []),
+                'key_points': item.get('key_points', [])
+            })
+        self._status_counts = Counter(item['status'] for item in plan)
+    
+    @traced("planner_agent.create_revision_plan")
     def create_revision_plan(
         self,
         topics: List[Dict],
@@ -86,6 +123,30 @@ class PlannerAgent:
         self.revision_plan = plan
         return plan
     
+    @traced("planner_agent.create_cohort_plans")
+    def create_cohort_plans(
+        self,
+        topics: List[Dict],
+        exam_dates: List[Optional[str]],
+        study_days_per_week=5,
+        weak_topics: Optional[List[List[str]]] = None,
+        start_dates=None
+    ) -> CohortPlans:
+        """
+        Create revision schedules for a whole cohort at once
+        
+        Args:
+            topics: List of topics with metadata
+            exam_dates: Exam date per student (YYYY-MM-DD, or None for 30 days out)
+            study_days_per_week: Study days per week, for everyone or per student
+            weak_topics: Per-student weak topic names (scheduled twice as often)
+            start_dates: Start date, for everyone or per student (default: today)
+        
+        Returns:
+            Columnar CohortPlans; plan_for(i) gives student i's plan items
+        """
+        return plan_cohort(topics, exam_dates, study_days_per_week, weak_topics, start_dates)
+    
     def _prioritize_topics(self, topics: List[Dict]) -> List[Dict]:
         """Prioritize topics based on various factors"""
         # Simple prioritization: sort by number of key points (more points = more important)
@@ -141,31 +202,93 @@ class PlannerAgent:
         today = datetime.now().date()
         end_date = today + timedelta(days=days_ahead)
         
-        upcoming = []
-        for item in self.revision_plan:
-            try:
-                item_date = datetime.strptime(item['date'], '%Y-%m-%d').date()
-                if today <= item_date <= end_date:
-                    upcoming.append(item)
-            except Exception:
-                continue
-        
-        return sorted(upcoming, key=lambda x: x['date'])
+        # ISO dates sort as strings, so the window is two bisects on the date index
+        start = bisect_left(self._dates, today.isoformat())
+        end = bisect_right(self._dates, end_date.isoformat())
+        return [self._plan[i] for i in self._date_order[start:end]]
+    
+    def get_topic_revisions(self, topic: str) -> List[Dict]:
+        """Get a topic's revision items in date order"""
+        return [self._plan[i] for _, i in self._by_topic.get(topic, [])]
     
     def mark_completed(self, date: str, topic: str):
-        """Mark a revision item as completed"""
-        for item in self.revision_plan:
-            if item['date'] == date and item['topic'] == topic:
-                item['status'] = 'completed'
-                self.update_progress(topic, 'completed')
-                break
+        """Mark a revision item as completed and rebalance the remaining days"""
+        position = self._by_key.get((date, topic))
+        if position is None:
+            return
+        item = self._plan[position]
+        self._set_status(item, 'completed')
+        self.update_progress(topic, 'completed')
+        changed = self._rebalance()
+        changed[position] = item
+        # Persist just the touched items and this topic's progress
+        get_storage().update_plan_items(changed, {topic: self.progress[topic]})
+    
+    def mark_difficult(self, topic: str):
+        """Mark a topic as difficult so it gets more of the remaining days"""
+        self.update_progress(topic, 'difficult')
+        changed = self._rebalance()
+        get_storage().update_plan_items(changed, {topic: self.progress[topic]})
+    
+    def _set_status(self, item: Dict, status: str):
+        self._status_counts[item['status']] -= 1
+        self._status_counts[status] += 1
+        item['status'] = status
+    
+    def _rebalance(self) -> Dict[int, Dict]:
+        """
+        Redistribute topics over pending items after today by progress weight
+        
+        Past days, today and completed items are left alone. Uses smooth
+        weighted round-robin so heavier topics are spread out rather than
+        bunched together.
+        
+        Returns:
+            Changed items by plan position
+        """
+        tomorrow = (datetime.now().date() + timedelta(days=1)).isoformat()
+        start = bisect_left(self._dates, tomorrow)
+        slots = [i for i in self._date_order[start:] if self._plan[i]['status'] == 'pending']
+        if not slots or not self._topics:
+            return {}
+        
+        weights = {
+            topic: self.TOPIC_WEIGHTS.get(self.progress.get(topic, {}).get('status'), 1.0)
+            for topic in self._topics
+        }
+        total = sum(weights.values())
+        current = dict.fromkeys(weights, 0.0)
+        changed = {}
+        for i in slots:
+            for topic, weight in weights.items():
+                current[topic] += weight
+            topic = max(current, key=current.get)
+            current[topic] -= total
+            
+            item = self._plan[i]
+            if item['topic'] == topic:
+                continue
+            self._move(i, item, topic)
+            changed[i] = item
+        return changed
+    
+    def _move(self, position: int, item: Dict, topic: str):
+        """Reassign a plan item to another topic, keeping the indexes in sync"""
+        old = item['topic']
+        del self._by_key[(item['date'], old)]
+        entries = self._by_topic[old]
+        del entries[bisect_left(entries, (item['date'], position))]
+        
+        item.update(topic=topic, **self._topics[topic])
+        self._by_key[(item['date'], topic)] = position
+        insort(self._by_topic.setdefault(topic, []), (item['date'], position))
     
     def get_statistics(self) -> Dict:
         """Get revision statistics"""
         total = len(self.revision_plan)
-        completed = sum(1 for item in self.revision_plan if item['status'] == 'completed')
-        pending = sum(1 for item in self.revision_plan if item['status'] == 'pending')
-        in_progress = sum(1 for item in self.revision_plan if item['status'] == 'in_progress')
+        completed = self._status_counts['completed']
+        pending = self._status_counts['pending']
+        in_progress = self._status_counts['in_progress']
         
         completion_rate = (completed / total * 100) if total > 0 else 0
         
@@ -177,28 +300,11 @@ class PlannerAgent:
             'completion_rate': round(completion_rate, 2)
         }
     
-    def save_plan(self, file_path: str = "outputs/planner.json"):
-        """Save revision plan to JSON file"""
-        output_dir = Path(file_path).parent
-        output_dir.mkdir(parents=True, exist_ok=True)
-        
-        data = {
-            'revision_plan': self.revision_plan,
-            'progress': self.progress,
-            'last_updated': datetime.now().isoformat()
-        }
-        
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-    
-    def load_plan(self, file_path: str = "outputs/planner.json"):
-        """Load revision plan from JSON file"""
-        if Path(file_path).exists():
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                self.revision_plan = data.get('revision_plan', [])
-                self.progress = data.get('progress', {})
-        else:
-            self.revision_plan = []
-            self.progress = {}
+    def save_plan(self):
+        """Save the current user's revision plan and progress"""
+        get_storage().save_plan(self.revision_plan, self.progress)
+    
+    def load_plan(self):
+        """Load the current user's revision plan and progress"""
+        self.revision_plan, self.progress = get_storage().get_plan()
 
@@ -6,11 +6,17 @@ Generates adaptive quizzes with multiple difficulty levels
 import json
 import re
 from typing import List, Dict, Optional
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import HumanMessage, SystemMessage
 import os
 from dotenv import load_dotenv
 from pathlib import Path
+import sys
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from llm_gateway import get_llm_gateway
+from utils.llm_scheduler import GENERATION, BACKGROUND
+from utils.tracing import traced
+from storage import get_storage
 
 load_dotenv()
 
@@ -21,27 +27,59 @@ class QuizAgent:
     def __init__(self):
         api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("OPENAI_API_KEY")
         if api_key:
-            self.llm = ChatGoogleGenerativeAI(
-                model="gemini-2.0-flash",
-                temperature=0.4,
-                google_api_key=api_key
-            )
+            self.llm = get_llm_gateway().bind("gemini-2.0-flash", temperature=0.4, api_key=api_key, caller="quiz_agent", priority=GENERATION)
+            # Question bank refills yield to interactive and on-demand requests
+            self.background_llm = get_llm_gateway().bind("gemini-2.0-flash", temperature=0.4, api_key=api_key, caller="question_bank", priority=BACKGROUND)
         else:
             self.llm = None
+            self.background_llm = None
+        
+        # Pre-generated question pool (set by the controller); None generates every quiz on demand
+        self.question_bank = None
     
-    def generate_quiz(self, text_chunks: List[Dict], difficulty: str = "medium", num_questions: int = 5) -> List[Dict]:
+    @traced("quiz_agent.generate_quiz")
+    def generate_quiz(self, text_chunks: List[Dict], difficulty: str = "medium", num_questions: int = 5,
+                      topics: Optional[List[str]] = None) -> List[Dict]:
         """
         Generate quiz questions from text chunks
         
+        Questions come from the question bank when one is set; only a shortfall
+        (e.g. while the bank is still being built) is generated on demand.
+        
         Args:
             text_chunks: List of text chunks with metadata
             difficulty: "easy", "medium", or "hard"
             num_questions: Number of questions to generate
+            topics: Topics to prefer when sampling from the question bank
             
         Returns:
             List of quiz question dictionaries
         """
-        if not self.llm:
+        if self.question_bank is None:
+            return self.generate_fresh_quiz(text_chunks, difficulty, num_questions)
+        
+        questions = self.question_bank.sample(difficulty, num_questions, topics)
+        if len(questions) < num_questions:
+            questions += self.generate_fresh_quiz(text_chunks, difficulty, num_questions - len(questions))
+        return questions
+    
+    @traced("quiz_agent.generate_fresh_quiz")
+    def generate_fresh_quiz(self, text_chunks: List[Dict], difficulty: str = "medium", num_questions: int = 5,
+                            background: bool = False) -> List[Dict]:
+        """
+        Generate new quiz questions from text chunks with the LLM
+        
+        Args:
+            text_chunks: List of text chunks with metadata
+            difficulty: "easy", "medium", or "hard"
+            num_questions: Number of questions to generate
+            background: Run at background priority (question bank refills)
+        
+        Returns:
+            List of quiz question dictionaries
+        """
+        llm = self.background_llm if background else self.llm
+        if not llm:
             return self._simple_quiz_generation(text_chunks, difficulty, num_questions)
         
         # Combine chunks into context
@@ -95,7 +133,7 @@ Only return the JSON array, no additional text."""
                 HumanMessage(content=prompt)
             ]
             
-            response = self.llm.invoke(messages)
+            response = llm.invoke(messages)
             result = response.content.strip()
             
             # Extract JSON from response
@@ -161,6 +199,7 @@ Only return the JSON array, no additional text."""
         
         return questions
     
+    @traced("quiz_agent.generate_adaptive_quiz")
     def generate_adaptive_quiz(self, text_chunks: List[Dict], user_performance: Optional[Dict] = None) -> List[Dict]:
         """
         Generate adaptive quiz based on user performance
@@ -188,16 +227,19 @@ Only return the JSON array, no additional text."""
             difficulty = "easy"
         
         # Prioritize weak topics if specified
+        topics = None
         if weak_topics:
             topic_chunks = [
                 chunk for chunk in text_chunks
                 if chunk.get('metadata', {}).get('topic', '').lower() in [t.lower() for t in weak_topics]
             ]
             if topic_chunks:
+                topics = sorted({chunk['metadata']['topic'] for chunk in topic_chunks})
                 text_chunks = topic_chunks + text_chunks[:3]  # Add some general chunks
         
-        return self.generate_quiz(text_chunks, difficulty, 5)
+        return self.generate_quiz(text_chunks, difficulty, 5, topics=topics)
     
+    @traced("quiz_agent.evaluate_quiz")
     def evaluate_quiz(self, questions: List[Dict], user_answers: Dict[int, int]) -> Dict:
         """
         Evaluate quiz answers and return performance metrics
@@ -240,18 +282,11 @@ Only return the JSON array, no additional text."""
             'details': details
         }
     
-    def save_quiz(self, questions: List[Dict], file_path: str = "outputs/quizzes.json"):
-        """Save quiz to JSON file"""
-        output_dir = Path(file_path).parent
-        output_dir.mkdir(parents=True, exist_ok=True)
-        
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(questions, f, indent=2, ensure_ascii=False)
+    def save_quiz(self, questions: List[Dict]):
+        """Save the current user's latest quiz"""
+        get_storage().save_quiz(questions)
     
-    def load_quiz(self, file_path: str = "outputs/quizzes.json") -> List[Dict]:
-        """Load quiz from JSON file"""
-        if Path(file_path).exists():
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return []
+    def load_quiz(self) -> List[Dict]:
+        """Load the current user's latest quiz"""
+        return get_storage().get_quiz()
 
@@ -8,10 +8,16 @@ from typing import List, Dict, Optional
 from pathlib import Path
 import PyPDF2
 from docx import Document
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import HumanMessage, SystemMessage
 import os
 from dotenv import load_dotenv
+import sys
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from utils.chunking import split_content_defined, chunk_id
+from llm_gateway import get_llm_gateway
+from utils.llm_scheduler import BACKGROUND
+from utils.tracing import traced
 
 load_dotenv()
 
@@ -19,18 +25,19 @@ load_dotenv()
 class ReaderAgent:
     """Extracts text, segments into topics, and structures study material"""
     
-    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
+    supported_extensions = ['.pdf', '.docx', '.doc', '.txt']
+    
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200, chunking_mode: Optional[str] = None):
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        # 'content' (content-defined boundaries) or 'fixed' (word windows).
+        # Can be overridden by CHUNKING_MODE env var.
+        self.chunking_mode = (chunking_mode or os.getenv("CHUNKING_MODE", "content")).lower()
         
         # Initialize LLM for topic classification
         api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("OPENAI_API_KEY")
         if api_key:
-            self.llm = ChatGoogleGenerativeAI(
-                model="gemini-2.0-flash",
-                temperature=0.1,
-                google_api_key=api_key
-            )
+            self.llm = get_llm_gateway().bind("gemini-2.0-flash", temperature=0.1, api_key=api_key, caller="reader_agent", priority=BACKGROUND)
         else:
             self.llm = None
     
@@ -76,6 +83,7 @@ class ReaderAgent:
         text = text.strip()
         return text
     
+    @traced("reader_agent.classify_topics")
     def classify_topics(self, text: str) -> List[Dict]:
         """Classify text into topics and subtopics using LLM"""
         if not self.llm:
@@ -156,7 +164,8 @@ Only return valid JSON, no additional text."""
         
         return topics
     
-    def split_into_chunks(self, text: str, metadata: Dict = None) -> List[Dict]:
+    @traced("reader_agent.split_into_chunks")
+    def split_into_chunks(self, text: str, metadata: Dict = None, topics: Optional[List[Dict]] = None) -> List[Dict]:
         """Split text into overlapping chunks with topic information"""
         chunks = []
         words = text.split()
@@ -164,8 +173,12 @@ Only return valid JSON, no additional text."""
         if not words:
             return chunks
         
-        # Classify topics first
-        topics = self.classify_topics(text)
+        # Classify topics first (unless the caller already did)
+        if topics is None:
+            topics = self.classify_topics(text)
+        
+        if self.chunking_mode == "content":
+            return self._split_content_defined(text, metadata, topics)
         
         current_chunk = []
         current_length = 0
@@ -183,16 +196,7 @@ Only return valid JSON, no additional text."""
                     # Find relevant topic for this chunk
                     topic_info = self._find_topic_for_chunk(chunk_index * self.chunk_size, topics)
                     
-                    chunk_data = {
-                        'text': chunk_text,
-                        'metadata': {
-                            **(metadata or {}),
-                            'chunk_index': chunk_index,
-                            'topic': topic_info.get('topic', 'General'),
-                            'subtopic': topic_info.get('subtopic', ''),
-                        }
-                    }
-                    chunks.append(chunk_data)
+                    chunks.append(self._make_chunk(chunk_text, metadata, chunk_index, topic_info))
                     chunk_index += 1
                 
                 # Start new chunk with overlap
@@ -209,19 +213,34 @@ Only return valid JSON, no additional text."""
             chunk_text = self.clean_text(chunk_text)
             if chunk_text:
                 topic_info = self._find_topic_for_chunk(chunk_index * self.chunk_size, topics)
-                chunk_data = {
-                    'text': chunk_text,
-                    'metadata': {
-                        **(metadata or {}),
-                        'chunk_index': chunk_index,
-                        'topic': topic_info.get('topic', 'General'),
-                        'subtopic': topic_info.get('subtopic', ''),
-                    }
-                }
-                chunks.append(chunk_data)
+                chunks.append(self._make_chunk(chunk_text, metadata, chunk_index, topic_info))
         
         return chunks
     
+    def _split_content_defined(self, text: str, metadata: Optional[Dict], topics: List[Dict]) -> List[Dict]:
+        """Split text on content-defined boundaries so unchanged chunks keep their IDs"""
+        chunks = []
+        for start, chunk_text in split_content_defined(text, self.chunk_size, overlap=self.chunk_overlap):
+            chunk_text = self.clean_text(chunk_text)
+            if chunk_text:
+                topic_info = self._find_topic_for_chunk(start, topics)
+                chunks.append(self._make_chunk(chunk_text, metadata, len(chunks), topic_info))
+        return chunks
+    
+    def _make_chunk(self, chunk_text: str, metadata: Optional[Dict], chunk_index: int, topic_info: Dict) -> Dict:
+        """Build a chunk dict with a content-addressed chunk_id"""
+        metadata = metadata or {}
+        return {
+            'text': chunk_text,
+            'metadata': {
+                **metadata,
+                'chunk_id': chunk_id(chunk_text, metadata.get('source', '')),
+                'chunk_index': chunk_index,
+                'topic': topic_info.get('topic', 'General'),
+                'subtopic': topic_info.get('subtopic', ''),
+            }
+        }
+    
     def _find_topic_for_chunk(self, position: int, topics: List[Dict]) -> Dict:
         """Find the most relevant topic for a chunk based on position"""
         if not topics:
@@ -242,22 +261,23 @@ Only return valid JSON, no additional text."""
             'subtopic': closest_topic.get('subtopics', [None])[0] if closest_topic.get('subtopics') else ''
         }
     
-    def process_document(self, file_path: str) -> Dict:
-        """Process a single document and return structured data"""
-        file_path = Path(file_path)
-        file_name = file_path.name
-        file_ext = file_path.suffix.lower()
-        
-        # Extract text based on file type
+    @traced("reader_agent.extract_text")
+    def extract_text(self, file_path: str) -> str:
+        """Extract raw text from a supported file (empty string if unsupported)"""
+        file_ext = Path(file_path).suffix.lower()
         if file_ext == '.pdf':
-            text = self.extract_text_from_pdf(str(file_path))
+            return self.extract_text_from_pdf(str(file_path))
         elif file_ext in ['.docx', '.doc']:
-            text = self.extract_text_from_docx(str(file_path))
+            return self.extract_text_from_docx(str(file_path))
         elif file_ext == '.txt':
-            text = self.extract_text_from_txt(str(file_path))
-        else:
-            print(f"Unsupported file type: {file_ext}")
-            return {'chunks': [], 'topics': [], 'metadata': {}}
+            return self.extract_text_from_txt(str(file_path))
+        print(f"Unsupported file type: {file_ext}")
+        return ""
+    
+    @traced("reader_agent.structure_text")
+    def structure_text(self, text: str, file_path: str) -> Dict:
+        """Clean, classify and chunk the extracted text of one document"""
+        file_path = Path(file_path)
         
         if not text:
             return {'chunks': [], 'topics': [], 'metadata': {}}
@@ -270,13 +290,13 @@ Only return valid JSON, no additional text."""
         
         # Create metadata
         metadata = {
-            'source': file_name,
+            'source': file_path.name,
             'file_path': str(file_path),
-            'file_type': file_ext
+            'file_type': file_path.suffix.lower()
         }
         
         # Split into chunks
-        chunks = self.split_into_chunks(text, metadata)
+        chunks = self.split_into_chunks(text, metadata, topics)
         
         # Add chunk index to metadata
         for i, chunk in enumerate(chunks):
@@ -289,6 +309,10 @@ Only return valid JSON, no additional text."""
             'metadata': metadata
         }
     
+    def process_document(self, file_path: str) -> Dict:
+        """Process a single document and return structured data"""
+        return self.structure_text(self.extract_text(file_path), file_path)
+    
     def process_directory(self, directory_path: str) -> Dict:
         """Process all supported documents in a directory"""
         all_chunks = []
@@ -299,10 +323,8 @@ Only return valid JSON, no additional text."""
             print(f"Directory not found: {directory_path}")
             return {'chunks': [], 'topics': []}
         
-        supported_extensions = ['.pdf', '.docx', '.doc', '.txt']
-        
         for file_path in directory.iterdir():
-            if file_path.is_file() and file_path.suffix.lower() in supported_extensions:
+            if file_path.is_file() and file_path.suffix.lower() in self.supported_extensions:
                 print(f"Processing: {file_path.name}")
                 try:
                     result = self.process_document(str(file_path))
@@ -4,158 +4,190 @@ Handles personalized alerts and reminders based on academic calendar
 """
 
 import re
+import calendar
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
-from pathlib import Path
-import json
+from storage import Storage, get_storage
+from utils.deadline_index import DeadlineIndex, DeadlineFilter
+
+
+# Named date formats; each alternative of _DATE_PATTERN captures its date as
+# group <kind> with parts <kind>_a, <kind>_b and <kind>_c
+_MONTH_DATE = r'(?P<{0}>(?P<{0}_a>[a-z]+)\s+(?P<{0}_b>\d{{1,2}}){1},?\s+(?P<{0}_c>\d{{4}}))'
+_ORDINAL = '(?:st|nd|rd|th)?'
+# "YYYY-MM-DD" (tried before the numeric form so "2025-01-15" is not read as "25-01-15")
+_ISO_DATE = r'(?P<iso>(?P<iso_a>\d{4})-(?P<iso_b>\d{2})-(?P<iso_c>\d{2}))'
+# "DD/MM/YYYY" or "MM/DD/YYYY"
+_NUMERIC_DATE = r'(?P<numeric>(?P<numeric_a>\d{1,2})(?P<numeric_sep>[/-])(?P<numeric_b>\d{1,2})(?P=numeric_sep)(?P<numeric_c>\d{2,4}))'
+_DATE_PATTERN = re.compile(
+    # Cheap first-character test so the alternatives are only tried where one could start
+    r'(?=[bcdflorstu\d])(?:' + '|'.join([
+        # "Deadline: January 15, 2025"
+        r'(?:deadline|due date|last date|closing date|registration|submission)[\s:]+' + _MONTH_DATE.format('keyword', ''),
+        # "By December 31, 2024"
+        r'(?:by|before|until|till)\s+' + _MONTH_DATE.format('bound', ''),
+        # "On March 1st, 2025"
+        r'(?:on|starting|from)\s+' + _MONTH_DATE.format('start', _ORDINAL),
+        _ISO_DATE,
+        _NUMERIC_DATE,
+    ]) + ')',
+    re.IGNORECASE
+)
+# A bare date in any supported format
+_BARE_DATE_PATTERN = re.compile('|'.join([_MONTH_DATE.format('start', _ORDINAL), _ISO_DATE, _NUMERIC_DATE]), re.IGNORECASE)
+
+_MONTHS = {}
+for _number, (_full, _abbr) in enumerate(zip(calendar.month_name[1:], calendar.month_abbr[1:]), 1):
+    _MONTHS[_full.lower()] = _MONTHS[_abbr.lower()] = _number
+
+_SENTENCE_SPLIT = re.compile(r'[.!?]\s+')
+
+_EVENT_KEYWORDS = [
+    'registration', 'fee payment', 'course drop', 'add course',
+    'exam', 'assignment', 'project', 'thesis', 'scholarship',
+    'application', 'admission', 'enrollment', 'deadline',
+    'submission', 'due date'
+]
+
+
+def _make_date(year: int, month: int, day: int) -> Optional[datetime]:
+    try:
+        return datetime(year, month, day)
+    except ValueError:
+        return None
+
+
+def _month_date_parser(kind: str):
+    def parse(match) -> Optional[datetime]:
+        month = _MONTHS.get(match.group(kind + '_a').lower())
+        if month is None:
+            return None
+        return _make_date(int(match.group(kind + '_c')), month, int(match.group(kind + '_b')))
+    return parse
+
+
+def _parse_iso(match) -> Optional[datetime]:
+    return _make_date(int(match.group('iso_a')), int(match.group('iso_b')), int(match.group('iso_c')))
+
+
+def _parse_numeric(match) -> Optional[datetime]:
+    """Day first, then month first; years must have four digits"""
+    year = match.group('numeric_c')
+    if len(year) != 4:
+        return None
+    first, second = int(match.group('numeric_a')), int(match.group('numeric_b'))
+    return _make_date(int(year), second, first) or _make_date(int(year), first, second)
+
+
+_DATE_PARSERS = {
+    'keyword': _month_date_parser('keyword'),
+    'bound': _month_date_parser('bound'),
+    'start': _month_date_parser('start'),
+    'iso': _parse_iso,
+    'numeric': _parse_numeric,
+}
+
+
+def _join_chunks(texts: List[str], max_overlap: int = 2000) -> str:
+    """Concatenate consecutive chunks, dropping text repeated from the previous chunk"""
+    parts = []
+    previous = ''
+    for text in texts:
+        # Longest prefix of text that is a suffix of the previous chunk
+        tail = previous[-max_overlap:]
+        overlap = 0
+        probe = text[:8]
+        position = tail.find(probe) if probe else -1
+        while position != -1:
+            if text.startswith(tail[position:]):
+                overlap = len(tail) - position
+                break
+            position = tail.find(probe, position + 1)
+        parts.append(text[overlap:] if overlap else (' ' + text if parts else text))
+        previous = text
+    return ''.join(parts)
 
 
 class AlertsManager:
     """Manages personalized alerts and reminders"""
     
-    def __init__(self, alerts_file: str = "alerts.json"):
+    def __init__(self, storage: Optional[Storage] = None):
         """
         Initialize Alerts Manager
         
         Args:
-            alerts_file: Path to JSON file storing alerts
+            storage: Where deadlines and alert preferences are kept (default: shared storage)
         """
-        self.alerts_file = Path(alerts_file)
-        self.alerts = self._load_alerts()
-    
-    def _load_alerts(self) -> Dict:
-        """Load alerts from JSON file"""
-        if self.alerts_file.exists():
-            try:
-                with open(self.alerts_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception:
-                return {"users": {}, "deadlines": []}
-        return {"users": {}, "deadlines": []}
-    
-    def _save_alerts(self):
-        """Save alerts to JSON file"""
-        try:
-            with open(self.alerts_file, 'w', encoding='utf-8') as f:
-                json.dump(self.alerts, f, indent=2, default=str)
-        except Exception as e:
-            print(f"Error saving alerts: {e}")
+        self.storage = storage or get_storage()
+        self._index = None
+        self._index_version = None
     
     def extract_deadlines_from_text(self, text: str, source: str = "Unknown") -> List[Dict]:
         """
         Extract deadlines and important dates from document text
         
+        One pass of a combined, precompiled pattern finds every date; the
+        alternative that matched selects its parser, so no format guessing.
+        
         Args:
             text: Document text to parse
             source: Source document name
-            
+        
         Returns:
             List of deadline dictionaries
         """
         deadlines = []
+        seen = set()
         
-        # Patterns to match dates and deadlines
-        date_patterns = [
-            # "Deadline: January 15, 2025"
-            r'(?:deadline|due date|last date|closing date|registration|submission)[\s:]+([A-Z][a-z]+\s+\d{1,2},?\s+\d{4})',
-            # "By December 31, 2024"
-            r'(?:by|before|until|till)[\s]+([A-Z][a-z]+\s+\d{1,2},?\s+\d{4})',
-            # "On March 1st, 2025"
-            r'(?:on|starting|from)[\s]+([A-Z][a-z]+\s+\d{1,2}(?:st|nd|rd|th)?,?\s+\d{4})',
-            # "DD/MM/YYYY" or "MM/DD/YYYY"
-            r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-            # "YYYY-MM-DD"
-            r'(\d{4}-\d{2}-\d{2})',
-        ]
-        
-        # Context keywords
-        context_keywords = [
-            'registration', 'fee payment', 'course drop', 'add course',
-            'exam', 'assignment', 'project submission', 'thesis',
-            'scholarship', 'application', 'admission', 'enrollment'
-        ]
-        
-        for pattern in date_patterns:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
-            for match in matches:
-                date_str = match.group(1) if match.groups() else match.group(0)
-                
-                # Try to parse the date
-                parsed_date = self._parse_date(date_str)
-                if parsed_date:
-                    # Get context around the match
-                    start = max(0, match.start() - 100)
-                    end = min(len(text), match.end() + 100)
-                    context = text[start:end]
-                    
-                    # Extract event description
-                    event = self._extract_event_description(context, date_str)
-                    
-                    deadline = {
-                        'date': parsed_date.isoformat(),
-                        'event': event,
-                        'source': source,
-                        'context': context.strip()
-                    }
-                    
-                    # Avoid duplicates
-                    if not any(d.get('date') == deadline['date'] and 
-                              d.get('event') == deadline['event'] 
-                              for d in deadlines):
-                        deadlines.append(deadline)
+        for match in _DATE_PATTERN.finditer(text):
+            kind = match.lastgroup
+            parsed_date = _DATE_PARSERS[kind](match)
+            if parsed_date is None:
+                continue
+            
+            # Get context around the match
+            start = max(0, match.start() - 100)
+            end = min(len(text), match.end() + 100)
+            context = text[start:end]
+            
+            # Extract event description
+            event = self._extract_event_description(context, match.group(kind))
+            
+            # Avoid duplicates
+            key = (parsed_date, event)
+            if key in seen:
+                continue
+            seen.add(key)
+            
+            deadlines.append({
+                'date': parsed_date.isoformat(),
+                'event': event,
+                'source': source,
+                'context': context.strip()
+            })
         
         return deadlines
     
     def _parse_date(self, date_str: str) -> Optional[datetime]:
-        """Parse various date formats"""
-        date_str = date_str.strip()
-        
-        # Try different date formats
-        formats = [
-            '%B %d, %Y',      # January 15, 2025
-            '%B %d %Y',       # January 15 2025
-            '%b %d, %Y',       # Jan 15, 2025
-            '%b %d %Y',       # Jan 15 2025
-            '%d/%m/%Y',       # 15/01/2025
-            '%m/%d/%Y',       # 01/15/2025
-            '%Y-%m-%d',       # 2025-01-15
-            '%d-%m-%Y',       # 15-01-2025
-            '%m-%d-%Y',       # 01-15-2025
-        ]
-        
-        # Remove ordinal suffixes
-        date_str = re.sub(r'(\d+)(st|nd|rd|th)', r'\1', date_str)
-        
-        for fmt in formats:
-            try:
-                return datetime.strptime(date_str, fmt)
-            except ValueError:
-                continue
-        
-        return None
+        """Parse a date in any of the supported formats"""
+        match = _BARE_DATE_PATTERN.fullmatch(date_str.strip())
+        return _DATE_PARSERS[match.lastgroup](match) if match else None
     
     def _extract_event_description(self, context: str, date_str: str) -> str:
         """Extract event description from context"""
-        # Look for keywords before the date
-        keywords = [
-            'registration', 'fee payment', 'course drop', 'add course',
-            'exam', 'assignment', 'project', 'thesis', 'scholarship',
-            'application', 'admission', 'enrollment', 'deadline',
-            'submission', 'due date'
+        # Sentences or phrases containing the date, searched for keywords in priority order
+        sentences = [
+            (sentence, sentence.lower()) for sentence in _SENTENCE_SPLIT.split(context)
+            if date_str in sentence
         ]
-        
-        context_lower = context.lower()
-        for keyword in keywords:
-            if keyword in context_lower:
-                # Get sentence or phrase containing the keyword
-                sentences = re.split(r'[.!?]\s+', context)
-                for sentence in sentences:
-                    if keyword in sentence.lower() and date_str in sentence:
-                        # Clean up the sentence
-                        event = sentence.strip()
-                        if len(event) > 150:
-                            event = event[:150] + "..."
-                        return event
+        for keyword in _EVENT_KEYWORDS:
+            for sentence, sentence_lower in sentences:
+                if keyword in sentence_lower:
+                    # Clean up the sentence
+                    event = sentence.strip()
+                    if len(event) > 150:
+                        event = event[:150] + "..."
+                    return event
         
         # Default: return a short context snippet
         return context[:100].strip() + "..." if len(context) > 100 else context.strip()
@@ -164,27 +196,27 @@ class AlertsManager:
         """
         Extract and add deadlines from processed documents
         
+        Chunks are stitched back into one text per source (dropping the overlap
+        between consecutive chunks) so every date is scanned exactly once.
+        
         Args:
             documents: List of document chunks with metadata
         """
+        texts_by_source = {}
+        for doc in documents:
+            metadata = doc.get('metadata', {})
+            texts_by_source.setdefault(metadata.get('source', 'Unknown'), []).append(
+                (metadata.get('chunk_index', 0), doc.get('text', ''))
+            )
+        
         all_deadlines = []
+        for source, indexed_texts in texts_by_source.items():
+            indexed_texts.sort(key=lambda item: item[0])
+            text = _join_chunks([chunk_text for _, chunk_text in indexed_texts])
+            all_deadlines.extend(self.extract_deadlines_from_text(text, source))
         
-        for doc in documents:
-            text = doc.get('text', '')
-            source = doc.get('metadata', {}).get('source', 'Unknown')
-            
-            deadlines = self.extract_deadlines_from_text(text, source)
-            all_deadlines.extend(deadlines)
-        
-        # Merge with existing deadlines
-        existing_dates = {d.get('date'): d for d in self.alerts.get('deadlines', [])}
-        for deadline in all_deadlines:
-            key = deadline['date']
-            if key not in existing_dates:
-                existing_dates[key] = deadline
-        
-        self.alerts['deadlines'] = list(existing_dates.values())
-        self._save_alerts()
+        # Merge with existing deadlines (a date already stored keeps its entry)
+        self.storage.add_deadlines(all_deadlines)
     
     def get_upcoming_deadlines(self, days_ahead: int = 30, user_id: str = "default") -> List[Dict]:
         """
@@ -193,55 +225,52 @@ class AlertsManager:
         Args:
             days_ahead: Number of days to look ahead
             user_id: User identifier
-            
+        
         Returns:
             List of upcoming deadline dictionaries
         """
         today = datetime.now().date()
         end_date = today + timedelta(days=days_ahead)
         
-        upcoming = []
-        for deadline in self.alerts.get('deadlines', []):
-            try:
-                deadline_date = datetime.fromisoformat(deadline['date']).date()
-                if today <= deadline_date <= end_date:
-                    # Check if user has opted in for this type of alert
-                    user_prefs = self.alerts.get('users', {}).get(user_id, {})
-                    if user_prefs.get('enabled', True):  # Default to enabled
-                        days_until = (deadline_date - today).days
-                        deadline_copy = deadline.copy()
-                        deadline_copy['days_until'] = days_until
-                        upcoming.append(deadline_copy)
-            except Exception:
-                continue
+        # Check if user has opted in for alerts
+        if not self.is_user_opted_in(user_id):
+            return []
         
-        # Sort by date
-        upcoming.sort(key=lambda x: x.get('date', ''))
-        return upcoming
+        # Bisect into the date index, keeping only deadlines the user subscribed to
+        subscriptions = self.storage.get_alert_subscriptions(user_id)
+        deadline_filter = DeadlineFilter(subscriptions['source'], subscriptions['keyword'])
+        return self.get_deadline_index().window(today, end_date, None if deadline_filter.everything else deadline_filter)
+    
+    def get_deadline_index(self) -> DeadlineIndex:
+        """Date index of stored deadlines, rebuilt only after deadlines change (in any session)"""
+        version = self.storage.get_deadlines_version()
+        if self._index is None or version != self._index_version:
+            self._index = DeadlineIndex(self.storage.get_deadlines())
+            self._index_version = version
+        return self._index
+    
+    def subscribe_user(self, user_id: str, sources: Optional[List[str]] = None, keywords: Optional[List[str]] = None):
+        """
+        Limit a user's alerts to deadlines from given sources or mentioning given keywords
+        
+        Calling with neither restores alerts for every deadline.
+        """
+        self.storage.set_alert_subscriptions(sources or [], keywords or [], user_id)
     
     def opt_in_user(self, user_id: str, enabled: bool = True):
         """Opt in/out a user for alerts"""
-        if 'users' not in self.alerts:
-            self.alerts['users'] = {}
-        
-        if user_id not in self.alerts['users']:
-            self.alerts['users'][user_id] = {}
-        
-        self.alerts['users'][user_id]['enabled'] = enabled
-        self.alerts['users'][user_id]['updated'] = datetime.now().isoformat()
-        self._save_alerts()
+        self.storage.set_alert_preference(enabled, user_id)
     
     def is_user_opted_in(self, user_id: str = "default") -> bool:
         """Check if user has opted in for alerts"""
-        user_prefs = self.alerts.get('users', {}).get(user_id, {})
-        return user_prefs.get('enabled', True)  # Default to enabled
+        user_prefs = self.storage.get_alert_preference(user_id)
+        return user_prefs['enabled'] if user_prefs else True  # Default to enabled
     
     def get_all_deadlines(self) -> List[Dict]:
         """Get all stored deadlines"""
-        return self.alerts.get('deadlines', [])
+        return self.storage.get_deadlines()
     
     def clear_deadlines(self):
         """Clear all deadlines"""
-        self.alerts['deadlines'] = []
-        self._save_alerts()
+        self.storage.clear_deadlines()
 
@@ -7,11 +7,15 @@ import streamlit as st
 import os
 import logging
 import traceback
+import uuid
 from pathlib import Path
 from dotenv import load_dotenv
 from vector_store import VectorStore
 from agents.controller import AgentController
 from utils import ensure_documents_directory, get_document_files
+from utils.metrics import get_metrics
+from utils.llm_scheduler import set_current_user
+from storage import set_data_user
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -90,22 +94,24 @@ load_api_key()
 
 # Initialize session state
 if 'session_initialized' not in st.session_state:
-    # Clear documents on new session/refresh
     st.session_state.session_initialized = True
-    docs_dir = ensure_documents_directory()
-    doc_files = get_document_files()
-    for doc_path in doc_files:
+    # Documents and the index are kept across sessions (and warm-loaded in
+    # initialize_components) unless RESET_ON_NEW_SESSION is set
+    if os.getenv("RESET_ON_NEW_SESSION", "0").lower() in ("1", "true", "yes"):
+        docs_dir = ensure_documents_directory()
+        doc_files = get_document_files()
+        for doc_path in doc_files:
+            try:
+                Path(doc_path).unlink()
+            except Exception:
+                pass
+        # Clear vector store (only if it can be initialized)
         try:
-            Path(doc_path).unlink()
-        except Exception:
+            temp_vs = VectorStore()
+            temp_vs.clear_collection()
+        except Exception as e:
+            logger.warning(f"Could not clear vector store on session init: {e}")
             pass
-    # Clear vector store (only if it can be initialized)
-    try:
-        temp_vs = VectorStore()
-        temp_vs.clear_collection()
-    except Exception as e:
-        logger.warning(f"Could not clear vector store on session init: {e}")
-        pass
     st.session_state.documents_processed = False
     st.session_state.uploaded_files_shared = None
     st.session_state.latest_document = None
@@ -139,6 +145,14 @@ if 'num_flashcards' not in st.session_state:
     st.session_state.num_flashcards = 10
 if 'num_questions' not in st.session_state:
     st.session_state.num_questions = 10
+if 'user_id' not in st.session_state:
+    st.session_state.user_id = uuid.uuid4().hex
+
+# LLM calls made during this run are queued fairly per browser session
+set_current_user(st.session_state.user_id)
+# Saved flashcards, quizzes and plans belong to a stable user, not the session
+# (STORAGE_USER; unset keeps one shared single-tenant profile)
+set_data_user(os.getenv("STORAGE_USER"))
 
 # Load CSS (simplified version - can be expanded)
 st.markdown("""
@@ -210,6 +224,13 @@ def initialize_components():
             logger.exception("AgentController init failed: %s", e)
             st.error(f"⚠️ Failed to initialize AI agents: {e}")
             st.stop()
+        
+        # Reuse the last ingest if the documents on disk are unchanged
+        if not st.session_state.documents_processed:
+            result = st.session_state.agent_controller.warm_start(str(ensure_documents_directory()))
+            if result:
+                st.session_state.documents_processed = True
+                st.session_state.processing_results = result
 
 def process_documents():
     """Process all documents using Reader Agent"""
@@ -239,6 +260,8 @@ def process_documents():
         st.session_state.documents_processed = True
         latest_info = f" (Latest: {st.session_state.latest_document})" if st.session_state.latest_document else ""
         st.success(f"✅ Processed {result['total_chunks']} chunks from {result['total_topics']} topics!{latest_info}")
+        if result.get('duplicates_skipped'):
+            st.info(f"♻️ Skipped {result['duplicates_skipped']} near-duplicate chunks (repeated headers, footers, policy text)")
         
         # Store processing results for display
         st.session_state.processing_results = result
@@ -981,10 +1004,7 @@ def show_home_page():
                             st.markdown(f"  ✓ {point}")
                     else:
                         # If no key points from LLM, show sample chunks from this topic
-                        topic_chunks = [
-                            chunk for chunk in result.get('chunks', [])
-                            if chunk.get('metadata', {}).get('topic', '') == topic_name
-                        ]
+                        topic_chunks = st.session_state.agent_controller.memory.get_topic_chunks(topic_name)
                         if topic_chunks:
                             st.markdown("**Sample Content:**")
                             for chunk in topic_chunks[:2]:  # Show first 2 chunks
@@ -1252,6 +1272,9 @@ def show_planner_page():
                             item['date'], item['topic']
                         )
                         st.rerun()
+                    if st.button("Mark Difficult", key=f"difficult_{item['date']}_{item['topic']}"):
+                        st.session_state.agent_controller.planner_agent.mark_difficult(item['topic'])
+                        st.rerun()
         else:
             st.info("Click 'Create Revision Plan' to generate your schedule!")
     except Exception as e:
@@ -1396,6 +1419,7 @@ def show_analytics_page():
     
     if not st.session_state.agent_controller:
         st.info("Process documents to see analytics!")
+        show_system_performance()
         return
     
     stats = st.session_state.agent_controller.get_statistics()
@@ -1428,6 +1452,55 @@ def show_analytics_page():
             st.metric("In Progress", rev_stats['in_progress'])
         with col4:
             st.metric("Completion Rate", f"{rev_stats['completion_rate']:.1f}%")
+    
+    show_system_performance()
+
+def show_system_performance():
+    """Operational metrics: ingest rate, query latency, cache hit rates, LLM health, index size"""
+    import pandas as pd
+    
+    metrics = get_metrics()
+    snapshot = metrics.snapshot()
+    
+    def value(name, field='value'):
+        return snapshot.get(name, {}).get(field, 0)
+    
+    def hit_rate(hits, misses):
+        total = value(hits) + value(misses)
+        return f"{value(hits) / total * 100:.0f}%" if total else "–"
+    
+    with st.expander("⚙️ System performance", expanded=False):
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Ingest rate", f"{value('ingest.chunks_per_sec'):.1f} chunks/s")
+            st.metric("Index size", f"{value('index.size'):.0f} chunks")
+        with col2:
+            st.metric("Query p50", f"{value('search.latency_ms', 'p50'):.0f} ms")
+            st.metric("Query p95 / p99", f"{value('search.latency_ms', 'p95'):.0f} / {value('search.latency_ms', 'p99'):.0f} ms")
+            # Chat questions answered from the router's cache or deadline tiers (no LLM call)
+            routed = sum(value(f"router.{tier}") for tier in ("cache", "deadline", "single_doc", "multi_doc"))
+            cheap = value("router.cache") + value("router.deadline")
+            st.metric("Chat answered without LLM", f"{cheap / routed * 100:.0f}%" if routed else "–")
+        with col3:
+            st.metric("Embedding cache hits", hit_rate('embedding.cache_hits', 'embedding.cache_misses'))
+            st.metric("LLM cache hits", hit_rate('llm.cache_hits', 'llm.cache_misses'))
+        with col4:
+            st.metric("LLM calls", f"{value('llm.calls'):.0f}")
+            st.metric("LLM errors / retries", f"{value('llm.errors'):.0f} / {value('llm.retries'):.0f}")
+            st.metric("LLM queue wait p95", f"{value('llm.queue_wait_ms', 'p95'):.0f} ms")
+        
+        # Persisted history; a rerun only adds a sample once METRICS_FLUSH_SECONDS have passed
+        metrics.maybe_flush()
+        series = {
+            'Index size': metrics.history('index.size'),
+            'Query p95 (ms)': metrics.history('search.latency_ms', 'p95')
+        }
+        for label, points in series.items():
+            if len(points) > 1:
+                st.caption(label)
+                frame = pd.DataFrame(points, columns=['time', label])
+                frame['time'] = pd.to_datetime(frame['time'], unit='s')
+                st.line_chart(frame.set_index('time'))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,72 @@
+"""
+API Embedding Client Benchmark
+Measures APiEmbeddingsWrapper throughput and failure handling against the local mock server
+
+Usage:
+    python benchmarks/api_embeddings.py [--texts 5000] [--latency 0.05] [--rate-limit-rate 0.1] [--error-rate 0.05]
+
+Exits with status 1 if embeddings come back out of order, or if failures were
+injected but the client never retried.
+"""
+
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+from mock_embedding_server import MockEmbeddingServer, mock_embedding
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--texts", type=int, default=5000)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.1)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rps", type=float, default=20.0)
+    args = parser.parse_args()
+    
+    texts = [f"chunk {i}: " + "policy text " * (i % 50) for i in range(args.texts)]
+    
+    with MockEmbeddingServer(
+        latency=args.latency,
+        rate_limit_rate=args.rate_limit_rate,
+        error_rate=args.error_rate
+    ) as server:
+        os.environ.update({
+            "EMB_PROVIDER": "openai",
+            "OPENAI_API_KEY": "mock-key",
+            "OPENAI_BASE_URL": server.url,
+            "EMB_BATCH_SIZE": str(args.batch_size),
+            "EMB_MAX_CONCURRENCY": str(args.concurrency),
+            "EMB_REQUESTS_PER_SECOND": str(args.rps)
+        })
+        from utils.embeddings_api import APiEmbeddingsWrapper
+        wrapper = APiEmbeddingsWrapper()
+        
+        start = time.perf_counter()
+        embeddings = wrapper.embed(texts)
+        elapsed = time.perf_counter() - start
+        wrapper.close()
+    
+    print(f"Embedded {len(embeddings)} texts in {elapsed:.2f}s ({len(embeddings) / elapsed:.0f} texts/s)")
+    print(f"Server: {server.stats}")
+    print(f"Client: {wrapper.async_client.stats}")
+    
+    expected = [mock_embedding(text, server.dim) for text in texts]
+    if embeddings != expected:
+        print("FAIL: embeddings out of order or missing")
+        sys.exit(1)
+    if (server.stats['rate_limited'] or server.stats['errors']) and not wrapper.async_client.stats['retries']:
+        print("FAIL: injected failures were not retried")
+        sys.exit(1)
+    print("OK: all embeddings returned in order")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Cohort Planner Benchmark
+Measures batch revision planning throughput against one PlannerAgent.create_revision_plan call per student
+
+Usage:
+    python benchmarks/cohort_planner.py [--students 10000] [--topics 12] [--sample 500]
+
+Exits with status 1 if a batch plan differs from the per-student plan.
+"""
+
+import sys
+import time
+import argparse
+from datetime import date, datetime, timedelta
+from pathlib import Path
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from agents.planner_agent import PlannerAgent
+from utils.cohort_planner import plan_cohort
+
+
+def make_cohort(students: int, topic_count: int, seed: int = 0):
+    """Synthetic topics and students with their own exam dates, study days and weak topics"""
+    rng = np.random.RandomState(seed)
+    topics = [
+        {'topic': f'Topic {i}', 'subtopics': [], 'key_points': ['point'] * rng.randint(1, 10)}
+        for i in range(topic_count)
+    ]
+    start = date(2025, 1, 6)
+    exam_dates = [(start + timedelta(days=int(days))).isoformat() for days in rng.randint(7, 180, students)]
+    study_days = rng.randint(3, 8, students)
+    weak_topics = [
+        [topics[i]['topic'] for i in rng.choice(topic_count, rng.randint(0, 3), replace=False)]
+        for _ in range(students)
+    ]
+    return topics, start, exam_dates, study_days, weak_topics
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=10000)
+    parser.add_argument("--topics", type=int, default=12)
+    parser.add_argument("--sample", type=int, default=500, help="Students planned one at a time for comparison")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    
+    topics, start, exam_dates, study_days, weak_topics = make_cohort(args.students, args.topics)
+    
+    best = float('inf')
+    for _ in range(args.repeats):
+        began = time.perf_counter()
+        plans = plan_cohort(topics, exam_dates, study_days, weak_topics, start)
+        best = min(best, time.perf_counter() - began)
+    print(f"Batch:   {len(plans)} plans ({plans.total_items} items, {plans.nbytes / 1e6:.1f} MB) "
+          f"in {best * 1000:.0f} ms ({len(plans) / best:,.0f} plans/s)")
+    
+    # The per-student planner has no weak-topic input, so compare plans without them
+    sample = min(args.sample, args.students)
+    reference = plan_cohort(topics, exam_dates[:sample], study_days[:sample], None, start)
+    planner = PlannerAgent()
+    start_datetime = datetime(start.year, start.month, start.day)
+    began = time.perf_counter()
+    expected = [
+        planner.create_revision_plan(
+            topics, start_datetime, datetime.strptime(exam_dates[i], '%Y-%m-%d'), int(study_days[i])
+        )
+        for i in range(sample)
+    ]
+    elapsed = time.perf_counter() - began
+    rate = sample / elapsed
+    print(f"Looped:  {sample} plans in {elapsed * 1000:.0f} ms ({rate:,.0f} plans/s)")
+    print(f"Speedup: {len(plans) / best / rate:.1f}x")
+    
+    mismatches = [i for i in range(sample) if reference.plan_for(i) != expected[i]]
+    if mismatches:
+        print(f"FAIL: {len(mismatches)} plans differ from create_revision_plan (first: student {mismatches[0]})")
+        sys.exit(1)
+    print("OK: batch plans match create_revision_plan")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Deadline Extraction Benchmark
+Compares AlertsManager's single-pass extractor with the previous five-pass version on a synthetic academic calendar
+
+Usage:
+    python benchmarks/deadline_extraction.py [--events 5000] [--chunk-size 1000]
+
+The calendar mixes "Month D, YYYY", ordinal, DD/MM/YYYY and ISO dates and is
+split into overlapping chunks as during ingest. Exits with status 1 if the two
+extractors find different dates (ignoring the old version's misreads of ISO
+dates as two-digit years).
+"""
+
+import re
+import sys
+import time
+import random
+import argparse
+import tempfile
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from alerts_manager import AlertsManager
+from storage import Storage
+from utils.chunking import split_content_defined
+
+TEMPLATES = [
+    "{course} registration deadline: {long}.",
+    "Fee payment must be completed by {long} to avoid a late fee.",
+    "The {course} exam will be held on {ordinal} in the main hall.",
+    "Course drop requests are accepted until {long}.",
+    "Project submission for {course} closes {dmy}.",
+    "Scholarship application window opens {iso} for all programs.",
+    "Thesis draft due date: {long}. Late drafts are not reviewed.",
+    "Orientation for new students starting {ordinal}.",
+]
+
+
+def ordinal(day: int) -> str:
+    return f"{day}{'th' if 11 <= day <= 13 else {1: 'st', 2: 'nd', 3: 'rd'}.get(day % 10, 'th')}"
+
+
+def make_calendar(events: int, seed: int = 0) -> str:
+    """Synthetic academic calendar with one dated event per sentence"""
+    rng = random.Random(seed)
+    start = date(2025, 1, 1)
+    sentences = []
+    for i in range(events):
+        day = start + timedelta(days=rng.randrange(730))
+        sentences.append(rng.choice(TEMPLATES).format(
+            course=f"CS{100 + i % 400}",
+            long=day.strftime('%B %d, %Y'),
+            ordinal=f"{day.strftime('%B')} {ordinal(day.day)}, {day.year}",
+            dmy=day.strftime('%d/%m/%Y'),
+            iso=day.isoformat()
+        ))
+        if rng.random() < 0.3:
+            sentences.append("Students should consult their advisor before making changes to their schedule.")
+    return ' '.join(sentences)
+
+
+def legacy_extract(manager: AlertsManager, text: str, source: str):
+    """The previous implementation: five sequential regex passes, strptime guessing and a linear duplicate scan"""
+    date_patterns = [
+        r'(?:deadline|due date|last date|closing date|registration|submission)[\s:]+([A-Z][a-z]+\s+\d{1,2},?\s+\d{4})',
+        r'(?:by|before|until|till)[\s]+([A-Z][a-z]+\s+\d{1,2},?\s+\d{4})',
+        r'(?:on|starting|from)[\s]+([A-Z][a-z]+\s+\d{1,2}(?:st|nd|rd|th)?,?\s+\d{4})',
+        r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
+        r'(\d{4}-\d{2}-\d{2})',
+    ]
+    formats = ['%B %d, %Y', '%B %d %Y', '%b %d, %Y', '%b %d %Y', '%d/%m/%Y', '%m/%d/%Y', '%Y-%m-%d', '%d-%m-%Y', '%m-%d-%Y']
+    keywords = [
+        'registration', 'fee payment', 'course drop', 'add course', 'exam', 'assignment', 'project', 'thesis',
+        'scholarship', 'application', 'admission', 'enrollment', 'deadline', 'submission', 'due date'
+    ]
+    
+    def parse(date_str):
+        date_str = re.sub(r'(\d+)(st|nd|rd|th)', r'\1', date_str.strip())
+        for fmt in formats:
+            try:
+                return datetime.strptime(date_str, fmt)
+            except ValueError:
+                continue
+        return None
+    
+    def describe(context, date_str):
+        context_lower = context.lower()
+        for keyword in keywords:
+            if keyword in context_lower:
+                for sentence in re.split(r'[.!?]\s+', context):
+                    if keyword in sentence.lower() and date_str in sentence:
+                        event = sentence.strip()
+                        return event[:150] + "..." if len(event) > 150 else event
+        return context[:100].strip() + "..." if len(context) > 100 else context.strip()
+    
+    deadlines = []
+    for pattern in date_patterns:
+        for match in re.finditer(pattern, text, re.IGNORECASE):
+            date_str = match.group(1)
+            parsed = parse(date_str)
+            if parsed:
+                context = text[max(0, match.start() - 100):min(len(text), match.end() + 100)]
+                deadline = {'date': parsed.isoformat(), 'event': describe(context, date_str), 'source': source}
+                if not any(d['date'] == deadline['date'] and d['event'] == deadline['event'] for d in deadlines):
+                    deadlines.append(deadline)
+    return deadlines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--overlap", type=int, default=200)
+    args = parser.parse_args()
+    
+    text = make_calendar(args.events)
+    chunks = [
+        {'text': chunk_text, 'metadata': {'source': 'calendar.pdf', 'chunk_index': i}}
+        for i, (_, chunk_text) in enumerate(split_content_defined(text, args.chunk_size, overlap=args.overlap))
+    ]
+    print(f"Calendar: {args.events} events, {len(text):,} characters, {len(chunks)} chunks")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = AlertsManager(Storage(str(Path(tmp) / "alerts.db")))
+        
+        start = time.perf_counter()
+        legacy = []
+        for chunk in chunks:
+            legacy.extend(legacy_extract(manager, chunk['text'], 'calendar.pdf'))
+        legacy_seconds = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        manager.add_deadlines_from_documents(chunks)
+        new_seconds = time.perf_counter() - start
+        new = manager.get_all_deadlines()
+    
+    print(f"Previous (per chunk, five passes): {legacy_seconds:.3f}s, {len(legacy)} matches")
+    print(f"Single pass (stitched document):  {new_seconds:.3f}s, {len(new)} dates stored ({legacy_seconds / new_seconds:.1f}x)")
+    
+    legacy_dates = {d['date'] for d in legacy if not d['date'].startswith('00')}
+    new_dates = {d['date'] for d in new}
+    if legacy_dates != new_dates:
+        print(f"FAIL: {len(legacy_dates - new_dates)} dates missed, {len(new_dates - legacy_dates)} extra")
+        sys.exit(1)
+    print("OK: both extractors find the same dates")
+
+
+if __name__ == "__main__":
+    main()
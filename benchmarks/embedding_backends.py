@@ -0,0 +1,89 @@
+"""
+Embedding Backend Benchmark
+Checks ONNX embeddings against the torch SentenceTransformer backend and compares throughput
+
+Usage:
+    python benchmarks/embedding_backends.py [--documents documents] [--quantize] [--threads 4]
+
+Exits with status 1 if any text's ONNX embedding has cosine similarity
+below --min-cosine to its torch embedding.
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from document_processor import DocumentProcessor
+from utils.onnx_embeddings import OnnxEmbeddingModel
+
+
+def load_texts(documents_dir: str, limit: int) -> list:
+    """Chunk the documents directory, or synthesize texts if it is empty"""
+    chunks = DocumentProcessor().process_directory(documents_dir)
+    texts = [chunk['text'] for chunk in chunks]
+    if not texts:
+        rng = np.random.RandomState(0)
+        vocabulary = "exam fee registration semester course deadline hostel library scholarship policy".split()
+        texts = [
+            ' '.join(rng.choice(vocabulary, size=rng.randint(5, 200)))
+            for _ in range(limit)
+        ]
+    return texts[:limit]
+
+
+def time_encode(encode, texts: list, repeats: int) -> float:
+    """Best-of-N throughput in texts per second"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        encode(texts)
+        best = min(best, time.perf_counter() - start)
+    return len(texts) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", default="documents")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--limit", type=int, default=512)
+    parser.add_argument("--quantize", action="store_true")
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--min-cosine", type=float, default=0.99)
+    args = parser.parse_args()
+    
+    texts = load_texts(args.documents, args.limit)
+    print(f"Benchmarking {len(texts)} texts")
+    
+    from vector_store import _load_torch
+    torch = _load_torch()
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    from sentence_transformers import SentenceTransformer
+    
+    torch_model = SentenceTransformer(args.model, device="cpu")
+    onnx_model = OnnxEmbeddingModel(args.model, quantize=args.quantize, num_threads=args.threads)
+    
+    torch_embeddings = torch_model.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+    onnx_embeddings = onnx_model.encode(texts)
+    
+    cosines = np.sum(torch_embeddings * onnx_embeddings, axis=1)
+    print(f"Cosine vs torch: min={cosines.min():.4f} mean={cosines.mean():.4f}")
+    
+    torch_rate = time_encode(lambda t: torch_model.encode(t, convert_to_numpy=True), texts, args.repeats)
+    onnx_rate = time_encode(onnx_model.encode, texts, args.repeats)
+    label = "onnx-int8" if args.quantize else "onnx"
+    print(f"torch:      {torch_rate:8.1f} texts/s")
+    print(f"{label:<11} {onnx_rate:8.1f} texts/s ({onnx_rate / torch_rate:.2f}x)")
+    
+    if cosines.min() < args.min_cosine:
+        print(f"FAIL: cosine below {args.min_cosine}")
+        sys.exit(1)
+    print("OK: ONNX embeddings match torch")
+
+
+if __name__ == "__main__":
+    main()
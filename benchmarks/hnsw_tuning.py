@@ -0,0 +1,177 @@
+"""
+HNSW Tuning Benchmark
+Sweeps the Chroma collection's HNSW parameters and reports recall@k, query latency and memory
+
+Usage:
+    python benchmarks/hnsw_tuning.py [--size 20000] [--dim 384] [--queries 200] [--k 10]
+                                     [--m 8,16,32] [--construction-ef 100,200] [--search-ef 10,50,100]
+    python benchmarks/hnsw_tuning.py --documents documents --backend hashing
+
+Builds the index from a fixture corpus (clustered synthetic vectors by default,
+or the embedded chunks of a documents directory) through VectorStore, once per
+(M, construction_ef) pair; M and construction_ef are build-time settings.
+search_ef only affects queries, so each built index is measured at every
+search_ef via VectorStore.set_search_ef (rebuilt only on chromadb versions that
+cannot change it in place). Recall@k is measured against exact cosine search in
+numpy. Settings are applied with HNSW_M, HNSW_CONSTRUCTION_EF and
+HNSW_SEARCH_EF (or VectorStore(hnsw_params=...)).
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import itertools
+from pathlib import Path
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from vector_store import VectorStore
+
+# Chroma rejects larger add() batches
+ADD_BATCH_SIZE = 5000
+
+
+def synthetic_corpus(size: int, dim: int, queries: int, seed: int = 0):
+    """Clustered unit vectors (closer to real embeddings than uniform noise)"""
+    rng = np.random.RandomState(seed)
+    centers = rng.normal(size=(max(1, size // 200), dim))
+    assignments = rng.randint(len(centers), size=size + queries)
+    vectors = centers[assignments] + rng.normal(scale=0.6, size=(size + queries, dim))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors[:size].astype(np.float32), vectors[size:].astype(np.float32)
+
+
+def document_corpus(documents_dir: str, backend: str, queries: int, seed: int = 0):
+    """Embedded chunks of a documents directory; queries are held-out chunks"""
+    from document_processor import DocumentProcessor
+    
+    texts = [chunk['text'] for chunk in DocumentProcessor().process_directory(documents_dir)]
+    if len(texts) <= queries:
+        raise SystemExit(f"Need more than {queries} chunks in {documents_dir}, found {len(texts)}")
+    store = VectorStore(persist_directory=tempfile.mkdtemp(), embedding_backend=backend)
+    if store.embedding_backend == "hashing":
+        store.embedding_model.fit(texts)
+    vectors = np.asarray(store.embed_text(texts), dtype=np.float32)
+    vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+    order = np.random.RandomState(seed).permutation(len(vectors))
+    return vectors[order[queries:]], vectors[order[:queries]]
+
+
+def exact_top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """Ground-truth neighbor indices by exact cosine similarity"""
+    scores = queries @ corpus.T
+    top = np.argpartition(-scores, k, axis=1)[:, :k]
+    return np.take_along_axis(top, np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1), axis=1)
+
+
+def rss_mb() -> float:
+    """Resident set size of this process in MB (Linux), else peak RSS"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+
+def disk_mb(path: str) -> float:
+    return sum(f.stat().st_size for f in Path(path).rglob('*') if f.is_file()) / 1e6
+
+
+def build_index(corpus, params):
+    """Build an index with the given HNSW params; returns (store, directory, build seconds, RSS growth)"""
+    directory = tempfile.mkdtemp(prefix="hnsw_")
+    rss_before = rss_mb()
+    store = VectorStore(persist_directory=directory, embedding_backend="hashing", hnsw_params=params)
+    
+    start = time.perf_counter()
+    ids = [str(i) for i in range(len(corpus))]
+    for i in range(0, len(corpus), ADD_BATCH_SIZE):
+        store.collection.add(ids=ids[i:i + ADD_BATCH_SIZE], embeddings=corpus[i:i + ADD_BATCH_SIZE].tolist())
+    return store, directory, time.perf_counter() - start, rss_mb() - rss_before
+
+
+def measure_queries(store, queries, truth, k):
+    """Recall@k and query latency percentiles of the store's collection"""
+    latencies, hits = [], 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        result = store.collection.query(query_embeddings=[query.tolist()], n_results=k, include=[])
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += len(set(int(i) for i in result['ids'][0]) & set(expected.tolist()))
+    return {
+        'recall': hits / (len(queries) * k),
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95))
+    }
+
+
+def run_config(corpus, queries, truth, k, m, construction_ef, search_efs):
+    """
+    Build one index per (M, construction_ef) and measure it at each search_ef
+    
+    search_ef is a query-time setting, so it is changed on the built index;
+    only chromadb versions that cannot change it in place get a rebuild.
+    """
+    store = directory = None
+    try:
+        for search_ef in search_efs:
+            if store is None or not store.set_search_ef(search_ef):
+                if directory:
+                    shutil.rmtree(directory, ignore_errors=True)
+                params = {'M': m, 'construction_ef': construction_ef, 'search_ef': search_ef}
+                store, directory, build_seconds, rss_growth = build_index(corpus, params)
+            yield {
+                'M': m,
+                'construction_ef': construction_ef,
+                'search_ef': search_ef,
+                **measure_queries(store, queries, truth, k),
+                'build_s': build_seconds,
+                'rss_mb': rss_growth,
+                'disk_mb': disk_mb(directory)
+            }
+    finally:
+        if directory:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+def int_list(value: str) -> list:
+    return [int(v) for v in value.split(',') if v]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--m", type=int_list, default=[8, 16, 32])
+    parser.add_argument("--construction-ef", type=int_list, default=[100, 200])
+    parser.add_argument("--search-ef", type=int_list, default=[10, 50, 100])
+    parser.add_argument("--documents", default=None, help="Embed this directory instead of synthetic vectors")
+    parser.add_argument("--backend", default="auto", help="Embedding backend for --documents")
+    args = parser.parse_args()
+    
+    if args.documents:
+        corpus, queries = document_corpus(args.documents, args.backend, args.queries)
+    else:
+        corpus, queries = synthetic_corpus(args.size, args.dim, args.queries)
+    truth = exact_top_k(corpus, queries, args.k)
+    print(f"Corpus: {len(corpus)} x {corpus.shape[1]}, {len(queries)} queries, recall@{args.k}")
+    
+    header = f"{'M':>4} {'c_ef':>5} {'s_ef':>5} {'recall':>7} {'p50 ms':>7} {'p95 ms':>7} {'build s':>8} {'rss MB':>7} {'disk MB':>8}"
+    print(header)
+    print('-' * len(header))
+    for m, construction_ef in itertools.product(args.m, args.construction_ef):
+        for r in run_config(corpus, queries, truth, args.k, m, construction_ef, args.search_ef):
+            print(
+                f"{m:>4} {construction_ef:>5} {r['search_ef']:>5} {r['recall']:>7.3f} {r['p50_ms']:>7.2f} "
+                f"{r['p95_ms']:>7.2f} {r['build_s']:>8.1f} {r['rss_mb']:>7.0f} {r['disk_mb']:>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
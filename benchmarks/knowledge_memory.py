@@ -0,0 +1,107 @@
+"""
+Knowledge Memory Benchmark
+Compares session memory and topic lookup time of the columnar KnowledgeMemory against plain chunk lists
+
+Usage:
+    python benchmarks/knowledge_memory.py [--chunks 20000] [--topics 50] [--sources 100]
+
+Exits with status 1 if topic lookups return different chunks from a full scan.
+"""
+
+import gc
+import sys
+import json
+import time
+import random
+import argparse
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from agents.controller import KnowledgeMemory
+from utils.chunking import chunk_id
+
+
+def make_chunks(count: int, topics: int, sources: int, seed: int = 0) -> list:
+    """Synthetic chunks shaped like ReaderAgent output (~1000 characters each)"""
+    rng = random.Random(seed)
+    vocabulary = "exam fee registration semester course deadline hostel library scholarship policy".split()
+    chunks = []
+    for i in range(count):
+        source = f"document_{i % sources}.pdf"
+        text = ' '.join(rng.choice(vocabulary) for _ in range(120))
+        chunks.append({
+            'text': text,
+            'metadata': {
+                'source': source,
+                'file_path': f"documents/{source}",
+                'file_type': '.pdf',
+                'chunk_id': chunk_id(text, source),
+                'chunk_index': i // sources,
+                'total_chunks': count // sources,
+                'topic': f"Topic {rng.randrange(topics)}",
+                'subtopic': ''
+            }
+        })
+    # Round-trip through JSON so no strings are shared with the caller's copy
+    return json.loads(json.dumps(chunks))
+
+
+def measure(build) -> tuple:
+    """Bytes still allocated after build() returns, and its result"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--topics", type=int, default=50)
+    parser.add_argument("--sources", type=int, default=100)
+    parser.add_argument("--lookups", type=int, default=200)
+    args = parser.parse_args()
+    
+    chunks = make_chunks(args.chunks, args.topics, args.sources)
+    # Stand-in for the vector store holding the texts
+    stored = {chunk['metadata']['chunk_id']: chunk['text'] for chunk in chunks}
+    text_loader = lambda ids: [stored.get(doc_id) for doc_id in ids]
+    
+    list_bytes, plain = measure(lambda: make_chunks(args.chunks, args.topics, args.sources))
+    
+    def build_memory():
+        memory = KnowledgeMemory(text_loader)
+        memory.add_chunks(make_chunks(args.chunks, args.topics, args.sources))
+        return memory
+    table_bytes, memory = measure(build_memory)
+    print(f"Chunk lists:  {list_bytes / 1e6:8.1f} MB")
+    print(f"Chunk table:  {table_bytes / 1e6:8.1f} MB ({list_bytes / table_bytes:.1f}x smaller)")
+    
+    topics = [f"topic {i}" for i in range(args.topics)]
+    start = time.perf_counter()
+    for i in range(args.lookups):
+        topic = topics[i % len(topics)]
+        [chunk for chunk in plain if chunk['metadata'].get('topic', '').lower() == topic]
+    scan = (time.perf_counter() - start) / args.lookups
+    
+    start = time.perf_counter()
+    for i in range(args.lookups):
+        memory.chunk_table.topic_rows(topics[i % len(topics)])
+    lookup = (time.perf_counter() - start) / args.lookups
+    print(f"Topic scan:   {scan * 1e3:8.3f} ms per lookup")
+    print(f"Topic index:  {lookup * 1e3:8.3f} ms per lookup (row ids; texts load on materialize)")
+    
+    for topic in topics[:5]:
+        expected = [chunk for chunk in plain if chunk['metadata']['topic'].lower() == topic]
+        if memory.get_topic_chunks(topic) != expected:
+            print(f"FAIL: chunks for {topic!r} differ from a full scan")
+            sys.exit(1)
+    print("OK: indexed topic lookups match a full scan")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+LLM Gateway Check
+Exercises LLMGateway against the stub model: single-flight, retries, deadlines and priority scheduling
+
+Usage:
+    python benchmarks/llm_resilience.py [--latency 0.2] [--callers 20] [--rate-limit-rate 0.2]
+
+Exits with status 1 if any behavior does not match expectations.
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+from langchain_core.messages import HumanMessage, SystemMessage
+from llm_gateway import LLMGateway, LLMTimeoutError
+from utils.llm_scheduler import LLMScheduler, INTERACTIVE, BACKGROUND
+from stub_llm import StubChatModel
+
+
+def messages(text: str):
+    return [SystemMessage(content="You are a stub."), HumanMessage(content=text)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--callers", type=int, default=20)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.2)
+    args = parser.parse_args()
+    failures = []
+    
+    # Single-flight: identical concurrent prompts make one upstream call
+    stub = StubChatModel(latency=args.latency)
+    gateway = LLMGateway(client_factory=lambda *_: stub)
+    handle = gateway.bind("stub", temperature=0.1)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.callers) as pool:
+        answers = list(pool.map(lambda _: handle.invoke(messages("same question")).content, range(args.callers)))
+    elapsed = time.perf_counter() - start
+    print(f"single-flight: {args.callers} callers → {stub.calls} upstream call(s) in {elapsed:.2f}s")
+    if stub.calls != 1 or len(set(answers)) != 1:
+        failures.append("identical in-flight prompts were not coalesced")
+    
+    # Retries: rate-limited calls eventually succeed
+    stub = StubChatModel(latency=0.01, rate_limit_rate=args.rate_limit_rate, seed=1)
+    gateway = LLMGateway(client_factory=lambda *_: stub, max_retries=6, base_delay=0.01)
+    handle = gateway.bind("stub", temperature=0.1)
+    ok = sum(1 for i in range(50) if handle.invoke(messages(f"question {i}")).content)
+    print(f"retries: 50 distinct prompts → {ok} answers, {stub.calls} upstream calls")
+    if ok != 50:
+        failures.append("retryable errors were not retried")
+    
+    # Deadlines: a slow model fails fast instead of freezing the caller
+    stub = StubChatModel(latency=2.0)
+    gateway = LLMGateway(client_factory=lambda *_: stub)
+    handle = gateway.bind("stub", temperature=0.1)
+    start = time.perf_counter()
+    try:
+        handle.invoke(messages("slow"), timeout=0.3)
+        failures.append("deadline was not enforced")
+    except LLMTimeoutError:
+        pass
+    print(f"deadline: timed out after {time.perf_counter() - start:.2f}s (limit 0.30s)")
+    
+    # Scheduling: an interactive question overtakes a queued background backlog
+    stub = StubChatModel(latency=0.1)
+    gateway = LLMGateway(client_factory=lambda *_: stub, scheduler=LLMScheduler(max_concurrency=2))
+    background = gateway.bind("stub", temperature=0.1, priority=BACKGROUND)
+    interactive = gateway.bind("stub", temperature=0.2, priority=INTERACTIVE)
+    with ThreadPoolExecutor(args.callers + 1) as pool:
+        backlog = [pool.submit(background.invoke, messages(f"classify {i}")) for i in range(args.callers)]
+        time.sleep(0.05)
+        start = time.perf_counter()
+        interactive.invoke(messages("chat question"))
+        interactive_latency = time.perf_counter() - start
+        for future in backlog:
+            future.result()
+    backlog_time = args.callers * 0.1 / 2
+    print(f"scheduling: interactive answered in {interactive_latency:.2f}s behind a {backlog_time:.1f}s background backlog")
+    if interactive_latency > 0.3:
+        failures.append("interactive request waited behind background work")
+    
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
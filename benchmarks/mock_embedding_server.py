@@ -0,0 +1,153 @@
+"""
+Mock Embedding Server
+Local OpenAI-compatible /v1/embeddings endpoint with injectable latency, 429s and 5xx errors
+
+Usable as a context manager so the API embedding client can be exercised offline:
+    
+    with MockEmbeddingServer(rate_limit_rate=0.1, error_rate=0.05) as server:
+        os.environ["OPENAI_BASE_URL"] = server.url
+        ...
+"""
+
+import json
+import time
+import random
+import hashlib
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import List
+
+
+def mock_embedding(text: str, dim: int = 8) -> List[float]:
+    """Deterministic embedding for a text (lets callers verify result order)"""
+    digest = hashlib.sha256(text.encode('utf-8')).digest()
+    return [digest[i] / 255.0 for i in range(dim)]
+
+
+class MockEmbeddingServer:
+    """Threaded HTTP server imitating the OpenAI embeddings API"""
+    
+    def __init__(
+        self,
+        latency: float = 0.05,
+        rate_limit_rate: float = 0.0,
+        error_rate: float = 0.0,
+        max_batch_size: int = 2048,
+        dim: int = 8,
+        seed: int = 0
+    ):
+        """
+        Args:
+            latency: Seconds each request takes
+            rate_limit_rate: Fraction of requests answered with 429 + Retry-After
+                             (if non-zero, the first request always is)
+            error_rate: Fraction of requests answered with 500 (if non-zero,
+                        the second request always is)
+            max_batch_size: Requests with more inputs get 400, like the real API
+            dim: Embedding dimension
+            seed: Seed for failure injection
+        """
+        self.latency = latency
+        self.rate_limit_rate = rate_limit_rate
+        self.error_rate = error_rate
+        self.max_batch_size = max_batch_size
+        self.dim = dim
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'rate_limited': 0, 'errors': 0, 'inputs': 0, 'max_in_flight': 0}
+        self._in_flight = 0
+        self._server = None
+        self._thread = None
+    
+    @property
+    def url(self) -> str:
+        """Base URL to use as OPENAI_BASE_URL"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+    
+    def _handler(self):
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+            
+            def _reply(self, status: int, body: dict, headers: dict = None):
+                payload = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+            
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                request = json.loads(self.rfile.read(length) or b'{}')
+                inputs = request.get('input', [])
+                if isinstance(inputs, str):
+                    inputs = [inputs]
+                
+                with server._lock:
+                    server.stats['requests'] += 1
+                    server._in_flight += 1
+                    server.stats['max_in_flight'] = max(server.stats['max_in_flight'], server._in_flight)
+                    roll = server._random.random()
+                    # Short runs see every failure type regardless of the seed
+                    if server.stats['requests'] == 1 and server.rate_limit_rate:
+                        roll = 0.0
+                    elif server.stats['requests'] == 2 and server.error_rate:
+                        roll = server.rate_limit_rate
+                try:
+                    time.sleep(server.latency)
+                    if roll < server.rate_limit_rate:
+                        with server._lock:
+                            server.stats['rate_limited'] += 1
+                        self._reply(429, {'error': {'message': 'Rate limit exceeded'}}, {'Retry-After': '0.05'})
+                        return
+                    if roll < server.rate_limit_rate + server.error_rate:
+                        with server._lock:
+                            server.stats['errors'] += 1
+                        self._reply(500, {'error': {'message': 'Internal server error'}})
+                        return
+                    if len(inputs) > server.max_batch_size:
+                        self._reply(400, {'error': {'message': 'Too many inputs'}})
+                        return
+                    
+                    with server._lock:
+                        server.stats['inputs'] += len(inputs)
+                    data = [
+                        {'object': 'embedding', 'index': i, 'embedding': mock_embedding(text, server.dim)}
+                        for i, text in enumerate(inputs)
+                    ]
+                    tokens = sum(len(text.split()) for text in inputs)
+                    self._reply(200, {
+                        'object': 'list',
+                        'data': data,
+                        'model': request.get('model', 'mock'),
+                        'usage': {'prompt_tokens': tokens, 'total_tokens': tokens}
+                    })
+                finally:
+                    with server._lock:
+                        server._in_flight -= 1
+        
+        return Handler
+    
+    def start(self):
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, *exc):
+        self.stop()
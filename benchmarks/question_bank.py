@@ -0,0 +1,95 @@
+"""
+Question Bank Check
+Builds a question bank from synthetic chunks with a slow stub generator, then times quiz sampling
+
+Usage:
+    python benchmarks/question_bank.py [--topics 6] [--latency 0.2] [--quizzes 20]
+
+Exits with status 1 if sampling is slow, repeats a recently seen question, or
+the pools are not refilled.
+"""
+
+import sys
+import time
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from question_bank import QuestionBank
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--topics", type=int, default=6)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--quizzes", type=int, default=20)
+    parser.add_argument("--max-sample-ms", type=float, default=20.0)
+    args = parser.parse_args()
+    failures = []
+    
+    counter = iter(range(10 ** 9))
+    counter_lock = threading.Lock()
+    
+    def generate(chunks, difficulty, count):
+        """Stand-in for an LLM call: slow, and every question unique"""
+        time.sleep(args.latency)
+        with counter_lock:
+            ids = [next(counter) for _ in range(count)]
+        return [{
+            'question': f"{difficulty} question {i} about {chunks[0]['metadata']['topic']}?",
+            'options': [f"answer {i}", "wrong 1", "wrong 2", "wrong 3"],
+            'correct_answer': f"answer {i}",
+            'correct_index': 0,
+            'explanation': ''
+        } for i in ids]
+    
+    chunks = [
+        {'text': f"chunk {i}", 'metadata': {'topic': f"Topic {i % args.topics}"}}
+        for i in range(args.topics * 10)
+    ]
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        bank = QuestionBank(generate, path=str(Path(tmp) / "bank.db"), max_workers=4)
+        start = time.perf_counter()
+        bank.build(chunks)
+        bank.wait()
+        print(f"Built {sum(bank.pool_sizes().values())} questions in {time.perf_counter() - start:.2f}s")
+        
+        seen = []
+        latencies = []
+        for _ in range(args.quizzes):
+            start = time.perf_counter()
+            questions = bank.sample("medium", 5, user="bench")
+            latencies.append((time.perf_counter() - start) * 1000)
+            seen.append([q['question'] for q in questions])
+        latencies.sort()
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        print(f"Sampled {args.quizzes} quizzes: p50={latencies[len(latencies) // 2]:.2f}ms p95={p95:.2f}ms")
+        if p95 > args.max_sample_ms:
+            failures.append(f"sample p95 {p95:.2f}ms above {args.max_sample_ms}ms")
+        
+        window = bank.recent_window // 5
+        for i, quiz in enumerate(seen):
+            recent = {q for earlier in seen[max(0, i - window):i] for q in earlier}
+            if recent & set(quiz):
+                failures.append(f"quiz {i} repeats a recently seen question")
+                break
+        
+        bank.wait()
+        medium = sum(count for (_, difficulty), count in bank.pool_sizes().items() if difficulty == "medium")
+        print(f"Medium pool after sampling: {medium} questions")
+        if medium <= bank.target_per_pool * args.topics:
+            failures.append("pools were not refilled as they ran low")
+        bank.close()
+    
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK: question bank samples quickly without recent repeats")
+
+
+if __name__ == "__main__":
+    main()
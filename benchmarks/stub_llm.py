@@ -0,0 +1,53 @@
+"""
+Stub Chat Model
+Local stand-in for ChatGoogleGenerativeAI with injectable latency, rate limits and errors
+    
+    from llm_gateway import LLMGateway, set_llm_gateway
+    set_llm_gateway(LLMGateway(client_factory=StubChatModel.factory(latency=0.2, rate_limit_rate=0.1)))
+"""
+
+import time
+import random
+import threading
+from types import SimpleNamespace
+from typing import List
+
+
+class StubRateLimitError(Exception):
+    """Imitates a 429 response"""
+    status_code = 429
+
+
+class StubServerError(Exception):
+    """Imitates a 500 response"""
+    status_code = 500
+
+
+class StubChatModel:
+    """Deterministic chat model: echoes a digest of the prompt after a delay"""
+    
+    def __init__(self, latency: float = 0.1, rate_limit_rate: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.rate_limit_rate = rate_limit_rate
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+    
+    @classmethod
+    def factory(cls, **kwargs):
+        """client_factory for LLMGateway that shares one stub across models"""
+        stub = cls(**kwargs)
+        return lambda model, temperature, api_key: stub
+    
+    def invoke(self, messages: List):
+        with self._lock:
+            self.calls += 1
+            roll = self._random.random()
+        time.sleep(self.latency)
+        if roll < self.rate_limit_rate:
+            raise StubRateLimitError("429 Resource exhausted")
+        if roll < self.rate_limit_rate + self.error_rate:
+            raise StubServerError("500 Internal error")
+        prompt = messages[-1].content if messages else ""
+        return SimpleNamespace(content=f"stub answer ({len(prompt)} chars)", usage_metadata={})
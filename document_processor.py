@@ -5,18 +5,22 @@ Handles ingestion, cleaning, and chunking of college documents
 
 import os
 import re
-from typing import List, Dict
+from typing import List, Dict, Optional
 from pathlib import Path
 import PyPDF2
 from docx import Document
+from utils.chunking import split_content_defined, chunk_id
 
 
 class DocumentProcessor:
     """Processes various document formats and splits them into chunks"""
     
-    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200, chunking_mode: Optional[str] = None):
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        # 'content' (content-defined boundaries) or 'fixed' (word windows).
+        # Can be overridden by CHUNKING_MODE env var.
+        self.chunking_mode = (chunking_mode or os.getenv("CHUNKING_MODE", "content")).lower()
     
     def extract_text_from_pdf(self, file_path: str) -> str:
         """Extract text from PDF file"""
@@ -62,6 +66,9 @@ class DocumentProcessor:
     
     def split_into_chunks(self, text: str, metadata: Dict = None) -> List[Dict]:
         """Split text into overlapping chunks"""
+        if self.chunking_mode == "content":
+            return self.split_content_defined(text, metadata)
+        
         chunks = []
         words = text.split()
         
@@ -107,6 +114,22 @@ class DocumentProcessor:
         
         return chunks
     
+    def split_content_defined(self, text: str, metadata: Dict = None) -> List[Dict]:
+        """Split text on content-defined boundaries with content-addressed chunk IDs"""
+        metadata = metadata or {}
+        chunks = []
+        for _, chunk_text in split_content_defined(text, self.chunk_size, overlap=self.chunk_overlap):
+            chunk_text = self.clean_text(chunk_text)
+            if chunk_text:
+                chunks.append({
+                    'text': chunk_text,
+                    'metadata': {
+                        **metadata,
+                        'chunk_id': chunk_id(chunk_text, metadata.get('source', ''))
+                    }
+                })
+        return chunks
+    
     def process_document(self, file_path: str) -> List[Dict]:
         """Process a single document and return chunks"""
         file_path = Path(file_path)
@@ -0,0 +1,349 @@
+"""
+Ingest Pipeline
+Staged producer/consumer ingest: extract → clean/chunk → embed → upsert
+"""
+
+import os
+import time
+import queue
+import logging
+import threading
+import contextvars
+from pathlib import Path
+from typing import List, Dict, Optional, Callable
+from utils.chunking import chunk_id
+from utils.tracing import traced, current_span
+from utils.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of a stage's input
+_DONE = object()
+
+
+class _Stage:
+    """One pipeline stage: a worker pool reading from a bounded inbox"""
+    
+    def __init__(self, name: str, func: Callable, workers: int, inbox: queue.Queue, outbox: Optional[queue.Queue], batch_size: int = 1):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.inbox = inbox
+        self.outbox = outbox
+        self.batch_size = batch_size
+        self.active = self.workers
+        self.lock = threading.Lock()
+        self.items_in = 0
+        self.items_out = 0
+        self.busy_seconds = 0.0
+        self.max_queue_depth = 0
+        self.finished_at = None
+    
+    def metrics(self, started_at: float) -> Dict:
+        elapsed = (self.finished_at or time.perf_counter()) - started_at
+        return {
+            'workers': self.workers,
+            'items_in': self.items_in,
+            'items_out': self.items_out,
+            'busy_seconds': round(self.busy_seconds, 3),
+            'throughput_per_sec': round(self.items_in / elapsed, 2) if elapsed > 0 else 0.0,
+            'queue_depth': 0 if self.finished_at else self.inbox.qsize(),
+            'max_queue_depth': self.max_queue_depth
+        }
+
+
+class IngestPipeline:
+    """
+    Ingests a directory of study materials through overlapping stages
+    
+    Files are extracted, cleaned/classified/chunked, embedded and written to the
+    vector store by separate worker pools connected by bounded queues, so a slow
+    stage applies backpressure instead of buffering everything in memory, and
+    the first chunks are searchable while later files are still being read.
+    Near-duplicate chunks are dropped in the chunk stage, in file order so the
+    same copy is kept on every run. Once every file is
+    done, chunks from documents that no longer exist are removed from the index.
+    """
+    
+    def __init__(
+        self,
+        reader_agent,
+        vector_store=None,
+        deduplicator=None,
+        extract_workers: Optional[int] = None,
+        chunk_workers: Optional[int] = None,
+        embed_workers: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        queue_size: Optional[int] = None
+    ):
+        """
+        Initialize pipeline
+        
+        Args:
+            reader_agent: ReaderAgent used to extract and chunk documents
+            vector_store: Optional VectorStore to embed and index chunks into
+            deduplicator: Optional NearDuplicateDetector (reset per run)
+            extract_workers: File extraction threads (env INGEST_EXTRACT_WORKERS, default 4)
+            chunk_workers: Clean/classify/chunk threads (env INGEST_CHUNK_WORKERS, default 2)
+            embed_workers: Embedding threads (env INGEST_EMBED_WORKERS, default 1)
+            batch_size: Chunks per embedding batch (env INGEST_BATCH_SIZE, default 64)
+            queue_size: Capacity of each inter-stage queue (env INGEST_QUEUE_SIZE, default 8)
+        """
+        self.reader_agent = reader_agent
+        self.vector_store = vector_store
+        self.deduplicator = deduplicator
+        self.extract_workers = extract_workers or int(os.getenv("INGEST_EXTRACT_WORKERS", "4"))
+        self.chunk_workers = chunk_workers or int(os.getenv("INGEST_CHUNK_WORKERS", "2"))
+        self.embed_workers = embed_workers or int(os.getenv("INGEST_EMBED_WORKERS", "1"))
+        self.batch_size = batch_size or int(os.getenv("INGEST_BATCH_SIZE", "64"))
+        self.queue_size = queue_size or int(os.getenv("INGEST_QUEUE_SIZE", "8"))
+        
+        self._stages = []
+        self._started_at = time.perf_counter()
+    
+    def metrics(self) -> Dict:
+        """Per-stage throughput and queue depth (live while a run is in progress)"""
+        return {stage.name: stage.metrics(self._started_at) for stage in self._stages}
+    
+    # Stage functions ---------------------------------------------------------
+    
+    def _extract(self, item) -> List:
+        # Failed and empty files still go downstream so the chunk stage can
+        # release the files after them
+        index, file_path = item
+        print(f"Processing: {file_path.name}")
+        try:
+            text = self.reader_agent.extract_text(str(file_path))
+        except Exception as e:
+            print(f"  → Error processing {file_path.name}: {e}")
+            text = None
+        return [(index, file_path, text)]
+    
+    def _chunk(self, item) -> List[Dict]:
+        index, file_path, text = item
+        result = {'chunks': [], 'topics': []}
+        if text:
+            try:
+                result = self.reader_agent.structure_text(text, str(file_path))
+                print(f"  → Created {len(result['chunks'])} chunks from {file_path.name}")
+            except Exception as e:
+                print(f"  → Error processing {file_path.name}: {e}")
+        
+        # Files are chunked in parallel but deduplicated strictly in file order,
+        # so every run keeps the same copy of a repeated chunk (and its chunk_id)
+        with self._lock:
+            self._structured[index] = result
+            unique = []
+            while self._next_file in self._structured:
+                result = self._structured.pop(self._next_file)
+                self._next_file += 1
+                self._topics.extend(result['topics'])
+                for chunk in result['chunks']:
+                    representative = self.deduplicator.check(chunk) if self.deduplicator else None
+                    if representative is None:
+                        unique.append(chunk)
+                    else:
+                        self._merged[self._chunk_id(representative)] = representative
+                self._total_chunks += len(result['chunks'])
+            self._chunks.extend(unique)
+        return unique
+    
+    def _embed(self, chunks: List[Dict]) -> List[Dict]:
+        return [self.vector_store.embed_batch(chunks)]
+    
+    def _upsert(self, batch: Dict) -> List:
+        stats = self.vector_store.write_batch(batch)
+        with self._lock:
+            self._index_stats['added'] += stats['added']
+            self._index_stats['reused'] += stats['reused']
+        return []
+    
+    @staticmethod
+    def _chunk_id(chunk: Dict) -> str:
+        metadata = chunk.get('metadata', {})
+        return metadata.get('chunk_id') or chunk_id(chunk['text'], metadata.get('source', ''))
+    
+    # Queue plumbing ----------------------------------------------------------
+    
+    def _put(self, q: queue.Queue, item) -> bool:
+        """Blocking put that gives up once the pipeline is stopping"""
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def _get(self, q: queue.Queue):
+        """Blocking get that returns _DONE once the pipeline is stopping"""
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+    
+    def _take(self, stage: _Stage) -> Optional[List]:
+        """Take up to stage.batch_size items, or None when the input is exhausted"""
+        stage.max_queue_depth = max(stage.max_queue_depth, stage.inbox.qsize())
+        item = self._get(stage.inbox)
+        if item is _DONE:
+            stage.inbox.put(_DONE)  # let sibling workers see it too
+            return None
+        
+        items = [item]
+        while len(items) < stage.batch_size:
+            try:
+                item = stage.inbox.get_nowait()
+            except queue.Empty:
+                break
+            if item is _DONE:
+                stage.inbox.put(_DONE)
+                break
+            items.append(item)
+        return items
+    
+    def _work(self, stage: _Stage):
+        try:
+            while True:
+                items = self._take(stage)
+                if items is None:
+                    break
+                
+                start = time.perf_counter()
+                outputs = stage.func(items if stage.batch_size > 1 else items[0])
+                with stage.lock:
+                    stage.busy_seconds += time.perf_counter() - start
+                    stage.items_in += len(items)
+                    stage.items_out += len(outputs)
+                
+                if stage.outbox is not None:
+                    for output in outputs:
+                        if not self._put(stage.outbox, output):
+                            return
+        except Exception as e:
+            logger.exception("Ingest stage '%s' failed: %s", stage.name, e)
+            with self._lock:
+                self._error = self._error or e
+            self._stop.set()
+        finally:
+            with stage.lock:
+                stage.active -= 1
+                last = stage.active == 0
+            if last:
+                stage.finished_at = time.perf_counter()
+                if stage.outbox is not None:
+                    self._put(stage.outbox, _DONE)
+    
+    # Run ---------------------------------------------------------------------
+    
+    def _run_stages(self, stages: List[_Stage]):
+        """Run the stages' workers until their input is exhausted"""
+        # Each worker runs in a copy of this context so its spans nest under ingest.run
+        threads = [
+            threading.Thread(target=contextvars.copy_context().run, args=(self._work, stage), name=f"ingest-{stage.name}-{i}", daemon=True)
+            for stage in stages
+            for i in range(stage.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    
+    @traced("ingest.run")
+    def run(self, directory_path: str) -> Dict:
+        """
+        Ingest every supported document in a directory
+        
+        Args:
+            directory_path: Path to directory containing study materials
+        
+        Returns:
+            Dict with 'chunks', 'topics', 'index_stats', 'duplicates_skipped'
+            and per-stage 'metrics'
+        """
+        directory = Path(directory_path)
+        if not directory.exists():
+            print(f"Directory not found: {directory_path}")
+            return {'chunks': [], 'topics': [], 'index_stats': {'added': 0, 'reused': 0, 'removed': 0}, 'duplicates_skipped': 0, 'metrics': {}}
+        
+        files = sorted(
+            path for path in directory.iterdir()
+            if path.is_file() and path.suffix.lower() in self.reader_agent.supported_extensions
+        )
+        
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._error = None
+        self._chunks = []
+        self._topics = []
+        self._merged = {}
+        self._structured = {}
+        self._next_file = 0
+        self._total_chunks = 0
+        self._index_stats = {'added': 0, 'reused': 0, 'removed': 0}
+        if self.deduplicator:
+            self.deduplicator.reset()
+        
+        # The hashing backend learns IDF weights once; fit them on the whole
+        # corpus rather than the first batch, so embedding waits for chunking
+        fit_first = bool(self.vector_store) and self.vector_store.needs_fit
+        
+        files_q = queue.Queue()
+        texts_q = queue.Queue(self.queue_size)
+        chunks_q = queue.Queue(0 if fit_first else self.queue_size * self.batch_size) if self.vector_store else None
+        batches_q = queue.Queue(self.queue_size) if self.vector_store else None
+        
+        self._stages = [
+            _Stage('extract', self._extract, self.extract_workers, files_q, texts_q),
+            _Stage('chunk', self._chunk, self.chunk_workers, texts_q, chunks_q)
+        ]
+        if self.vector_store:
+            self._stages += [
+                _Stage('embed', self._embed, self.embed_workers, chunks_q, batches_q, batch_size=self.batch_size),
+                # A single writer keeps Chroma writes serialized
+                _Stage('upsert', self._upsert, 1, batches_q, None)
+            ]
+        
+        for item in enumerate(files):
+            files_q.put(item)
+        files_q.put(_DONE)
+        
+        self._started_at = time.perf_counter()
+        if fit_first:
+            self._run_stages(self._stages[:2])
+            if self._error is None:
+                self.vector_store.fit_embeddings([chunk['text'] for chunk in self._chunks])
+                self._run_stages(self._stages[2:])
+        else:
+            self._run_stages(self._stages)
+        
+        if self._error is not None:
+            raise self._error
+        
+        if self.vector_store:
+            # Representatives that absorbed duplicates after being written need their
+            # alt_sources/duplicate_count refreshed; documents that disappeared are dropped
+            if self._merged:
+                self.vector_store.update_metadata(list(self._merged.values()))
+            self._index_stats['removed'] = self.vector_store.remove_stale({self._chunk_id(chunk) for chunk in self._chunks})
+        
+        # Worker scheduling is nondeterministic; restore document order
+        self._chunks.sort(key=lambda chunk: (chunk['metadata'].get('source', ''), chunk['metadata'].get('chunk_index', 0)))
+        
+        elapsed = time.perf_counter() - self._started_at
+        get_metrics().counter("ingest.chunks").inc(self._total_chunks)
+        get_metrics().histogram("ingest.seconds").observe(elapsed)
+        get_metrics().gauge("ingest.chunks_per_sec").set(self._total_chunks / elapsed if elapsed > 0 else 0.0)
+        
+        metrics = self.metrics()
+        current_span().set_attributes(files=len(files), chunks=len(self._chunks), **self._index_stats)
+        logger.info("Ingest finished in %.2fs: %s", elapsed, metrics)
+        return {
+            'chunks': self._chunks,
+            'topics': self._topics,
+            'index_stats': self._index_stats,
+            'duplicates_skipped': self._total_chunks - len(self._chunks),
+            'metrics': metrics
+        }
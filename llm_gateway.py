@@ -0,0 +1,353 @@
+"""
+LLM Gateway
+Shared entry point for chat model calls: pooled clients, deadlines, retries and single-flight
+"""
+
+import os
+import time
+import random
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future, TimeoutError as FutureTimeout
+from typing import Callable, Dict, List, Optional
+from dotenv import load_dotenv
+from utils.async_embeddings import is_retryable
+from utils.tracing import get_tracer, set_llm_usage
+from utils.metrics import get_metrics, track_llm_call
+from utils.llm_cache import LLMResponseCache
+from utils.llm_scheduler import LLMScheduler, SchedulerTimeout, GENERATION, PRIORITY_NAMES
+from utils.tracing import CHARS_PER_TOKEN
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# google.api_core exceptions carry gRPC-style names instead of HTTP status codes
+_RETRYABLE_ERROR_NAMES = {
+    'ResourceExhausted', 'ServiceUnavailable', 'DeadlineExceeded', 'InternalServerError', 'TooManyRequests'
+}
+
+
+class LLMTimeoutError(TimeoutError):
+    """Raised when an LLM call does not finish before its deadline"""
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, FutureTimeout):
+        return True
+    if type(error).__name__ in _RETRYABLE_ERROR_NAMES:
+        return True
+    code = getattr(error, 'code', None)
+    if isinstance(code, int):
+        return code == 429 or code >= 500
+    return is_retryable(error)
+
+
+def _default_client_factory(model: str, temperature: float, api_key: Optional[str]):
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    # Retries are handled by the gateway, so the client itself must not retry
+    return ChatGoogleGenerativeAI(
+        model=model,
+        temperature=temperature,
+        google_api_key=api_key or os.getenv("GOOGLE_API_KEY") or os.getenv("OPENAI_API_KEY"),
+        max_retries=0
+    )
+
+
+def _message_key(model: str, temperature: float, messages: List) -> str:
+    """Hash identifying an identical request"""
+    digest = hashlib.sha256(f"{model}\x00{temperature}".encode('utf-8'))
+    for message in messages:
+        digest.update(b"\x00" + type(message).__name__.encode('utf-8'))
+        digest.update(b"\x00" + str(getattr(message, 'content', message)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class LLMHandle:
+    """A model/temperature bound to the gateway; drop-in for a chat model's invoke()"""
+    
+    def __init__(
+        self,
+        gateway: "LLMGateway",
+        model: str,
+        temperature: float,
+        api_key: Optional[str] = None,
+        caller: Optional[str] = None,
+        cache: bool = True,
+        priority: int = GENERATION
+    ):
+        self.gateway = gateway
+        self.model = model
+        self.temperature = temperature
+        self.api_key = api_key
+        self.caller = caller
+        self.cache = cache
+        self.priority = priority
+    
+    def invoke(self, messages: List, timeout: Optional[float] = None, cache: Optional[bool] = None):
+        """
+        Send messages to the model; returns the model's response message (with .content)
+        
+        Args:
+            messages: LangChain messages
+            timeout: Deadline in seconds (default: gateway timeout)
+            cache: Override the handle's response cache setting for this call
+        """
+        return self.gateway.invoke(
+            self.model, self.temperature, messages,
+            timeout=timeout,
+            api_key=self.api_key,
+            caller=self.caller,
+            cache=self.cache if cache is None else cache,
+            priority=self.priority
+        )
+
+
+class LLMGateway:
+    """
+    Runs every chat model call through one place
+    
+    - One client per (model, temperature, api key), reused across agents
+    - Each call has a deadline covering all of its attempts
+    - Retryable failures (rate limits, 5xx, timeouts) are retried with
+      jittered exponential backoff
+    - Identical requests already in flight share one upstream call
+    - Responses to identical requests are served from an optional disk cache
+    - Upstream calls are admitted by an LLMScheduler (priority classes,
+      per-user fairness, concurrency and token-rate limits)
+    
+    Pass client_factory to run against a stub model.
+    """
+    
+    def __init__(
+        self,
+        client_factory: Optional[Callable] = None,
+        timeout: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+        max_workers: Optional[int] = None,
+        cache: Optional[LLMResponseCache] = None,
+        scheduler: Optional[LLMScheduler] = None
+    ):
+        """
+        Initialize gateway
+        
+        Args:
+            client_factory: Callable (model, temperature, api_key) -> object with invoke(messages)
+            timeout: Default per-call deadline in seconds (env LLM_TIMEOUT_SECONDS, default 60)
+            max_retries: Retries per call (env LLM_MAX_RETRIES, default 2)
+            base_delay: First backoff delay in seconds
+            max_delay: Backoff delay cap in seconds
+            max_workers: Upstream calls that may run at once (env LLM_MAX_WORKERS, default 8)
+            cache: Response cache consulted before calling upstream (None disables caching)
+            scheduler: Admission scheduler (default: LLM_MAX_CONCURRENCY in flight,
+                       LLM_TOKENS_PER_MINUTE prompt tokens per minute, 0 = unlimited)
+        """
+        self.client_factory = client_factory or _default_client_factory
+        self.timeout = timeout or float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("LLM_MAX_RETRIES", "2"))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or int(os.getenv("LLM_MAX_WORKERS", "8")),
+            thread_name_prefix="llm"
+        )
+        self.cache = cache
+        self.scheduler = scheduler or LLMScheduler(
+            max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "4")),
+            tokens_per_minute=float(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))
+        )
+        self._clients = {}
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+    
+    def bind(
+        self,
+        model: str,
+        temperature: float = 0.0,
+        api_key: Optional[str] = None,
+        caller: Optional[str] = None,
+        cache: bool = True,
+        priority: int = GENERATION
+    ) -> LLMHandle:
+        """
+        Get a handle for one model/temperature (clients are created lazily and shared)
+        
+        Args:
+            model: Model name
+            temperature: Sampling temperature
+            api_key: Provider API key (default: from environment)
+            caller: Component name recorded on traces
+            cache: Whether calls through this handle use the response cache
+            priority: Scheduling class (INTERACTIVE, GENERATION or BACKGROUND)
+        """
+        return LLMHandle(self, model, temperature, api_key=api_key, caller=caller, cache=cache, priority=priority)
+    
+    def _client(self, model: str, temperature: float, api_key: Optional[str]):
+        key = (model, temperature, api_key)
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = self._clients[key] = self.client_factory(model, temperature, api_key)
+        return client
+    
+    def invoke(
+        self,
+        model: str,
+        temperature: float,
+        messages: List,
+        timeout: Optional[float] = None,
+        api_key: Optional[str] = None,
+        caller: Optional[str] = None,
+        cache: bool = True,
+        priority: int = GENERATION
+    ):
+        """
+        Call a chat model
+        
+        Args:
+            model: Model name
+            temperature: Sampling temperature
+            messages: LangChain messages
+            timeout: Deadline in seconds for the whole call including retries
+            api_key: Provider API key (default: from environment)
+            caller: Component name recorded on traces
+            cache: Serve and store the response via the response cache
+            priority: Scheduling class (INTERACTIVE, GENERATION or BACKGROUND)
+        
+        Returns:
+            The model's response message
+        
+        Raises:
+            LLMTimeoutError: If the deadline passes
+            Exception: The last upstream error if retries are exhausted or it is not retryable
+        """
+        deadline = time.monotonic() + (timeout or self.timeout)
+        key = _message_key(model, temperature, messages)
+        use_cache = cache and self.cache is not None
+        
+        if use_cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                get_metrics().counter("llm.cache_hits").inc()
+                with get_tracer().span("llm.invoke", caller=caller, model=model, cache_hit=True):
+                    return cached
+            get_metrics().counter("llm.cache_misses").inc()
+        
+        with self._lock:
+            shared = self._inflight.get(key)
+            if shared is None:
+                shared = self._inflight[key] = Future()
+                leader = True
+            else:
+                leader = False
+        
+        with get_tracer().span("llm.invoke", caller=caller, model=model, single_flight=not leader) as span:
+            if not leader:
+                get_metrics().counter("llm.single_flight_joins").inc()
+                try:
+                    return shared.result(timeout=max(0.0, deadline - time.monotonic()))
+                except FutureTimeout:
+                    raise LLMTimeoutError(f"LLM call to {model} timed out") from None
+            
+            try:
+                with track_llm_call():
+                    response = self._call_with_retries(model, temperature, api_key, messages, deadline, priority, span)
+            except Exception as e:
+                shared.set_exception(e)
+                raise
+            else:
+                shared.set_result(response)
+                # Bookkeeping after the future resolves must not fail a successful call
+                if use_cache:
+                    self.cache.put(key, model, response)
+                try:
+                    set_llm_usage(span, messages, response)
+                except Exception as e:
+                    logger.warning("Could not record LLM usage: %s", e)
+                return response
+            finally:
+                with self._lock:
+                    self._inflight.pop(key, None)
+    
+    def _acquire_slot(self, priority: int, tokens: float, deadline: float, span):
+        """Wait for the scheduler to admit an upstream call"""
+        try:
+            waited = self.scheduler.acquire(priority, tokens=tokens, timeout=max(0.0, deadline - time.monotonic()))
+        except SchedulerTimeout:
+            get_metrics().counter("llm.timeouts").inc()
+            raise LLMTimeoutError("LLM call timed out waiting in the request queue") from None
+        
+        waited_ms = waited * 1000
+        get_metrics().histogram("llm.queue_wait_ms").observe(waited_ms)
+        get_metrics().histogram(f"llm.queue_wait_ms.{PRIORITY_NAMES[priority]}").observe(waited_ms)
+        span.set_attribute("queue_wait_ms", round(waited_ms, 2))
+    
+    def _call_with_retries(self, model, temperature, api_key, messages, deadline, priority, span):
+        client = self._client(model, temperature, api_key)
+        tokens = sum(len(str(getattr(m, 'content', m))) for m in messages) / CHARS_PER_TOKEN
+        attempt = 0
+        while True:
+            if deadline - time.monotonic() <= 0:
+                get_metrics().counter("llm.timeouts").inc()
+                raise LLMTimeoutError(f"LLM call to {model} timed out")
+            
+            self._acquire_slot(priority, tokens, deadline, span)
+            try:
+                future = self._executor.submit(client.invoke, messages)
+            except Exception:
+                self.scheduler.release()
+                raise
+            # The slot is held until the upstream request really finishes, even after a timeout
+            future.add_done_callback(lambda _: self.scheduler.release())
+            
+            try:
+                return future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except Exception as e:
+                if isinstance(e, FutureTimeout):
+                    # The upstream request keeps running in its worker; we stop waiting for it
+                    future.cancel()
+                    get_metrics().counter("llm.timeouts").inc()
+                    raise LLMTimeoutError(f"LLM call to {model} timed out after {attempt + 1} attempt(s)") from None
+                if not _is_retryable(e) or attempt >= self.max_retries:
+                    raise
+                error = e
+            
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))  # full jitter
+            if time.monotonic() + delay >= deadline:
+                raise error
+            attempt += 1
+            span.set_attribute("retries", attempt)
+            get_metrics().counter("llm.retries").inc()
+            logger.warning("LLM call to %s failed (%s); retry %d in %.2fs", model, error, attempt, delay)
+            time.sleep(delay)
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_llm_gateway() -> LLMGateway:
+    """Process-wide gateway shared by all agents (response cache set by LLM_CACHE_PATH/TTL_SECONDS/MAX_ENTRIES)"""
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                cache_path = os.getenv("LLM_CACHE_PATH", "outputs/llm_cache.db")
+                cache = LLMResponseCache(
+                    cache_path,
+                    ttl_seconds=float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 86400))),
+                    max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+                ) if cache_path else None
+                _gateway = LLMGateway(cache=cache)
+    return _gateway
+
+
+def set_llm_gateway(gateway: LLMGateway):
+    """Replace the process-wide gateway (e.g. with one using a stub client_factory)"""
+    global _gateway
+    _gateway = gateway
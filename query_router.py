@@ -0,0 +1,386 @@
+"""
+Query Router
+Answers chat questions from the cheapest tier that is confident enough
+
+Tiers, in order:
+    cache       exact (normalized text), then semantic (embedding cosine) match of an earlier question
+    deadline    date questions answered from the stored deadline index, no LLM call
+    single_doc  RAG over one search, when the hits are close and mostly from one document
+    multi_doc   synthesis across documents via RAGPipeline.answer_multi_document_question
+
+Each tier returns None when its confidence gate fails and the next tier is
+tried. The tier that answered and the latency are added to the result and
+recorded as metrics.
+"""
+
+import os
+import re
+import time
+import logging
+import threading
+from collections import Counter, OrderedDict
+from datetime import date
+from typing import Dict, Optional, Tuple
+import numpy as np
+
+from utils import detect_multi_document_intent
+from utils.metrics import get_metrics
+from utils.tracing import get_tracer, traced, current_span
+
+logger = logging.getLogger(__name__)
+
+TIERS = ("cache", "deadline", "single_doc", "multi_doc")
+
+_WORD = re.compile(r"[a-z0-9]+")
+_DATE_QUESTION = re.compile(
+    r"\b(when|what date|which date|what day|last date|deadline|due|by when|till when|until when)\b", re.IGNORECASE
+)
+_STOPWORDS = frozenset(
+    "a an and are at be by can do does for from how i in is it me my of on or our the their there this "
+    "to was we what which who will with you your".split()
+)
+# Words that mark a date question but say nothing about which event it is
+_DATE_WORDS = frozenset("when date dates day last deadline deadlines due till until".split())
+_REFUSALS = ("don't have that information", "couldn't find any relevant information")
+_SENTENCE = re.compile(r'[.!?]\s+')
+
+
+def _normalize(text: str) -> str:
+    return ' '.join(_WORD.findall(text.lower()))
+
+
+def _terms(text: str) -> set:
+    """Content words, lowercased, with a plural 's' stripped"""
+    return {
+        word[:-1] if len(word) > 3 and word.endswith('s') and not word.endswith('ss') else word
+        for word in _WORD.findall(text.lower()) if word not in _STOPWORDS
+    }
+
+
+def _numbers(text: str) -> frozenset:
+    return frozenset(word for word in _WORD.findall(text.lower()) if any(ch.isdigit() for ch in word))
+
+
+def _is_refusal(answer: str) -> bool:
+    answer = answer.lower()
+    return any(refusal in answer for refusal in _REFUSALS)
+
+
+class AnswerCache:
+    """
+    LRU cache of answers with TTL, looked up by exact text or by embedding
+    
+    A semantic hit needs cosine similarity above the threshold and the same
+    numbers in both questions, so "fee for 2024" never answers "fee for 2025".
+    """
+    
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 3600.0, threshold: float = 0.95):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self._entries = OrderedDict()  # key -> (stored_at, numbers, unit embedding or None, result)
+        self._matrix = None  # (keys, stacked embeddings), rebuilt after changes
+        self._lock = threading.Lock()
+    
+    def _fresh(self, key) -> Optional[Tuple]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] > self.ttl_seconds:
+            del self._entries[key]
+            self._matrix = None
+            return None
+        self._entries.move_to_end(key)
+        return entry
+    
+    def get_exact(self, key) -> Optional[Dict]:
+        with self._lock:
+            entry = self._fresh(key)
+            return entry[3] if entry else None
+    
+    def get_similar(self, scope: Optional[str], numbers: frozenset, embedding: np.ndarray) -> Optional[Tuple[Dict, float]]:
+        """Best cached answer in the same scope (prioritized source) above the threshold"""
+        with self._lock:
+            if self._matrix is None:
+                keys = [key for key, entry in self._entries.items() if entry[2] is not None]
+                self._matrix = (keys, np.stack([self._entries[key][2] for key in keys]) if keys else None)
+            keys, matrix = self._matrix
+            if matrix is None or matrix.shape[1] != embedding.shape[0]:
+                return None
+            similarities = matrix @ embedding
+            for i in np.argsort(-similarities):
+                if similarities[i] < self.threshold:
+                    return None
+                key = keys[i]
+                entry = self._fresh(key)
+                if entry is not None and key[1] == scope and entry[1] == numbers:
+                    return entry[3], float(similarities[i])
+            return None
+    
+    def put(self, key, numbers: frozenset, embedding: Optional[np.ndarray], result: Dict):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), numbers, embedding, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _event_terms(record: Dict) -> set:
+    """
+    Content words of the sentence that states a deadline
+    
+    Only that sentence describes the event: neighbouring sentences in the
+    stored context (or in a fallback event snippet) are about other things.
+    """
+    event = record.get('event') or ''
+    day = record['_date']
+    date_words = {str(day.day), str(day.year), day.strftime('%B').lower(), day.strftime('%b').lower()}
+    for sentence in _SENTENCE.split(event):
+        if date_words & set(_WORD.findall(sentence.lower())):
+            return _terms(sentence)
+    return _terms(event)
+
+
+class DeadlineMatcher:
+    """Inverted index from event words to deadline records, rebuilt when the deadline index changes"""
+    
+    def __init__(self, alerts_manager, min_score: float = 1.0, margin: float = 0.15):
+        """
+        Args:
+            alerts_manager: AlertsManager holding the stored deadlines
+            min_score: Minimum share of the question's content words (date words
+                       aside) the deadline's event sentence must contain; by
+                       default every one, since a wrong date is worse than no answer
+            margin: How far ahead of any deadline on another date the best one must score
+        """
+        self.alerts_manager = alerts_manager
+        self.min_score = min_score
+        self.margin = margin
+        self._index = None
+        self._records = []
+        self._postings = {}
+    
+    def _refresh(self):
+        index = self.alerts_manager.get_deadline_index()
+        if index is self._index:
+            return
+        self._index = index
+        self._records = []
+        self._postings = {}
+        for position, record in enumerate(index):
+            self._records.append(record)
+            for term in _event_terms(record):
+                self._postings.setdefault(term, []).append(position)
+    
+    def match(self, question: str) -> Optional[Tuple[Dict, float]]:
+        """Best matching deadline and its score, or None if no match clears the gate"""
+        terms = _terms(question) - _DATE_WORDS
+        if not terms:
+            return None
+        self._refresh()
+        
+        scores = Counter()
+        for term in terms:
+            for position in self._postings.get(term, ()):
+                scores[position] += 1
+        if not scores:
+            return None
+        
+        ranked = [(score / len(terms), position) for position, score in scores.most_common()]
+        best_score, best = ranked[0]
+        if best_score < self.min_score:
+            return None
+        best_record = self._records[best]
+        for score, position in ranked[1:]:
+            if best_score - score >= self.margin:
+                break
+            if self._records[position]['_date'] != best_record['_date']:
+                return None  # Another date is about as likely: ambiguous
+        return best_record, best_score
+
+
+class QueryRouter:
+    """Routes each question through the answer tiers (see module docstring)"""
+    
+    def __init__(
+        self,
+        chat_agent,
+        vector_store=None,
+        alerts_manager=None,
+        multi_doc_pipeline=None,
+        cache: Optional[AnswerCache] = None,
+        deadline_min_score: float = 1.0,
+        single_doc_max_distance: float = 0.5,
+        single_doc_min_share: float = 0.6,
+        n_chunks: int = 5
+    ):
+        """
+        Args:
+            chat_agent: ChatAgent answering single-document questions
+            vector_store: VectorStore for embeddings and search (None disables semantic cache and RAG gates)
+            alerts_manager: AlertsManager with stored deadlines (None disables the deadline tier)
+            multi_doc_pipeline: RAGPipeline for multi-document synthesis (None: single_doc answers everything left)
+            cache: Answer cache (default: AnswerCache())
+            deadline_min_score: Deadline tier gate, see DeadlineMatcher
+            single_doc_max_distance: Single-doc gate: the closest hit must be within this cosine distance
+            single_doc_min_share: Single-doc gate: share of relevant hits that must come from one document
+            n_chunks: Chunks retrieved for single-document answers
+        """
+        self.chat_agent = chat_agent
+        self.vector_store = vector_store
+        self.multi_doc_pipeline = multi_doc_pipeline
+        self.cache = cache or AnswerCache()
+        self.deadlines = DeadlineMatcher(alerts_manager, deadline_min_score) if alerts_manager else None
+        self.single_doc_max_distance = single_doc_max_distance
+        self.single_doc_min_share = single_doc_min_share
+        self.n_chunks = n_chunks
+        self._tiers = [
+            ("cache", self._from_cache),
+            ("deadline", self._from_deadlines),
+            ("single_doc", self._from_single_doc),
+            ("multi_doc", self._from_multi_doc)
+        ]
+    
+    @traced("router.answer")
+    def answer(self, question: str, prioritize_source: Optional[str] = None) -> Dict:
+        """
+        Answer a question from the first tier whose confidence gate passes
+        
+        Returns:
+            Dict with 'answer', 'sources', 'chunks', plus 'tier' and 'latency_ms'
+        """
+        start = time.perf_counter()
+        query = {
+            'question': question,
+            'prioritize_source': prioritize_source,
+            'key': (_normalize(question), prioritize_source),
+            'numbers': _numbers(question),
+            'embedding': None
+        }
+        
+        tier, result = None, None
+        for tier, handler in self._tiers:
+            with get_tracer().span(f"router.{tier}") as span:
+                result = handler(query)
+                span.set_attribute("answered", result is not None)
+            if result is not None:
+                break
+        
+        if tier != "cache" and not result.get('answer', '').startswith("Error"):
+            self.cache.put(query['key'], query['numbers'], query['embedding'], {**result, 'answered_by': tier})
+        
+        latency_ms = (time.perf_counter() - start) * 1000
+        metrics = get_metrics()
+        metrics.counter(f"router.{tier}").inc()
+        metrics.histogram("router.latency_ms").observe(latency_ms)
+        metrics.histogram(f"router.latency_ms.{tier}").observe(latency_ms)
+        current_span().set_attributes(tier=tier, latency_ms=round(latency_ms, 2))
+        logger.info("Question answered by %s tier in %.1f ms", tier, latency_ms)
+        return {**result, 'tier': tier, 'latency_ms': latency_ms}
+    
+    def clear_cache(self):
+        """Drop cached answers (call after the documents change)"""
+        self.cache.clear()
+    
+    def _embedding(self, query: Dict) -> Optional[np.ndarray]:
+        """Unit-length question embedding, computed once and shared by the cache and search"""
+        if query['embedding'] is None and self.vector_store is not None:
+            vector = np.asarray(self.vector_store.embed_text([query['question']])[0], dtype=np.float32)
+            query['embedding'] = vector / max(float(np.linalg.norm(vector)), 1e-12)
+        return query['embedding']
+    
+    def _from_cache(self, query: Dict) -> Optional[Dict]:
+        result = self.cache.get_exact(query['key'])
+        if result is not None:
+            return result
+        if self.vector_store is None:
+            return None
+        hit = self.cache.get_similar(query['prioritize_source'], query['numbers'], self._embedding(query))
+        if hit is None:
+            return None
+        result, similarity = hit
+        current_span().set_attribute("similarity", round(similarity, 4))
+        return result
+    
+    def _from_deadlines(self, query: Dict) -> Optional[Dict]:
+        if self.deadlines is None or not _DATE_QUESTION.search(query['question']):
+            return None
+        match = self.deadlines.match(query['question'])
+        if match is None:
+            return None
+        record, score = match
+        current_span().set_attribute("score", round(score, 3))
+        
+        days = (record['_date'] - date.today()).days
+        when = record['_date'].strftime('%B %d, %Y').replace(' 0', ' ')
+        if days > 1:
+            when += f" (in {days} days)"
+        elif days in (0, 1):
+            when += " (today)" if days == 0 else " (tomorrow)"
+        source = record.get('source', 'Unknown')
+        return {
+            'answer': f"According to {source}, this is on {when}: {record.get('event', '')}",
+            'sources': [source],
+            'chunks': [],
+            'deadline': {key: value for key, value in record.items() if not key.startswith('_')}
+        }
+    
+    def _from_single_doc(self, query: Dict) -> Optional[Dict]:
+        question = query['question']
+        # Without a multi-doc tier behind it, this tier answers everything left
+        gated = self.multi_doc_pipeline is not None
+        if self.vector_store is None:
+            return self.chat_agent.answer_question(question, self.n_chunks, query['prioritize_source'])
+        if gated and detect_multi_document_intent(question):
+            return None
+        
+        chunks = self.vector_store.search(
+            question, n_results=self.n_chunks, prioritize_source=query['prioritize_source'],
+            query_embedding=self._embedding(query).tolist()
+        )
+        if gated:
+            relevant = [chunk for chunk in chunks if chunk.get('distance') is not None and chunk['distance'] < 0.8]
+            if not relevant or min(chunk['distance'] for chunk in relevant) > self.single_doc_max_distance:
+                return None
+            top_count = Counter(chunk['metadata'].get('source') for chunk in relevant).most_common(1)[0][1]
+            if top_count / len(relevant) < self.single_doc_min_share:
+                return None
+        
+        result = self.chat_agent.answer_question(
+            question, self.n_chunks, query['prioritize_source'], retrieved_chunks=chunks
+        )
+        if gated and _is_refusal(result.get('answer', '')):
+            return None  # Maybe the answer needs more than one document
+        return result
+    
+    def _from_multi_doc(self, query: Dict) -> Optional[Dict]:
+        embedding = self._embedding(query)
+        return self.multi_doc_pipeline.answer_multi_document_question(
+            query['question'], query_embedding=embedding.tolist() if embedding is not None else None
+        )
+
+
+def create_query_router(chat_agent, vector_store=None, alerts_manager=None, multi_doc_pipeline=None) -> QueryRouter:
+    """Query router configured from ROUTER_* env vars"""
+    return QueryRouter(
+        chat_agent,
+        vector_store=vector_store,
+        alerts_manager=alerts_manager,
+        multi_doc_pipeline=multi_doc_pipeline,
+        cache=AnswerCache(
+            max_entries=int(os.getenv("ROUTER_CACHE_SIZE", "256")),
+            ttl_seconds=float(os.getenv("ROUTER_CACHE_TTL_SECONDS", "3600")),
+            threshold=float(os.getenv("ROUTER_SEMANTIC_THRESHOLD", "0.95"))
+        ),
+        deadline_min_score=float(os.getenv("ROUTER_DEADLINE_MIN_SCORE", "1.0")),
+        single_doc_max_distance=float(os.getenv("ROUTER_SINGLE_DOC_MAX_DISTANCE", "0.5"))
+    )
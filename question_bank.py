@@ -0,0 +1,370 @@
+"""
+Question Bank
+Pre-generated pool of validated quiz questions indexed by (topic, difficulty)
+
+After ingest the bank fills every (topic, difficulty) pool in the background.
+Quizzes are then sampled from SQLite in milliseconds, skipping questions the
+user saw recently, and pools that run low are refilled asynchronously.
+"""
+
+import os
+import json
+import math
+import time
+import random
+import hashlib
+import sqlite3
+import logging
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Callable, Iterable
+
+from utils.chunking import chunk_id
+from utils.llm_scheduler import get_current_user
+from utils.metrics import get_metrics
+from utils.tracing import traced, current_span
+
+logger = logging.getLogger(__name__)
+
+DIFFICULTIES = ("easy", "medium", "hard")
+
+
+def _question_key(question: Dict) -> str:
+    """Identity of a question (normalized question text) used to drop duplicates"""
+    text = ' '.join(question['question'].lower().split())
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def _material_key(chunk_ids: Iterable[str]) -> str:
+    """
+    Hash of a topic's (content-addressed) chunk ids; questions generated from
+    other material are stale
+    """
+    digest = hashlib.sha1()
+    for key in sorted(set(chunk_ids)):
+        digest.update(key.encode('utf-8') + b'\x00')
+    return digest.hexdigest()
+
+
+def _chunk_key(chunk: Dict) -> str:
+    metadata = chunk.get('metadata', {})
+    return metadata.get('chunk_id') or chunk_id(chunk.get('text', ''), metadata.get('source', ''))
+
+
+def _is_valid(question: Dict) -> bool:
+    """Four distinct options with correct_index pointing at the correct answer"""
+    options = question.get('options') or []
+    index = question.get('correct_index')
+    return (
+        bool(question.get('question'))
+        and len(options) == 4
+        and len(set(options)) == 4
+        and isinstance(index, int)
+        and 0 <= index < 4
+        and options[index] == question.get('correct_answer')
+    )
+
+
+class QuestionBank:
+    """
+    Persistent, indexed pool of quiz questions
+    
+    Questions are generated by generate_fn(chunks, difficulty, count) from a
+    random sample of each topic's chunks (so repeated refills see different
+    material), validated, deduplicated by question text and stored in SQLite
+    (WAL) with an index on (topic, difficulty). Each topic's questions are
+    tied to a hash of the ids of the chunks they were generated from and are
+    dropped when that material changes. Only sampled chunks are loaded, so
+    the bank can be built from chunk ids alone (see build_from_ids).
+    """
+    
+    def __init__(
+        self,
+        generate_fn: Callable[[List[Dict], str, int], List[Dict]],
+        path: str = "outputs/question_bank.db",
+        target_per_pool: int = 15,
+        low_watermark: int = 5,
+        recent_window: int = 50,
+        batch_size: int = 5,
+        chunks_per_prompt: int = 5,
+        max_workers: int = 2
+    ):
+        """
+        Initialize bank
+        
+        Args:
+            generate_fn: Generates questions from chunks at a difficulty
+            path: SQLite database file
+            target_per_pool: Questions per (topic, difficulty) the builder aims for
+            low_watermark: Refill a pool when fewer unseen questions remain
+            recent_window: Number of a user's most recently seen questions to exclude
+            batch_size: Questions requested per generation call
+            chunks_per_prompt: Chunks sampled into each generation call
+            max_workers: Concurrent background generation calls
+        """
+        self.generate_fn = generate_fn
+        self.path = path
+        self.target_per_pool = target_per_pool
+        self.low_watermark = low_watermark
+        self.recent_window = recent_window
+        self.batch_size = batch_size
+        self.chunks_per_prompt = chunks_per_prompt
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="question-bank")
+        self._lock = threading.Lock()
+        self._ids_by_topic = {}
+        self._load_chunks = None
+        self._materials = {}
+        self._pending = set()
+        
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS questions ("
+                "id INTEGER PRIMARY KEY, key TEXT UNIQUE NOT NULL, topic TEXT NOT NULL, "
+                "difficulty TEXT NOT NULL, payload TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_questions_pool ON questions (topic, difficulty)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS seen ("
+                "user TEXT NOT NULL, question_id INTEGER NOT NULL, seen_at REAL NOT NULL, "
+                "PRIMARY KEY (user, question_id))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_seen_recent ON seen (user, seen_at)")
+            conn.execute("CREATE TABLE IF NOT EXISTS materials (topic TEXT PRIMARY KEY, key TEXT NOT NULL)")
+    
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5)
+    
+    def build(self, chunks: List[Dict], difficulties: Iterable[str] = DIFFICULTIES):
+        """
+        Register the current study material and fill its pools in the background
+        
+        Pools for topics no longer in the material, or whose chunks changed,
+        are dropped along with their seen records. Returns immediately.
+        """
+        by_id = {}
+        ids_by_topic = {}
+        for chunk in chunks:
+            key = _chunk_key(chunk)
+            by_id[key] = chunk
+            ids_by_topic.setdefault(chunk.get('metadata', {}).get('topic', 'General'), []).append(key)
+        self.build_from_ids(ids_by_topic, lambda ids: [by_id[key] for key in ids], difficulties)
+    
+    @traced("question_bank.build")
+    def build_from_ids(
+        self,
+        ids_by_topic: Dict[str, List[str]],
+        load_chunks: Callable[[List[str]], List[Dict]],
+        difficulties: Iterable[str] = DIFFICULTIES
+    ):
+        """
+        Like build, for material held elsewhere (e.g. restored chunk metadata)
+        
+        Args:
+            ids_by_topic: Content-addressed chunk ids per topic
+            load_chunks: Returns chunk dicts for ids; called only for the
+                         sample each refill generates from
+            difficulties: Difficulties to fill pools for
+        """
+        materials = {topic: _material_key(ids) for topic, ids in ids_by_topic.items()}
+        
+        with self._lock:
+            self._ids_by_topic = {topic: list(ids) for topic, ids in ids_by_topic.items()}
+            self._load_chunks = load_chunks
+            self._materials = materials
+        
+        topics = list(ids_by_topic)
+        with self._lock, self._connect() as conn:
+            # Pools without a recorded material (older banks) count as stale
+            stored = dict(conn.execute("SELECT topic, key FROM materials"))
+            pooled = [row[0] for row in conn.execute("SELECT DISTINCT topic FROM questions")]
+            stale = [topic for topic in pooled if materials.get(topic) != stored.get(topic)]
+            placeholders = ','.join('?' * len(topics))
+            conn.execute(f"DELETE FROM questions WHERE topic NOT IN ({placeholders})", topics)
+            conn.executemany("DELETE FROM questions WHERE topic = ?", [(topic,) for topic in stale])
+            conn.execute("DELETE FROM seen WHERE question_id NOT IN (SELECT id FROM questions)")
+            conn.execute("DELETE FROM materials")
+            conn.executemany("INSERT INTO materials (topic, key) VALUES (?, ?)", materials.items())
+            counts = dict(
+                ((topic, difficulty), count) for topic, difficulty, count in conn.execute(
+                    "SELECT topic, difficulty, COUNT(*) FROM questions GROUP BY topic, difficulty"
+                )
+            )
+        
+        scheduled = 0
+        for topic in topics:
+            for difficulty in difficulties:
+                missing = self.target_per_pool - counts.get((topic, difficulty), 0)
+                if missing > 0:
+                    scheduled += self._schedule_refill(topic, difficulty, math.ceil(missing / self.batch_size))
+        current_span().set_attributes(topics=len(topics), stale=len(stale), refills=scheduled)
+    
+    @traced("question_bank.sample")
+    def sample(self, difficulty: str, num_questions: int, topics: Optional[List[str]] = None,
+               user: Optional[str] = None) -> List[Dict]:
+        """
+        Draw questions from the pool without waiting for generation
+        
+        Questions from the preferred topics come first; any shortfall is filled
+        from other topics at the same difficulty. The user's recently seen
+        questions are skipped and the returned ones are marked as seen. May
+        return fewer than num_questions while pools are still being built.
+        
+        Args:
+            difficulty: "easy", "medium", or "hard"
+            num_questions: Number of questions wanted
+            topics: Preferred topics (default: any)
+            user: User to exclude recent questions for (default: current user)
+        
+        Returns:
+            List of quiz question dictionaries
+        """
+        user = user or get_current_user() or "anonymous"
+        recent = (
+            "SELECT question_id FROM seen WHERE user = ? ORDER BY seen_at DESC LIMIT ?"
+        )
+        
+        with self._connect() as conn:
+            rows = []
+            if topics:
+                placeholders = ','.join('?' * len(topics))
+                rows = conn.execute(
+                    f"SELECT id, payload FROM questions WHERE difficulty = ? AND topic IN ({placeholders}) "
+                    f"AND id NOT IN ({recent}) ORDER BY RANDOM() LIMIT ?",
+                    (difficulty, *topics, user, self.recent_window, num_questions)
+                ).fetchall()
+            if len(rows) < num_questions:
+                chosen = [row[0] for row in rows]
+                rows += conn.execute(
+                    f"SELECT id, payload FROM questions WHERE difficulty = ? "
+                    f"AND id NOT IN ({recent}) AND id NOT IN ({','.join('?' * len(chosen))}) "
+                    f"ORDER BY RANDOM() LIMIT ?",
+                    (difficulty, user, self.recent_window, *chosen, num_questions - len(rows))
+                ).fetchall()
+            
+            now = time.time()
+            conn.executemany(
+                "INSERT OR REPLACE INTO seen (user, question_id, seen_at) VALUES (?, ?, ?)",
+                [(user, question_id, now) for question_id, _ in rows]
+            )
+            unseen = dict(conn.execute(
+                f"SELECT topic, COUNT(*) FROM questions WHERE difficulty = ? "
+                f"AND id NOT IN ({recent}) GROUP BY topic",
+                (difficulty, user, self.recent_window)
+            ).fetchall())
+        
+        # Top up pools this user is running through
+        with self._lock:
+            known_topics = list(self._ids_by_topic)
+        for topic in topics or known_topics:
+            if unseen.get(topic, 0) < self.low_watermark:
+                self._schedule_refill(topic, difficulty)
+        
+        get_metrics().counter("question_bank.served").inc(len(rows))
+        if len(rows) < num_questions:
+            get_metrics().counter("question_bank.shortfall").inc(num_questions - len(rows))
+        current_span().set_attributes(requested=num_questions, served=len(rows))
+        return [json.loads(payload) for _, payload in rows]
+    
+    def add(self, questions: List[Dict], difficulty: str, material: Optional[tuple] = None) -> Optional[int]:
+        """
+        Validate and store questions (duplicates ignored); returns number added
+        
+        If material is a (topic, material key) pair that is no longer current,
+        nothing is stored and None is returned.
+        """
+        records = [
+            (_question_key(q), q.get('topic') or 'General', difficulty, json.dumps(q, ensure_ascii=False), time.time())
+            for q in questions if _is_valid(q)
+        ]
+        with self._lock, self._connect() as conn:
+            if material is not None and self._materials.get(material[0]) != material[1]:
+                return None
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO questions (key, topic, difficulty, payload, created) VALUES (?, ?, ?, ?, ?)",
+                records
+            )
+            return conn.total_changes - before
+    
+    def pool_sizes(self) -> Dict[tuple, int]:
+        """Stored question count per (topic, difficulty)"""
+        with self._connect() as conn:
+            return {
+                (topic, difficulty): count for topic, difficulty, count in conn.execute(
+                    "SELECT topic, difficulty, COUNT(*) FROM questions GROUP BY topic, difficulty"
+                )
+            }
+    
+    def _schedule_refill(self, topic: str, difficulty: str, rounds: int = 1) -> int:
+        """Queue one background refill per pool at a time; returns 1 if queued"""
+        with self._lock:
+            if (topic, difficulty) in self._pending or topic not in self._ids_by_topic:
+                return 0
+            self._pending.add((topic, difficulty))
+        self._executor.submit(contextvars.copy_context().run, self._refill, topic, difficulty, rounds)
+        return 1
+    
+    @traced("question_bank.refill")
+    def _refill(self, topic: str, difficulty: str, rounds: int):
+        try:
+            with self._lock:
+                ids = self._ids_by_topic.get(topic, [])
+                load_chunks = self._load_chunks
+                material = self._materials.get(topic)
+            added = 0
+            for _ in range(rounds if ids else 0):
+                # A different sample each time so refills (and LLM cache keys) vary
+                sample = load_chunks(random.sample(ids, min(self.chunks_per_prompt, len(ids))))
+                if not sample:
+                    break  # the material was replaced while this refill waited
+                questions = self.generate_fn(sample, difficulty, self.batch_size)
+                for question in questions:
+                    # Pool by the topic the chunks came from, not the model's label
+                    question['topic'] = topic
+                    question['difficulty'] = difficulty
+                new = self.add(questions, difficulty, material=(topic, material))
+                if new is None:
+                    break  # the topic's material changed while generating
+                if not new:
+                    break  # generator is only repeating itself
+                added += new
+            get_metrics().counter("question_bank.generated").inc(added)
+            current_span().set_attributes(topic=topic, difficulty=difficulty, added=added)
+        except Exception as e:
+            logger.warning("Question bank refill for %s/%s failed: %s", topic, difficulty, e)
+        finally:
+            with self._lock:
+                self._pending.discard((topic, difficulty))
+    
+    def wait(self, timeout: float = 60.0) -> bool:
+        """Block until no refills are pending (for benchmarks and scripts); False on timeout"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                if not self._pending:
+                    return True
+            time.sleep(0.01)
+        return False
+    
+    def close(self):
+        """Stop background refills"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def create_question_bank(generate_fn: Callable[[List[Dict], str, int], List[Dict]]) -> Optional[QuestionBank]:
+    """Question bank configured from QUESTION_BANK_* env vars (None if QUESTION_BANK_PATH is empty)"""
+    path = os.getenv("QUESTION_BANK_PATH", "outputs/question_bank.db")
+    if not path:
+        return None
+    return QuestionBank(
+        generate_fn,
+        path=path,
+        target_per_pool=int(os.getenv("QUESTION_BANK_TARGET", "15")),
+        low_watermark=int(os.getenv("QUESTION_BANK_LOW_WATERMARK", "5")),
+        recent_window=int(os.getenv("QUESTION_BANK_RECENT", "50"))
+    )
@@ -6,9 +6,11 @@ Implements Retrieval-Augmented Generation for question answering
 import os
 from pathlib import Path
 from typing import List, Dict, Optional
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import HumanMessage, SystemMessage
 from dotenv import load_dotenv
+from llm_gateway import get_llm_gateway
+from utils.llm_scheduler import INTERACTIVE
+from utils.tracing import get_tracer, traced
 
 # Load .env file from project root
 env_path = Path(__file__).parent / '.env'
@@ -84,11 +86,7 @@ class RAGPipeline:
                 "Format: GOOGLE_API_KEY=your_api_key_here"
             )
         
-        self.llm = ChatGoogleGenerativeAI(
-            model=model_name,
-            temperature=temperature,
-            google_api_key=api_key
-        )
+        self.llm = get_llm_gateway().bind(model_name, temperature=temperature, api_key=api_key, caller="rag_pipeline", cache=False, priority=INTERACTIVE)
     
     def _format_context(self, retrieved_chunks: List[Dict]) -> str:
         """Format retrieved chunks into context string"""
@@ -145,6 +143,7 @@ Please provide a helpful answer based ONLY on the context above, or state that t
         
         return system_prompt, user_prompt
     
+    @traced("rag.answer_question")
     def answer_question(self, question: str, n_chunks: int = 5, summarize: bool = False, allow_general: bool = True, prioritize_source: Optional[str] = None) -> Dict:
         """
         Answer a question using RAG
@@ -164,26 +163,30 @@ Please provide a helpful answer based ONLY on the context above, or state that t
         
         # Filter chunks by relevance (distance threshold - lower is better)
         # Only keep chunks with distance < 0.8 (more similar = lower distance)
-        relevant_chunks = []
-        for chunk in retrieved_chunks:
-            distance = chunk.get('distance', 1.0)
-            # Cosine distance: 0 = identical, 1 = completely different
-            # Keep chunks with distance < 0.8 (reasonably relevant)
-            if distance is not None and distance < 0.8:
-                relevant_chunks.append(chunk)
-        
-        # If no relevant chunks found, use all chunks but warn
-        if not relevant_chunks and retrieved_chunks:
-            relevant_chunks = retrieved_chunks[:3]  # Use top 3 even if not very relevant
-        
-        # Format context (even if empty, we'll handle it)
-        if relevant_chunks:
-            context = self._format_context(relevant_chunks)
-        else:
-            context = "No relevant information found in the available documents."
+        with get_tracer().span("rag.filter", retrieved=len(retrieved_chunks)) as span:
+            relevant_chunks = []
+            for chunk in retrieved_chunks:
+                distance = chunk.get('distance', 1.0)
+                # Cosine distance: 0 = identical, 1 = completely different
+                # Keep chunks with distance < 0.8 (reasonably relevant)
+                if distance is not None and distance < 0.8:
+                    relevant_chunks.append(chunk)
+            
+            # If no relevant chunks found, use all chunks but warn
+            if not relevant_chunks and retrieved_chunks:
+                relevant_chunks = retrieved_chunks[:3]  # Use top 3 even if not very relevant
+            span.set_attribute("relevant", len(relevant_chunks))
         
-        # Create prompt
-        system_prompt, user_prompt = self._create_prompt(question, context, summarize, allow_general)
+        with get_tracer().span("rag.build_prompt") as span:
+            # Format context (even if empty, we'll handle it)
+            if relevant_chunks:
+                context = self._format_context(relevant_chunks)
+            else:
+                context = "No relevant information found in the available documents."
+            
+            # Create prompt
+            system_prompt, user_prompt = self._create_prompt(question, context, summarize, allow_general)
+            span.set_attribute("context_chars", len(context))
         
         # If no chunks and general answers not allowed, return early
         if not relevant_chunks and not allow_general:
@@ -213,7 +216,9 @@ Please provide a helpful answer based ONLY on the context above, or state that t
             'chunks': relevant_chunks
         }
     
-    def answer_multi_document_question(self, question: str, n_chunks: int = 8, allow_general: bool = True) -> Dict:
+    @traced("rag.answer_multi_document_question")
+    def answer_multi_document_question(self, question: str, n_chunks: int = 8, allow_general: bool = True,
+                                       query_embedding: Optional[List[float]] = None) -> Dict:
         """
         Answer questions that may require information from multiple documents
         
@@ -221,12 +226,13 @@ Please provide a helpful answer based ONLY on the context above, or state that t
             question: User's question
             n_chunks: Number of chunks to retrieve (increased for multi-doc)
             allow_general: Whether to allow general answers when documents don't have info
+            query_embedding: Precomputed embedding of question (skips embedding it again)
             
         Returns:
             Dict with 'answer', 'sources', and 'chunks' keys
         """
         # Retrieve more chunks for multi-document synthesis
-        retrieved_chunks = self.vector_store.search(question, n_results=n_chunks)
+        retrieved_chunks = self.vector_store.search(question, n_results=n_chunks, query_embedding=query_embedding)
         
         # Filter chunks by relevance (distance threshold)
         relevant_chunks = []
@@ -0,0 +1,345 @@
+"""
+Reminder Scheduler
+Pushes deadline reminders to opted-in users from a timer heap
+
+Reminders fire a configurable number of days before each deadline. The heap
+holds (fire_time, user, deadline, offset) entries for deadlines inside a
+rolling horizon. Deadline and preference changes, including those made by
+other processes, are picked up incrementally. Delivered reminders are
+recorded in storage, so a restart neither repeats nor loses them.
+
+Run as a service:
+    python reminder_scheduler.py --file outputs/reminders.jsonl
+"""
+
+import os
+import json
+import time
+import heapq
+import queue
+import logging
+import argparse
+import threading
+import urllib.request
+from datetime import date, datetime, timedelta
+from typing import List, Dict, Optional, Tuple
+
+from alerts_manager import AlertsManager
+from utils.deadline_index import DeadlineFilter
+from utils.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class ReminderSink:
+    """Destination for due reminders"""
+    
+    def send(self, reminder: Dict):
+        raise NotImplementedError
+
+
+class FileSink(ReminderSink):
+    """Appends reminders to a JSON Lines file"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+    
+    def send(self, reminder: Dict):
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(reminder, ensure_ascii=False) + "\n")
+
+
+class QueueSink(ReminderSink):
+    """Puts reminders on a queue for an in-process consumer"""
+    
+    def __init__(self, target: Optional[queue.Queue] = None):
+        self.queue = target if target is not None else queue.Queue()
+    
+    def send(self, reminder: Dict):
+        self.queue.put(reminder)
+
+
+class WebhookSink(ReminderSink):
+    """POSTs each reminder as JSON to a URL (e.g. a local notification relay)"""
+    
+    def __init__(self, url: str, timeout: float = 5.0):
+        self.url = url
+        self.timeout = timeout
+    
+    def send(self, reminder: Dict):
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps(reminder).encode('utf-8'),
+            headers={'Content-Type': 'application/json'},
+            method='POST'
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+class ReminderScheduler:
+    """
+    Timer heap of reminder entries for every opted-in user
+    
+    Users who never changed their alert settings are enabled by default but
+    cannot be enumerated, so only users with a stored preference or
+    subscription receive pushed reminders. Entries are invalidated lazily:
+    a popped entry is dropped if its deadline is gone, its user's settings
+    changed since it was queued, or it was already delivered.
+    """
+    
+    def __init__(
+        self,
+        sink: ReminderSink,
+        alerts_manager: Optional[AlertsManager] = None,
+        offsets_days: Tuple[int, ...] = (7, 1, 0),
+        hour: int = 9,
+        horizon_days: int = 14,
+        poll_seconds: float = 30.0,
+        clock=time.time
+    ):
+        """
+        Initialize scheduler (call start() or run_pending() to deliver)
+        
+        Args:
+            sink: Where due reminders are sent
+            alerts_manager: Source of deadlines and user settings (default: shared storage)
+            offsets_days: Days before a deadline to send a reminder
+            hour: Local hour of day reminders fire at
+            horizon_days: Deadlines this far beyond the largest offset are queued ahead
+            poll_seconds: How often to check storage for changes made elsewhere
+            clock: Time source in epoch seconds (replaceable for simulations)
+        """
+        self.sink = sink
+        self.alerts = alerts_manager or AlertsManager()
+        self.storage = self.alerts.storage
+        self.offsets_days = tuple(sorted(set(offsets_days), reverse=True))
+        self.hour = hour
+        self.horizon_days = horizon_days
+        self.poll_seconds = poll_seconds
+        self.clock = clock
+        
+        self._heap = []
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._stopped = False
+        self._thread = None
+        
+        self._deadlines = {}
+        self._users = {}
+        self._generations = {}
+        self._sent = set()
+        self._horizon_end = None
+        self._versions = (None, None)
+    
+    def _today(self) -> date:
+        return datetime.fromtimestamp(self.clock()).date()
+    
+    def _fire_time(self, deadline_date: date, offset: int) -> float:
+        return datetime.combine(deadline_date - timedelta(days=offset), datetime.min.time()).replace(hour=self.hour).timestamp()
+    
+    def _push(self, user: str, record: Dict, now: float):
+        """Queue one user's reminders for a deadline (only the latest one already overdue)"""
+        deadline_date = datetime.fromisoformat(record['date']).date()
+        if deadline_date < datetime.fromtimestamp(now).date():
+            return
+        overdue_queued = False
+        # Smallest offset first, so only the most recent overdue reminder is caught up
+        for offset in reversed(self.offsets_days):
+            if (user, record['date'], offset) in self._sent:
+                break
+            fire_time = self._fire_time(deadline_date, offset)
+            if fire_time <= now:
+                if overdue_queued:
+                    continue
+                overdue_queued = True
+            self._sequence += 1
+            heapq.heappush(self._heap, (fire_time, self._sequence, user, record['date'], offset, self._generations[user]))
+    
+    def _queue_user(self, user: str, records: List[Dict], now: float):
+        settings = self._users.get(user)
+        if not settings or not settings['enabled']:
+            return
+        deadline_filter = DeadlineFilter(settings['source'], settings['keyword'])
+        for record in records:
+            if deadline_filter.matches(record):
+                self._push(user, record, now)
+    
+    def _window(self, start: date, end: date) -> List[Dict]:
+        return self.alerts.get_deadline_index().window(start, end)
+    
+    def refresh(self):
+        """Rebuild the heap from storage (on start and after restarts)"""
+        with self._lock:
+            now = self.clock()
+            today = self._today()
+            self._versions = (self.storage.get_version('deadlines'), self.storage.get_version('alert_users'))
+            self._horizon_end = today + timedelta(days=self.offsets_days[0] + self.horizon_days)
+            records = self._window(today, self._horizon_end)
+            self._deadlines = {record['date']: record for record in records}
+            self._users = self.storage.get_alert_users()
+            self._sent = self.storage.get_sent_reminders(today.isoformat())
+            self._heap = []
+            for user in self._users:
+                self._generations[user] = self._generations.get(user, 0) + 1
+                self._queue_user(user, records, now)
+            self._wakeup.notify()
+        get_metrics().gauge("reminders.queued").set(len(self._heap))
+    
+    def check_changes(self):
+        """Apply deadline and preference changes made since the last check (cheap when nothing changed)"""
+        if self._horizon_end is None:
+            self.refresh()
+            return
+        versions = (self.storage.get_version('deadlines'), self.storage.get_version('alert_users'))
+        with self._lock:
+            now = self.clock()
+            today = self._today()
+            new_records = []
+            
+            horizon_end = today + timedelta(days=self.offsets_days[0] + self.horizon_days)
+            # Past deadlines need no more reminders
+            self._deadlines = {key: record for key, record in self._deadlines.items() if key >= today.isoformat()}
+            if versions[0] != self._versions[0]:
+                # Deadlines are only ever added or cleared: queue the new ones, drop the missing lazily
+                records = {record['date']: record for record in self._window(today, self._horizon_end)}
+                new_records = [record for key, record in records.items() if key not in self._deadlines]
+                self._deadlines = records
+            if horizon_end > self._horizon_end:
+                # Roll the horizon forward a day at a time
+                extension = self._window(self._horizon_end + timedelta(days=1), horizon_end)
+                self._deadlines.update((record['date'], record) for record in extension)
+                new_records += extension
+                self._horizon_end = horizon_end
+            
+            changed_users = set()
+            if versions[1] != self._versions[1]:
+                users = self.storage.get_alert_users()
+                changed_users = {user for user in set(users) | set(self._users) if users.get(user) != self._users.get(user)}
+                self._users = users
+            
+            for user in changed_users:
+                # Invalidate this user's queued entries and requeue under the new settings
+                self._generations[user] = self._generations.get(user, 0) + 1
+                self._queue_user(user, list(self._deadlines.values()), now)
+            for user in self._users:
+                if user not in changed_users:
+                    self._queue_user(user, new_records, now)
+            
+            self._versions = versions
+            if new_records or changed_users:
+                self._wakeup.notify()
+    
+    def run_pending(self) -> int:
+        """Send every reminder that is due; returns how many were sent"""
+        due = {}
+        with self._lock:
+            now = self.clock()
+            today = self._today().isoformat()
+            while self._heap and self._heap[0][0] <= now:
+                fire_time, _, user, deadline_date, offset, generation = heapq.heappop(self._heap)
+                key = (user, deadline_date, offset)
+                record = self._deadlines.get(deadline_date)
+                if record is None or deadline_date < today or generation != self._generations.get(user) or key in self._sent:
+                    continue
+                self._sent.add(key)
+                # If several reminders for one deadline are due at once (e.g. after a pause), send the latest only
+                previous = due.get((user, deadline_date))
+                if previous is None or offset < previous[0][2]:
+                    due[(user, deadline_date)] = (key, fire_time, record)
+        
+        sent = 0
+        for (user, deadline_date, offset), fire_time, record in due.values():
+            reminder = {
+                'user': user,
+                'date': deadline_date,
+                'event': record.get('event'),
+                'source': record.get('source'),
+                'days_before': offset,
+                'scheduled_for': datetime.fromtimestamp(fire_time).isoformat()
+            }
+            try:
+                self.sink.send(reminder)
+            except Exception as e:
+                # Not recorded as sent, so it is retried after the next restart
+                logger.warning("Reminder delivery to %s failed: %s", user, e)
+                get_metrics().counter("reminders.failed").inc()
+                continue
+            self.storage.mark_reminder_sent(user, deadline_date, offset)
+            sent += 1
+        if sent:
+            get_metrics().counter("reminders.sent").inc(sent)
+        return sent
+    
+    def next_fire_time(self) -> Optional[float]:
+        """When the earliest queued reminder is due"""
+        with self._lock:
+            return self._heap[0][0] if self._heap else None
+    
+    def wake(self):
+        """Re-check storage now (after changing deadlines or preferences in this process)"""
+        with self._lock:
+            self._versions = (None, None)
+            self._wakeup.notify()
+    
+    def _run(self):
+        self.refresh()
+        self.storage.prune_sent_reminders(self._today().isoformat())
+        while True:
+            self.check_changes()
+            self.run_pending()
+            with self._lock:
+                if self._stopped:
+                    return
+                timeout = self.poll_seconds
+                if self._heap:
+                    timeout = max(0.0, min(timeout, self._heap[0][0] - self.clock()))
+                self._wakeup.wait(timeout)
+                if self._stopped:
+                    return
+    
+    def start(self):
+        """Deliver reminders from a background thread"""
+        if self._thread is None:
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name="reminder-scheduler", daemon=True)
+            self._thread.start()
+        return self
+    
+    def stop(self):
+        """Stop the background thread"""
+        with self._lock:
+            self._stopped = True
+            self._wakeup.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--file", default="outputs/reminders.jsonl", help="JSON Lines file to append reminders to")
+    parser.add_argument("--webhook", help="POST reminders to this URL instead")
+    parser.add_argument("--offsets", default=os.getenv("REMINDER_OFFSETS_DAYS", "7,1,0"), help="Days before a deadline")
+    parser.add_argument("--hour", type=int, default=int(os.getenv("REMINDER_HOUR", "9")))
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    
+    sink = WebhookSink(args.webhook) if args.webhook else FileSink(args.file)
+    offsets = tuple(int(offset) for offset in args.offsets.split(','))
+    scheduler = ReminderScheduler(sink, offsets_days=offsets, hour=args.hour).start()
+    logger.info("Reminder scheduler running (offsets %s days, %02d:00)", offsets, args.hour)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        scheduler.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,464 @@
+"""
+Storage
+SQLite (WAL) persistence for flashcards, quizzes, revision plans and alerts
+
+Rows are keyed per user, so concurrent Streamlit sessions write their own rows
+in short transactions instead of rewriting shared JSON files. Existing JSON
+files are imported once on first use.
+"""
+
+import os
+import json
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Optional, Iterable, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_USER = "default"
+
+# Owner of per-user rows. This must be a stable identity: the per-session id
+# used for LLM scheduling changes on every refresh, so until an explicit user
+# id is configured all sessions share DEFAULT_USER (single-tenant, as with JSON)
+_data_user: ContextVar[str] = ContextVar("data_user", default=DEFAULT_USER)
+
+
+def set_data_user(user_id: Optional[str]):
+    """Own the rows read and written in the current context by user_id (None: DEFAULT_USER)"""
+    _data_user.set(user_id or DEFAULT_USER)
+
+
+def get_data_user() -> str:
+    return _data_user.get()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS flashcards (
+    user TEXT NOT NULL, key TEXT NOT NULL, topic TEXT, payload TEXT NOT NULL, created TEXT NOT NULL,
+    PRIMARY KEY (user, key)
+);
+CREATE INDEX IF NOT EXISTS idx_flashcards_topic ON flashcards (user, topic);
+CREATE TABLE IF NOT EXISTS flashcard_chunks (
+    user TEXT NOT NULL, chunk_id TEXT NOT NULL, card_set TEXT,
+    PRIMARY KEY (user, chunk_id)
+);
+CREATE TABLE IF NOT EXISTS quiz_questions (
+    user TEXT NOT NULL, position INTEGER NOT NULL, payload TEXT NOT NULL, created TEXT NOT NULL,
+    PRIMARY KEY (user, position)
+);
+CREATE TABLE IF NOT EXISTS plan_items (
+    user TEXT NOT NULL, date TEXT NOT NULL, topic TEXT NOT NULL, position INTEGER NOT NULL,
+    status TEXT NOT NULL, payload TEXT NOT NULL,
+    PRIMARY KEY (user, date, topic)
+);
+CREATE INDEX IF NOT EXISTS idx_plan_items_position ON plan_items (user, position);
+CREATE TABLE IF NOT EXISTS plan_progress (
+    user TEXT NOT NULL, topic TEXT NOT NULL, payload TEXT NOT NULL,
+    PRIMARY KEY (user, topic)
+);
+CREATE TABLE IF NOT EXISTS deadlines (
+    date TEXT PRIMARY KEY, event TEXT, source TEXT, context TEXT
+);
+CREATE TABLE IF NOT EXISTS alert_users (
+    user TEXT PRIMARY KEY, enabled INTEGER NOT NULL, updated TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS alert_subscriptions (
+    user TEXT NOT NULL, kind TEXT NOT NULL, value TEXT NOT NULL,
+    PRIMARY KEY (user, kind, value)
+);
+CREATE TABLE IF NOT EXISTS reminders_sent (
+    user TEXT NOT NULL, date TEXT NOT NULL, offset_days INTEGER NOT NULL, sent_at TEXT NOT NULL,
+    PRIMARY KEY (user, date, offset_days)
+);
+CREATE INDEX IF NOT EXISTS idx_reminders_sent_date ON reminders_sent (date);
+CREATE TABLE IF NOT EXISTS versions (
+    name TEXT PRIMARY KEY, value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS migrations (
+    name TEXT PRIMARY KEY, applied TEXT NOT NULL
+);
+"""
+
+
+def flashcard_key(card: Dict) -> str:
+    """Identity of a flashcard (normalized question text)"""
+    return ' '.join(card['question'].lower().split())
+
+
+class Storage:
+    """
+    Per-user application data in one SQLite database
+    
+    Every write is a single transaction touching only the rows it changes.
+    Methods default to the current data user (set_data_user; DEFAULT_USER unless
+    an explicit user id is configured).
+    """
+    
+    def __init__(self, path: str = "outputs/campus_compass.db"):
+        """
+        Initialize storage (creates tables)
+        
+        Args:
+            path: SQLite database file
+        """
+        self.path = path
+        self._local = threading.local()
+        
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        # Databases created before chunks recorded the card set that covered them
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(flashcard_chunks)")}
+        if 'card_set' not in columns:
+            conn.execute("ALTER TABLE flashcard_chunks ADD COLUMN card_set TEXT")
+    
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread (autocommit; transactions are explicit)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+    
+    @contextmanager
+    def _transaction(self):
+        """Write transaction (takes the write lock up front to avoid upgrade deadlocks)"""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+    
+    def _query(self, sql: str, params: Iterable = ()) -> List[Tuple]:
+        return self._connection().execute(sql, tuple(params)).fetchall()
+    
+    @staticmethod
+    def _user(user: Optional[str]) -> str:
+        return user or get_data_user()
+    
+    # Flashcards
+    
+    def get_flashcards(self, user: Optional[str] = None) -> List[Dict]:
+        """All flashcards of a user, oldest first"""
+        rows = self._query(
+            "SELECT payload FROM flashcards WHERE user = ? ORDER BY created, rowid", (self._user(user),)
+        )
+        return [json.loads(payload) for (payload,) in rows]
+    
+    def add_flashcards(self, flashcards: List[Dict], user: Optional[str] = None):
+        """Insert flashcards, replacing any with the same question"""
+        user = self._user(user)
+        now = datetime.now().isoformat()
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO flashcards (user, key, topic, payload, created) VALUES (?, ?, ?, ?, ?)",
+                [(user, flashcard_key(card), card.get('topic'), json.dumps(card, ensure_ascii=False), now) for card in flashcards]
+            )
+    
+    def remove_flashcards(self, flashcards: List[Dict], user: Optional[str] = None):
+        """Delete flashcards by question"""
+        user = self._user(user)
+        with self._transaction() as conn:
+            conn.executemany(
+                "DELETE FROM flashcards WHERE user = ? AND key = ?",
+                [(user, flashcard_key(card)) for card in flashcards]
+            )
+    
+    def get_flashcard_chunks(self, user: Optional[str] = None) -> Dict[str, Optional[str]]:
+        """Ids of chunks flashcards have already been generated for, with the card set that covered each"""
+        return dict(self._query(
+            "SELECT chunk_id, card_set FROM flashcard_chunks WHERE user = ?", (self._user(user),)
+        ))
+    
+    def update_flashcard_chunks(self, added: Iterable[str], removed: Iterable[str] = (), user: Optional[str] = None):
+        """
+        Record chunks as generated for (added) or forget them (removed)
+        
+        added is either chunk ids or a {chunk_id: card_set} mapping.
+        """
+        user = self._user(user)
+        added = added.items() if isinstance(added, dict) else ((cid, None) for cid in added)
+        with self._transaction() as conn:
+            conn.executemany(
+                "DELETE FROM flashcard_chunks WHERE user = ? AND chunk_id = ?", [(user, cid) for cid in removed]
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO flashcard_chunks (user, chunk_id, card_set) VALUES (?, ?, ?)",
+                [(user, cid, card_set) for cid, card_set in added]
+            )
+    
+    # Quizzes
+    
+    def get_quiz(self, user: Optional[str] = None) -> List[Dict]:
+        """A user's latest quiz"""
+        rows = self._query(
+            "SELECT payload FROM quiz_questions WHERE user = ? ORDER BY position", (self._user(user),)
+        )
+        return [json.loads(payload) for (payload,) in rows]
+    
+    def save_quiz(self, questions: List[Dict], user: Optional[str] = None):
+        """Replace a user's latest quiz"""
+        user = self._user(user)
+        now = datetime.now().isoformat()
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM quiz_questions WHERE user = ?", (user,))
+            conn.executemany(
+                "INSERT INTO quiz_questions (user, position, payload, created) VALUES (?, ?, ?, ?)",
+                [(user, i, json.dumps(q, ensure_ascii=False), now) for i, q in enumerate(questions)]
+            )
+    
+    # Revision plan
+    
+    def get_plan(self, user: Optional[str] = None) -> Tuple[List[Dict], Dict]:
+        """A user's revision plan items (in order) and per-topic progress"""
+        user = self._user(user)
+        items = []
+        for status, payload in self._query(
+            "SELECT status, payload FROM plan_items WHERE user = ? ORDER BY position", (user,)
+        ):
+            item = json.loads(payload)
+            item['status'] = status
+            items.append(item)
+        progress = {
+            topic: json.loads(payload) for topic, payload in self._query(
+                "SELECT topic, payload FROM plan_progress WHERE user = ?", (user,)
+            )
+        }
+        return items, progress
+    
+    def save_plan(self, plan: List[Dict], progress: Dict, user: Optional[str] = None):
+        """Replace a user's revision plan and progress"""
+        user = self._user(user)
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM plan_items WHERE user = ?", (user,))
+            conn.execute("DELETE FROM plan_progress WHERE user = ?", (user,))
+            conn.executemany(
+                "INSERT OR REPLACE INTO plan_items (user, date, topic, position, status, payload) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (user, item['date'], item['topic'], i, item.get('status', 'pending'), json.dumps(item, ensure_ascii=False))
+                    for i, item in enumerate(plan)
+                ]
+            )
+            conn.executemany(
+                "INSERT INTO plan_progress (user, topic, payload) VALUES (?, ?, ?)",
+                [(user, topic, json.dumps(data, ensure_ascii=False)) for topic, data in progress.items()]
+            )
+    
+    def update_plan_item(self, date: str, topic: str, status: str, progress: Optional[Dict] = None,
+                         user: Optional[str] = None):
+        """Set one plan item's status (and its topic's progress) without touching other rows"""
+        user = self._user(user)
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE plan_items SET status = ? WHERE user = ? AND date = ? AND topic = ?",
+                (status, user, date, topic)
+            )
+            if progress is not None:
+                conn.execute(
+                    "INSERT OR REPLACE INTO plan_progress (user, topic, payload) VALUES (?, ?, ?)",
+                    (user, topic, json.dumps(progress, ensure_ascii=False))
+                )
+    
+    def update_plan_items(self, items: Dict[int, Dict], progress: Optional[Dict] = None,
+                          user: Optional[str] = None):
+        """Rewrite plan items by position (their topic may have changed) and some topics' progress"""
+        user = self._user(user)
+        with self._transaction() as conn:
+            conn.executemany(
+                "DELETE FROM plan_items WHERE user = ? AND position = ?",
+                [(user, position) for position in items]
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO plan_items (user, date, topic, position, status, payload) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (user, item['date'], item['topic'], position, item.get('status', 'pending'), json.dumps(item, ensure_ascii=False))
+                    for position, item in items.items()
+                ]
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO plan_progress (user, topic, payload) VALUES (?, ?, ?)",
+                [(user, topic, json.dumps(data, ensure_ascii=False)) for topic, data in (progress or {}).items()]
+            )
+    
+    # Alerts
+    
+    def get_deadlines(self, start: Optional[str] = None, end: Optional[str] = None) -> List[Dict]:
+        """Deadlines with start <= ISO date < end (both optional), in date order"""
+        sql = "SELECT date, event, source, context FROM deadlines WHERE date >= ?"
+        params = [start or '']
+        if end is not None:
+            sql += " AND date < ?"
+            params.append(end)
+        rows = self._query(sql + " ORDER BY date", params)
+        return [dict(zip(('date', 'event', 'source', 'context'), row)) for row in rows]
+    
+    def add_deadlines(self, deadlines: List[Dict]) -> int:
+        """Insert deadlines (the first one stored for a date wins); returns number added"""
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO deadlines (date, event, source, context) VALUES (?, ?, ?, ?)",
+                [(d['date'], d.get('event'), d.get('source'), d.get('context')) for d in deadlines]
+            )
+            added = conn.total_changes - before
+            if added:
+                self._bump_version(conn, 'deadlines')
+            return added
+    
+    def clear_deadlines(self):
+        """Remove all deadlines"""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM deadlines")
+            self._bump_version(conn, 'deadlines')
+    
+    def get_deadlines_version(self) -> int:
+        """Changes whenever deadlines are added or cleared (lets callers cache them)"""
+        return self.get_version('deadlines')
+    
+    def get_version(self, name: str) -> int:
+        """Change counter of a table group ('deadlines' or 'alert_users')"""
+        rows = self._query("SELECT value FROM versions WHERE name = ?", (name,))
+        return rows[0][0] if rows else 0
+    
+    @staticmethod
+    def _bump_version(conn: sqlite3.Connection, name: str):
+        conn.execute(
+            "INSERT INTO versions (name, value) VALUES (?, 1) ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,)
+        )
+    
+    def get_alert_preference(self, user: Optional[str] = None) -> Optional[Dict]:
+        """A user's alert setting ({'enabled', 'updated'}), or None if never set"""
+        rows = self._query("SELECT enabled, updated FROM alert_users WHERE user = ?", (self._user(user),))
+        if not rows:
+            return None
+        enabled, updated = rows[0]
+        return {'enabled': bool(enabled), 'updated': updated}
+    
+    def set_alert_preference(self, enabled: bool, user: Optional[str] = None):
+        """Opt a user in or out of alerts (one row)"""
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO alert_users (user, enabled, updated) VALUES (?, ?, ?)",
+                (self._user(user), int(enabled), datetime.now().isoformat())
+            )
+            self._bump_version(conn, 'alert_users')
+    
+    def get_alert_subscriptions(self, user: Optional[str] = None) -> Dict[str, set]:
+        """A user's subscribed deadline sources and keywords"""
+        subscriptions = {'source': set(), 'keyword': set()}
+        for kind, value in self._query(
+            "SELECT kind, value FROM alert_subscriptions WHERE user = ?", (self._user(user),)
+        ):
+            subscriptions.setdefault(kind, set()).add(value)
+        return subscriptions
+    
+    def set_alert_subscriptions(self, sources: Iterable[str] = (), keywords: Iterable[str] = (),
+                                user: Optional[str] = None):
+        """Replace a user's subscriptions (none: every deadline)"""
+        user = self._user(user)
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM alert_subscriptions WHERE user = ?", (user,))
+            conn.executemany(
+                "INSERT OR IGNORE INTO alert_subscriptions (user, kind, value) VALUES (?, ?, ?)",
+                [(user, 'source', source) for source in sources] + [(user, 'keyword', keyword) for keyword in keywords]
+            )
+            self._bump_version(conn, 'alert_users')
+    
+    def get_alert_users(self) -> Dict[str, Dict]:
+        """Every user with an alert setting or subscriptions: {'enabled', 'source', 'keyword'} per user"""
+        users = {}
+        for user, enabled in self._query("SELECT user, enabled FROM alert_users"):
+            users[user] = {'enabled': bool(enabled), 'source': set(), 'keyword': set()}
+        for user, kind, value in self._query("SELECT user, kind, value FROM alert_subscriptions"):
+            entry = users.setdefault(user, {'enabled': True, 'source': set(), 'keyword': set()})
+            entry.setdefault(kind, set()).add(value)
+        return users
+    
+    def get_sent_reminders(self, since: str = '') -> set:
+        """(user, date, offset_days) of reminders sent for deadlines dated since (ISO) or later"""
+        return set(self._query(
+            "SELECT user, date, offset_days FROM reminders_sent WHERE date >= ?", (since,)
+        ))
+    
+    def mark_reminder_sent(self, user: str, date: str, offset_days: int):
+        """Record a delivered reminder so it is not sent again after a restart"""
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO reminders_sent (user, date, offset_days, sent_at) VALUES (?, ?, ?, ?)",
+                (user, date, offset_days, datetime.now().isoformat())
+            )
+    
+    def prune_sent_reminders(self, before: str):
+        """Forget reminders for deadlines dated before (ISO)"""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM reminders_sent WHERE date < ?", (before,))
+    
+    # Migration
+    
+    def migrate_json(self, outputs_dir: str = "outputs", alerts_file: str = "alerts.json"):
+        """
+        Import the JSON files written by earlier versions (once)
+        
+        Flashcards, the latest quiz and the revision plan go to the default
+        user; deadlines and alert preferences are imported as they are. The
+        JSON files are left in place.
+        """
+        if self._query("SELECT 1 FROM migrations WHERE name = 'json'"):
+            return
+        
+        def read(path: Path, default):
+            if not path.exists():
+                return default
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                logger.warning("Skipping %s during migration: %s", path, e)
+                return default
+        
+        outputs = Path(outputs_dir)
+        flashcards = [card for card in read(outputs / "flashcards.json", []) if card.get('question')]
+        self.add_flashcards(flashcards, DEFAULT_USER)
+        self.update_flashcard_chunks(read(outputs / "flashcard_chunks.json", []), user=DEFAULT_USER)
+        self.save_quiz(read(outputs / "quizzes.json", []), DEFAULT_USER)
+        planner = read(outputs / "planner.json", {})
+        self.save_plan(planner.get('revision_plan', []), planner.get('progress', {}), DEFAULT_USER)
+        
+        alerts = read(Path(alerts_file), {})
+        self.add_deadlines([d for d in alerts.get('deadlines', []) if d.get('date')])
+        for user, prefs in alerts.get('users', {}).items():
+            self.set_alert_preference(prefs.get('enabled', True), user)
+        
+        # Marked last: an interrupted import is simply redone (every step is idempotent)
+        with self._transaction() as conn:
+            conn.execute("INSERT OR IGNORE INTO migrations (name, applied) VALUES ('json', ?)", (datetime.now().isoformat(),))
+        logger.info("Imported %d flashcards and %d plan items from JSON", len(flashcards), len(planner.get('revision_plan', [])))
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage() -> Storage:
+    """Process-wide storage at STORAGE_PATH (default outputs/campus_compass.db), migrating JSON on first use"""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                storage = Storage(os.getenv("STORAGE_PATH", "outputs/campus_compass.db"))
+                storage.migrate_json()
+                _storage = storage
+    return _storage
@@ -0,0 +1,60 @@
+"""Concurrent embedding callers share one loop, rate limit and retry policy"""
+
+import asyncio
+import threading
+import time
+
+from utils.async_embeddings import AsyncEmbeddingClient
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+
+def test_callers_share_loop_and_rate_limit():
+    loops = set()
+    
+    async def embed_batch(batch):
+        loops.add(asyncio.get_running_loop())
+        return [[float(len(text))] for text in batch]
+    
+    client = AsyncEmbeddingClient(embed_batch, max_batch_size=1, requests_per_second=20)
+    results = {}
+    
+    def caller(n):
+        results[n] = client.embed([f"text {n} {i}" for i in range(10)])
+    
+    start = time.perf_counter()
+    threads = [threading.Thread(target=caller, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    client.close()
+    
+    assert len(loops) == 1
+    assert client.stats['requests'] == 40
+    # 40 requests through one bucket (burst 20, 20/s) take about a second;
+    # a bucket per call would let each caller's 10 through at once
+    assert elapsed >= 0.9
+    assert results[3] == [[float(len(f"text 3 {i}"))] for i in range(10)]
+
+
+def test_retryable_errors_are_retried():
+    calls = []
+    
+    async def embed_batch(batch):
+        calls.append(batch)
+        if len(calls) == 1:
+            raise RateLimited("slow down")
+        return [[1.0] for _ in batch]
+    
+    client = AsyncEmbeddingClient(embed_batch, base_delay=0.01)
+    
+    async def main():
+        return await client.aembed(["a", "b"])
+    
+    assert asyncio.run(main()) == [[1.0], [1.0]]
+    assert client.stats['retries'] == 1
+    client.close()
@@ -0,0 +1,58 @@
+"""Incremental flashcards reuse saved cards for unchanged chunks"""
+
+import pytest
+
+import storage
+from agents.flashcard_agent import FlashcardAgent
+
+
+def make_chunks(changed=None):
+    chunks = []
+    for i in range(8):
+        text = f'Rule {i} covers library hours. Books are due in {i + 7} days.'
+        if i == changed:
+            text = f'Rule {i} covers lab hours. Equipment is due in {i + 1} days.'
+        chunks.append({'id': f'notes.txt::{i}::{hash(text)}', 'text': text, 'metadata': {'topic': 'Library'}})
+    return chunks
+
+
+@pytest.fixture
+def agent(tmp_path, monkeypatch):
+    monkeypatch.setenv("GOOGLE_API_KEY", "")
+    monkeypatch.setenv("OPENAI_API_KEY", "")
+    monkeypatch.setenv("STORAGE_PATH", str(tmp_path / "app.db"))
+    monkeypatch.setattr(storage, "_storage", None)
+    agent = FlashcardAgent()
+    agent.calls = []
+    generate = agent._generate_for
+    
+    def counting_generate(chunks, embeddings, indices, num_flashcards):
+        agent.calls.append([chunks[i]['id'] for i in indices])
+        return generate(chunks, embeddings, indices, num_flashcards)
+    
+    monkeypatch.setattr(agent, "_generate_for", counting_generate)
+    return agent
+
+
+def test_unchanged_chunks_reuse_saved_cards(agent):
+    chunks = make_chunks()
+    first = agent.generate_incremental_flashcards(chunks, num_flashcards=3)
+    assert len(agent.calls) == 1
+    # Every chunk in scope for the pass counts as generated, not just the prompted ones
+    assert set(storage.get_storage().get_flashcard_chunks()) == {chunk['id'] for chunk in chunks}
+    
+    second = agent.generate_incremental_flashcards(chunks, num_flashcards=3)
+    assert len(agent.calls) == 1
+    assert [card['question'] for card in second] == [card['question'] for card in first]
+
+
+def test_changed_chunk_reopens_its_card_set(agent):
+    agent.generate_incremental_flashcards(make_chunks(), num_flashcards=3)
+    
+    # Chunk 0 backed a saved card; changing it drops that card and reopens its set
+    changed = make_chunks(changed=0)
+    cards = agent.generate_incremental_flashcards(changed, num_flashcards=3)
+    
+    assert len(agent.calls) == 2
+    assert changed[0]['id'] in agent.calls[1]
+    assert all(set(card['chunk_ids']) <= {chunk['id'] for chunk in changed} for card in cards)
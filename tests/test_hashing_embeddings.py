@@ -0,0 +1,22 @@
+"""Batched hashing embeddings match a single pass"""
+
+import numpy as np
+
+from utils.hashing_embeddings import HashingEmbeddingModel
+
+
+TEXTS = [f"Exam {i} is held in hall {i % 4}. Bring your ID card." * (i % 3 + 1) for i in range(25)] + [""]
+
+
+def test_batch_size_does_not_change_vectors():
+    whole = HashingEmbeddingModel(dim=128, batch_size=1000)
+    batched = HashingEmbeddingModel(dim=128, batch_size=4)
+    whole.fit(TEXTS)
+    batched.fit(TEXTS)
+    
+    assert np.array_equal(whole.doc_freq, batched.doc_freq)
+    vectors = batched.encode(TEXTS)
+    assert vectors.dtype == np.float32
+    assert np.allclose(whole.encode(TEXTS), vectors, atol=1e-6)
+    assert np.allclose(np.linalg.norm(vectors[:-1], axis=1), 1.0, atol=1e-5)
+    assert not vectors[-1].any()
@@ -0,0 +1,90 @@
+"""Ingest keeps the same copy of a repeated chunk on every run"""
+
+import time
+
+from ingest_pipeline import IngestPipeline
+from utils.dedup import NearDuplicateDetector
+
+
+FOOTER = "This document is issued by the office of the registrar and supersedes all earlier circulars on the subject."
+
+
+class SlowFirstReader:
+    """Reader whose earlier files finish last, so worker order is the reverse of file order"""
+    
+    supported_extensions = ['.txt']
+    
+    def __init__(self, delays):
+        self.delays = delays
+    
+    def extract_text(self, file_path):
+        with open(file_path) as f:
+            return f.read()
+    
+    def structure_text(self, text, source):
+        name = source.rsplit('/', 1)[-1]
+        time.sleep(self.delays.get(name, 0))
+        chunks = [
+            {'text': part, 'metadata': {'source': source, 'chunk_index': i, 'topic': 'General'}}
+            for i, part in enumerate(text.split('\n'))
+        ]
+        return {'chunks': chunks, 'topics': []}
+
+
+def test_duplicates_resolve_to_earliest_file(tmp_path):
+    names = ['a.txt', 'b.txt', 'c.txt']
+    for name in names:
+        (tmp_path / name).write_text(f"Notes that only appear in {name} about hostel rules and timings.\n{FOOTER}")
+    
+    delays = {'a.txt': 0.15, 'b.txt': 0.05, 'c.txt': 0.0}
+    pipeline = IngestPipeline(SlowFirstReader(delays), deduplicator=NearDuplicateDetector(), extract_workers=3, chunk_workers=3)
+    result = pipeline.run(str(tmp_path))
+    
+    footers = [chunk for chunk in result['chunks'] if chunk['text'] == FOOTER]
+    assert [chunk['metadata']['source'] for chunk in footers] == [str(tmp_path / 'a.txt')]
+    assert result['duplicates_skipped'] == 2
+    assert len(result['chunks']) == 4
+
+
+class FittingStore:
+    """Vector store stand-in that needs fitting, like an unfitted hashing backend"""
+    
+    def __init__(self):
+        self.fitted_on = None
+        self.embedded_before_fit = 0
+        self.written = []
+    
+    @property
+    def needs_fit(self):
+        return self.fitted_on is None
+    
+    def fit_embeddings(self, texts):
+        self.fitted_on = list(texts)
+    
+    def embed_batch(self, chunks):
+        if self.needs_fit:
+            self.embedded_before_fit += len(chunks)
+        return chunks
+    
+    def write_batch(self, batch):
+        self.written.extend(batch)
+        return {'added': len(batch), 'reused': 0}
+    
+    def update_metadata(self, chunks):
+        pass
+    
+    def remove_stale(self, keep_ids):
+        return 0
+
+
+def test_unfitted_store_is_fitted_on_whole_corpus(tmp_path):
+    for name in ['a.txt', 'b.txt', 'c.txt']:
+        (tmp_path / name).write_text(f"First line of {name}.\nSecond line of {name}.")
+    
+    store = FittingStore()
+    pipeline = IngestPipeline(SlowFirstReader({}), store, extract_workers=2, chunk_workers=2, embed_workers=2, batch_size=2)
+    result = pipeline.run(str(tmp_path))
+    
+    assert store.embedded_before_fit == 0
+    assert sorted(store.fitted_on) == sorted(chunk['text'] for chunk in result['chunks'])
+    assert len(store.written) == 6
@@ -0,0 +1,52 @@
+"""A successful upstream response survives failing bookkeeping"""
+
+import llm_gateway
+from llm_gateway import LLMGateway
+from utils.llm_cache import LLMResponseCache
+
+
+class Response:
+    def __init__(self, content, usage_metadata):
+        self.content = content
+        self.usage_metadata = usage_metadata
+
+
+class StubClient:
+    def __init__(self, usage_metadata):
+        self.usage_metadata = usage_metadata
+        self.calls = 0
+    
+    def invoke(self, messages):
+        self.calls += 1
+        return Response("March 15", self.usage_metadata)
+
+
+def make_gateway(tmp_path, client):
+    return LLMGateway(
+        client_factory=lambda model, temperature, api_key: client,
+        cache=LLMResponseCache(str(tmp_path / "cache.db")),
+        max_retries=0
+    )
+
+
+def test_unserializable_usage_does_not_fail_the_call(tmp_path):
+    client = StubClient({'input_tokens': object()})
+    gateway = make_gateway(tmp_path, client)
+    
+    response = gateway.invoke("stub", 0.0, ["When is the fee deadline?"])
+    assert response.content == "March 15"
+    assert client.calls == 1
+
+
+def test_usage_recording_errors_are_swallowed(tmp_path, monkeypatch):
+    def broken_usage(span, messages, response):
+        raise KeyError("usage")
+    
+    monkeypatch.setattr(llm_gateway, "set_llm_usage", broken_usage)
+    client = StubClient({'input_tokens': 3, 'output_tokens': 2})
+    gateway = make_gateway(tmp_path, client)
+    
+    assert gateway.invoke("stub", 0.0, ["When is the fee deadline?"]).content == "March 15"
+    # The response was still cached
+    assert gateway.invoke("stub", 0.0, ["When is the fee deadline?"]).content == "March 15"
+    assert client.calls == 1
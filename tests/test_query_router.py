@@ -0,0 +1,106 @@
+"""Router tiers answer only when their confidence gate holds"""
+
+from query_router import QueryRouter
+from utils.deadline_index import DeadlineIndex
+
+
+class StubAlerts:
+    def __init__(self, deadlines):
+        self.index = DeadlineIndex(deadlines)
+    
+    def get_deadline_index(self):
+        return self.index
+
+
+class StubChatAgent:
+    def __init__(self):
+        self.questions = []
+    
+    def answer_question(self, question, n_chunks=5, prioritize_source=None, retrieved_chunks=None):
+        self.questions.append(question)
+        return {'answer': f"RAG answer to: {question}", 'sources': ['handbook.pdf'], 'chunks': []}
+
+
+class StubVectorStore:
+    """Every question embeds to the same vector, so only the numbers guard separates them"""
+    
+    def embed_text(self, texts):
+        return [[1.0, 0.0, 0.0] for _ in texts]
+    
+    def search(self, question, n_results=5, prioritize_source=None, query_embedding=None):
+        return [{'text': 'Fee details.', 'metadata': {'source': 'fees.pdf'}, 'distance': 0.1}]
+
+
+DEADLINES = [
+    {
+        'date': '2026-03-20',
+        'event': 'Registration deadline: March 20, 2026',
+        'source': 'calendar.pdf',
+        'context': 'Registration deadline: March 20, 2026. Hostel allotment lists are posted the week after.'
+    },
+    {
+        'date': '2026-04-02',
+        'event': 'Fee payment is due on April 2, 2026',
+        'source': 'fees.pdf',
+        'context': 'Fee payment is due on April 2, 2026 for all students.'
+    },
+    {
+        'date': '2026-05-10',
+        'event': 'Project submission is due on May 10, 2026',
+        'source': 'cs101.pdf',
+        'context': 'Project submission is due on May 10, 2026.'
+    },
+    {
+        'date': '2026-05-24',
+        'event': 'Project submission is due on May 24, 2026',
+        'source': 'cs202.pdf',
+        'context': 'Project submission is due on May 24, 2026.'
+    }
+]
+
+
+def make_router(**kwargs):
+    chat_agent = StubChatAgent()
+    return QueryRouter(chat_agent, alerts_manager=StubAlerts(DEADLINES), **kwargs), chat_agent
+
+
+def test_deadline_question_answered_from_index():
+    router, chat_agent = make_router()
+    
+    result = router.answer("When is the registration deadline?")
+    
+    assert result['tier'] == "deadline"
+    assert result['deadline']['date'] == '2026-03-20'
+    assert chat_agent.questions == []
+
+
+def test_words_only_in_context_do_not_match():
+    # "hostel" appears near the registration date but not in its event
+    router, chat_agent = make_router()
+    
+    result = router.answer("What is the registration deadline for hostel?")
+    
+    assert result['tier'] == "single_doc"
+    assert chat_agent.questions == ["What is the registration deadline for hostel?"]
+
+
+def test_ambiguous_date_falls_through():
+    router, chat_agent = make_router()
+    
+    result = router.answer("When is the project submission due?")
+    
+    assert result['tier'] == "single_doc"
+    assert 'deadline' not in result
+
+
+def test_semantic_cache_needs_same_numbers():
+    router, chat_agent = make_router(vector_store=StubVectorStore())
+    
+    assert router.answer("What is the hostel fee for 2025?")['tier'] == "single_doc"
+    assert router.answer("what is the hostel fee for 2025")['tier'] == "cache"
+    assert router.answer("Hostel fee for the year 2025?")['tier'] == "cache"
+    
+    result = router.answer("What is the hostel fee for 2024?")
+    
+    assert result['tier'] == "single_doc"
+    assert chat_agent.questions == ["What is the hostel fee for 2025?", "What is the hostel fee for 2024?"]
@@ -0,0 +1,67 @@
+"""Questions are dropped when the material they came from changes"""
+
+import sqlite3
+
+from question_bank import QuestionBank
+
+
+def chunk(topic, text):
+    return {'text': text, 'metadata': {'topic': topic}}
+
+
+def generate(chunks, difficulty, count):
+    return [
+        {
+            'question': f"About '{chunks[0]['text']}' ({difficulty}) #{i}?",
+            'options': ['yes', 'no', 'maybe', 'never'],
+            'correct_index': 0,
+            'correct_answer': 'yes'
+        }
+        for i in range(count)
+    ]
+
+
+def questions_by_topic(bank):
+    with sqlite3.connect(bank.path) as conn:
+        rows = conn.execute("SELECT topic, payload FROM questions").fetchall()
+    return {topic for topic, _ in rows}, [payload for _, payload in rows]
+
+
+def test_changed_topic_material_is_regenerated(tmp_path):
+    bank = QuestionBank(generate, path=str(tmp_path / "bank.db"), target_per_pool=2, batch_size=2)
+    bank.build([chunk('Fees', 'Fees are due in March'), chunk('Hostel', 'Curfew is at ten')], difficulties=['easy'])
+    assert bank.wait()
+    bank.sample('easy', 4, user='alice')
+    
+    # Same topic names, different Fees content
+    bank.build([chunk('Fees', 'Fees are due in April'), chunk('Hostel', 'Curfew is at ten')], difficulties=['easy'])
+    assert bank.wait()
+    
+    topics, payloads = questions_by_topic(bank)
+    assert topics == {'Fees', 'Hostel'}
+    assert not any('March' in payload for payload in payloads)
+    assert any('April' in payload for payload in payloads)
+    assert any('Curfew' in payload for payload in payloads)
+    
+    with sqlite3.connect(bank.path) as conn:
+        orphans = conn.execute(
+            "SELECT COUNT(*) FROM seen WHERE question_id NOT IN (SELECT id FROM questions)"
+        ).fetchone()[0]
+    assert orphans == 0
+    bank.close()
+
+
+def test_unchanged_material_keeps_questions(tmp_path):
+    chunks = [chunk('Fees', 'Fees are due in March')]
+    bank = QuestionBank(generate, path=str(tmp_path / "bank.db"), target_per_pool=2, batch_size=2)
+    bank.build(chunks, difficulties=['easy'])
+    assert bank.wait()
+    before = bank.pool_sizes()
+    calls = []
+    bank.generate_fn = lambda *args: calls.append(args) or []
+    
+    bank.build(chunks, difficulties=['easy'])
+    assert bank.wait()
+    assert bank.pool_sizes() == before
+    assert calls == []
+    bank.close()
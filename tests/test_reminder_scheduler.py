@@ -0,0 +1,105 @@
+"""Reminders fire once, on time, for opted-in users, across gaps and restarts"""
+
+from datetime import datetime
+
+import pytest
+
+from alerts_manager import AlertsManager
+from reminder_scheduler import ReminderScheduler, QueueSink
+from storage import Storage
+
+
+class FakeClock:
+    def __init__(self, when):
+        self.now = when.timestamp()
+    
+    def __call__(self):
+        return self.now
+    
+    def set(self, when):
+        self.now = when.timestamp()
+
+
+def deadline(day, event):
+    return {'date': day, 'event': event, 'source': 'calendar.pdf', 'context': event}
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = Storage(str(tmp_path / "app.db"))
+    storage.add_deadlines([deadline('2026-03-10', 'Fee payment is due')])
+    storage.set_alert_preference(True, user='alice')
+    return storage
+
+
+@pytest.fixture
+def clock():
+    return FakeClock(datetime(2026, 3, 1, 8, 0))
+
+
+def make_scheduler(storage, clock):
+    scheduler = ReminderScheduler(QueueSink(), AlertsManager(storage), offsets_days=(7, 1, 0), hour=9, clock=clock)
+    scheduler.refresh()
+    return scheduler
+
+
+def drain(scheduler):
+    sent = []
+    while not scheduler.sink.queue.empty():
+        sent.append(scheduler.sink.queue.get())
+    return [(reminder['user'], reminder['date'], reminder['days_before']) for reminder in sent]
+
+
+def test_reminders_fire_at_each_offset(storage, clock):
+    scheduler = make_scheduler(storage, clock)
+    assert scheduler.next_fire_time() == datetime(2026, 3, 3, 9, 0).timestamp()
+    
+    clock.set(datetime(2026, 3, 3, 8, 59))
+    assert scheduler.run_pending() == 0
+    for day, offset in ((3, 7), (9, 1), (10, 0)):
+        clock.set(datetime(2026, 3, day, 9, 0))
+        assert scheduler.run_pending() == 1
+        assert drain(scheduler) == [('alice', '2026-03-10', offset)]
+    assert scheduler.next_fire_time() is None
+
+
+def test_gap_catches_up_latest_reminder_only(storage, clock):
+    scheduler = make_scheduler(storage, clock)
+    
+    # Asleep through the 7-day and 1-day reminders
+    clock.set(datetime(2026, 3, 9, 12, 0))
+    assert scheduler.run_pending() == 1
+    assert drain(scheduler) == [('alice', '2026-03-10', 1)]
+    assert scheduler.run_pending() == 0
+    assert scheduler.next_fire_time() == datetime(2026, 3, 10, 9, 0).timestamp()
+
+
+def test_opt_out_drops_queued_reminders(storage, clock):
+    scheduler = make_scheduler(storage, clock)
+    
+    storage.set_alert_preference(False, user='alice')
+    scheduler.check_changes()
+    clock.set(datetime(2026, 3, 10, 9, 0))
+    assert scheduler.run_pending() == 0
+    assert drain(scheduler) == []
+
+
+def test_new_deadline_is_queued(storage, clock):
+    scheduler = make_scheduler(storage, clock)
+    
+    storage.add_deadlines([deadline('2026-03-12', 'Hostel forms are due')])
+    scheduler.check_changes()
+    clock.set(datetime(2026, 3, 5, 9, 0))
+    assert scheduler.run_pending() == 2
+    assert sorted(drain(scheduler)) == [('alice', '2026-03-10', 7), ('alice', '2026-03-12', 7)]
+
+
+def test_restart_does_not_resend(storage, clock):
+    scheduler = make_scheduler(storage, clock)
+    clock.set(datetime(2026, 3, 3, 9, 30))
+    assert scheduler.run_pending() == 1
+    
+    restarted = make_scheduler(storage, clock)
+    assert restarted.run_pending() == 0
+    assert drain(restarted) == []
+    assert restarted.next_fire_time() == datetime(2026, 3, 9, 9, 0).timestamp()
@@ -0,0 +1,61 @@
+"""Storage keeps a user's data across sessions"""
+
+import json
+import contextvars
+
+from storage import Storage, DEFAULT_USER, set_data_user
+from utils.llm_scheduler import set_current_user
+
+
+def in_new_session(fn, *args):
+    """Run fn the way a fresh Streamlit session would: new context, new session id"""
+    def session():
+        set_current_user(f"session-{id(fn)}-{len(args)}")
+        return fn(*args)
+    return contextvars.Context().run(session)
+
+
+def test_data_survives_new_session(tmp_path):
+    storage = Storage(str(tmp_path / "app.db"))
+    cards = [{'question': 'What is the fee deadline?', 'answer': 'March 15'}]
+    plan = [{'date': '2030-01-01', 'topic': 'Fees', 'status': 'pending'}]
+    
+    def save():
+        storage.add_flashcards(cards)
+        storage.save_quiz([{'question': 'Q1', 'options': ['a', 'b', 'c', 'd'], 'correct_index': 0}])
+        storage.save_plan(plan, {'Fees': {'status': 'pending'}})
+    
+    def load():
+        return storage.get_flashcards(), storage.get_quiz(), storage.get_plan()
+    
+    in_new_session(save)
+    flashcards, quiz, (items, progress) = in_new_session(load)
+    
+    assert [card['question'] for card in flashcards] == ['What is the fee deadline?']
+    assert quiz[0]['question'] == 'Q1'
+    assert [item['topic'] for item in items] == ['Fees']
+    assert progress == {'Fees': {'status': 'pending'}}
+
+
+def test_explicit_user_is_separate(tmp_path):
+    storage = Storage(str(tmp_path / "app.db"))
+    
+    def save_as_alice():
+        set_data_user("alice")
+        storage.add_flashcards([{'question': 'Alice only', 'answer': 'x'}])
+    
+    contextvars.Context().run(save_as_alice)
+    assert storage.get_flashcards() == []
+    assert [card['question'] for card in storage.get_flashcards("alice")] == ['Alice only']
+
+
+def test_migrated_json_is_visible_to_sessions(tmp_path):
+    outputs = tmp_path / "outputs"
+    outputs.mkdir()
+    (outputs / "flashcards.json").write_text(json.dumps([{'question': 'Legacy card', 'answer': 'y'}]))
+    storage = Storage(str(tmp_path / "app.db"))
+    storage.migrate_json(str(outputs), str(tmp_path / "alerts.json"))
+    
+    flashcards = in_new_session(storage.get_flashcards)
+    assert [card['question'] for card in flashcards] == ['Legacy card']
+    assert storage.get_flashcards(DEFAULT_USER) == flashcards
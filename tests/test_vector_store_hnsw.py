@@ -0,0 +1,67 @@
+"""HNSW settings on existing collections: build-time ones warn, search_ef is applied"""
+
+import logging
+
+from vector_store import VectorStore
+
+
+class FakeCollection:
+    def __init__(self, metadata, modifiable=True):
+        self.metadata = metadata
+        self.modifiable = modifiable
+        self.configuration = {}
+    
+    def modify(self, configuration=None, **kwargs):
+        if not self.modifiable:
+            raise TypeError("modify() got an unexpected keyword argument 'configuration'")
+        self.configuration = configuration
+
+
+class FakeClient:
+    def __init__(self, collection):
+        self.collection = collection
+    
+    def get_or_create_collection(self, name, metadata):
+        return self.collection
+
+
+def open_store(collection, hnsw_params):
+    store = VectorStore.__new__(VectorStore)
+    store.collection_metadata = store._hnsw_metadata(hnsw_params)
+    store.client = FakeClient(collection)
+    store.collection = store._get_or_create_collection()
+    return store
+
+
+def test_missing_keys_are_compared_with_defaults(caplog):
+    # Created before HNSW settings were configurable: only the space is recorded
+    collection = FakeCollection({"hnsw:space": "cosine"})
+    with caplog.at_level(logging.WARNING, logger="vector_store"):
+        open_store(collection, {'M': 32})
+    assert "hnsw:M" in caplog.text
+
+
+def test_matching_defaults_do_not_warn(caplog):
+    collection = FakeCollection({"hnsw:space": "cosine"})
+    with caplog.at_level(logging.WARNING, logger="vector_store"):
+        open_store(collection, {'M': 16, 'construction_ef': 100})
+    assert caplog.text == ""
+
+
+def test_search_ef_is_applied_to_existing_collection(caplog):
+    collection = FakeCollection({"hnsw:space": "cosine", "hnsw:search_ef": 10})
+    with caplog.at_level(logging.WARNING, logger="vector_store"):
+        store = open_store(collection, {'search_ef': 80})
+    assert collection.configuration == {"hnsw": {"ef_search": 80}}
+    assert caplog.text == ""
+    
+    assert store.set_search_ef(120)
+    assert collection.configuration == {"hnsw": {"ef_search": 120}}
+
+
+def test_search_ef_warns_when_chroma_cannot_change_it(caplog):
+    collection = FakeCollection({"hnsw:space": "cosine"}, modifiable=False)
+    with caplog.at_level(logging.WARNING, logger="vector_store"):
+        store = open_store(collection, {'search_ef': 80})
+    assert "hnsw:search_ef" in caplog.text
+    assert not store.set_search_ef(120)
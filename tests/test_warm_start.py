@@ -0,0 +1,90 @@
+"""A warm start leaves the controller as ready as a full ingest"""
+
+import pytest
+
+import storage
+from agents import controller as controller_module
+from agents.controller import AgentController, KnowledgeMemory
+
+
+CHUNKS = [
+    {
+        'id': f'handbook.txt::{i}',
+        'text': f'Rule {i} applies to hostel residents. Residents must register before day {i + 10}. Late entries are fined.',
+        'metadata': {'source': 'handbook.txt', 'chunk_index': i, 'topic': topic}
+    }
+    for i, topic in enumerate(['Hostel', 'Hostel', 'Fees', 'Fees', 'Exams', 'Exams'])
+]
+TOPICS = [{'topic': topic, 'chunk_count': 2} for topic in ('Hostel', 'Fees', 'Exams')]
+
+
+@pytest.fixture
+def docs(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("GOOGLE_API_KEY", "")
+    monkeypatch.setenv("OPENAI_API_KEY", "")
+    monkeypatch.setenv("MEMORY_SNAPSHOT_PATH", str(tmp_path / "snapshot.json"))
+    monkeypatch.setenv("QUESTION_BANK_PATH", str(tmp_path / "bank.db"))
+    monkeypatch.setenv("STORAGE_PATH", str(tmp_path / "app.db"))
+    monkeypatch.setattr(storage, "_storage", None)
+    monkeypatch.setattr(
+        controller_module.IngestPipeline, "run",
+        lambda self, directory_path: {
+            'chunks': [dict(chunk) for chunk in CHUNKS],
+            'topics': TOPICS,
+            'index_stats': {},
+            'duplicates_skipped': 0,
+            'metrics': {}
+        }
+    )
+    directory = tmp_path / "docs"
+    directory.mkdir()
+    (directory / "handbook.txt").write_text("Hostel rules, fees and exams.")
+    return str(directory)
+
+
+def test_warm_start_serves_quiz_from_rebuilt_bank(docs, tmp_path, monkeypatch):
+    first = AgentController()
+    first.process_study_materials(docs)
+    first.question_bank.close()
+    # A fresh bank: the warm start has to fill it, not the earlier ingest
+    monkeypatch.setenv("QUESTION_BANK_PATH", str(tmp_path / "restarted.db"))
+    
+    controller = AgentController()
+    result = controller.warm_start(docs)
+    
+    assert result is not None and result['warm_start']
+    assert controller.question_bank.wait()
+    pools = controller.question_bank.pool_sizes()
+    assert {topic for topic, _ in pools} == {'Hostel', 'Fees', 'Exams'}
+    
+    questions = controller.generate_quiz("medium", 3, adaptive=False)
+    assert len(questions) == 3
+    assert all(question['topic'] in {'Hostel', 'Fees', 'Exams'} for question in questions)
+    controller.question_bank.close()
+
+
+def test_warm_start_loads_no_chunk_text_and_keeps_pools(docs, monkeypatch):
+    first = AgentController()
+    first.process_study_materials(docs)
+    assert first.question_bank.wait()
+    before = first.question_bank.pool_sizes()
+    assert before
+    first.question_bank.close()
+    
+    controller = AgentController()
+    monkeypatch.setattr(KnowledgeMemory, "chunks", property(lambda self: pytest.fail("chunk texts loaded")))
+    monkeypatch.setattr(
+        controller.alerts_manager, "add_deadlines_from_documents",
+        lambda chunks: pytest.fail("deadlines re-extracted")
+    )
+    calls = []
+    controller.question_bank.generate_fn = lambda *args: calls.append(args) or []
+    
+    assert controller.warm_start(docs)['warm_start']
+    assert controller.question_bank.wait()
+    # Same material as the ingest, so the stored pools stay; refills that top
+    # them up fetch just their sampled chunks by id
+    assert controller.question_bank.pool_sizes() == before
+    assert all(chunk['text'].startswith('Rule ') for chunks, _, _ in calls for chunk in chunks)
+    controller.question_bank.close()
@@ -0,0 +1,210 @@
+"""
+Async Embedding Client
+Batched, concurrent, rate-limited and retrying driver for embedding API calls
+"""
+
+import asyncio
+import random
+import logging
+import threading
+import time
+from typing import List, Callable, Awaitable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Rough characters-per-token ratio used to size batches without a tokenizer
+CHARS_PER_TOKEN = 4
+
+
+class AsyncTokenBucket:
+    """Token bucket limiting how often requests may start"""
+    
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum burst size (default: max(1, rate))
+        """
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self, tokens: float = 1.0):
+        """Wait until the requested tokens are available, then take them"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+
+def is_retryable(error: Exception) -> bool:
+    """True for rate limits (429), server errors (5xx), timeouts and connection failures"""
+    status = getattr(error, 'status_code', None)
+    if status is None:
+        status = getattr(getattr(error, 'response', None), 'status_code', None)
+    if status is not None:
+        return status == 429 or status >= 500
+    return isinstance(error, (ConnectionError, TimeoutError, asyncio.TimeoutError)) or \
+        type(error).__name__ in ('APIConnectionError', 'APITimeoutError')
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Seconds requested by a Retry-After response header, if any"""
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+class AsyncEmbeddingClient:
+    """
+    Splits texts into provider-sized batches and embeds them concurrently
+    
+    Requests start no faster than the token bucket allows and at most
+    max_concurrency run at once. Retryable failures (429/5xx/connection) are
+    retried with jittered exponential backoff, honoring Retry-After. Results
+    are reassembled in input order.
+    
+    All requests run on one long-lived event loop owned by the client (in a
+    daemon thread), so concurrent callers share the rate limit and
+    concurrency cap, and loop-bound resources such as HTTP connection pools
+    are reused across calls.
+    """
+    
+    def __init__(
+        self,
+        embed_batch: Callable[[List[str]], Awaitable[List[List[float]]]],
+        max_batch_size: int = 256,
+        max_batch_tokens: int = 100_000,
+        max_concurrency: int = 4,
+        requests_per_second: float = 5.0,
+        max_retries: int = 5,
+        base_delay: float = 0.5,
+        max_delay: float = 20.0
+    ):
+        """
+        Args:
+            embed_batch: Async function embedding one batch of texts (one API request)
+            max_batch_size: Maximum texts per request
+            max_batch_tokens: Maximum estimated tokens per request
+            max_concurrency: Maximum requests in flight
+            requests_per_second: Sustained request rate (token bucket refill rate)
+            max_retries: Retries per batch before giving up
+            base_delay: First backoff delay in seconds
+            max_delay: Backoff delay cap in seconds
+        """
+        self.embed_batch = embed_batch
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.max_concurrency = max_concurrency
+        self.requests_per_second = requests_per_second
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stats = {'requests': 0, 'retries': 0, 'failures': 0}
+        self._bucket = None
+        self._semaphore = None
+        self._loop = None
+        self._loop_lock = threading.Lock()
+    
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The event loop every request runs on (started on first use)"""
+        with self._loop_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                # Shared by every request on this loop (asyncio primitives are loop-bound)
+                self._bucket = AsyncTokenBucket(self.requests_per_second)
+                self._semaphore = asyncio.Semaphore(self.max_concurrency)
+                threading.Thread(target=loop.run_forever, name="async-embeddings", daemon=True).start()
+                self._loop = loop
+            return self._loop
+    
+    def make_batches(self, texts: List[str]) -> List[List[int]]:
+        """Group text indices into batches under the size and token limits"""
+        batches = []
+        current, current_tokens = [], 0
+        for i, text in enumerate(texts):
+            tokens = len(text) // CHARS_PER_TOKEN + 1
+            if current and (len(current) >= self.max_batch_size or current_tokens + tokens > self.max_batch_tokens):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(i)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+    
+    async def _run_batch(self, batch: List[str]) -> List[List[float]]:
+        attempt = 0
+        while True:
+            await self._bucket.acquire()
+            async with self._semaphore:
+                self.stats['requests'] += 1
+                try:
+                    return await self.embed_batch(batch)
+                except Exception as e:
+                    if not is_retryable(e) or attempt >= self.max_retries:
+                        self.stats['failures'] += 1
+                        raise
+                    error = e
+            
+            # Back off outside the semaphore so other batches can proceed
+            delay = _retry_after(error)
+            if delay is None:
+                delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+                delay = random.uniform(0, delay)  # full jitter
+            attempt += 1
+            self.stats['retries'] += 1
+            logger.warning("Embedding request failed (%s); retry %d in %.2fs", error, attempt, delay)
+            await asyncio.sleep(delay)
+    
+    async def aembed(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts asynchronously, preserving order (from any event loop)"""
+        if not texts:
+            return []
+        
+        loop = self.loop
+        if asyncio.get_running_loop() is not loop:
+            return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self._aembed(texts), loop))
+        return await self._aembed(texts)
+    
+    async def _aembed(self, texts: List[str]) -> List[List[float]]:
+        batches = self.make_batches(texts)
+        batch_results = await asyncio.gather(*[
+            self._run_batch([texts[i] for i in batch])
+            for batch in batches
+        ])
+        
+        results = [None] * len(texts)
+        for batch, embeddings in zip(batches, batch_results):
+            if len(embeddings) != len(batch):
+                raise RuntimeError(f"Provider returned {len(embeddings)} embeddings for {len(batch)} inputs")
+            for i, embedding in zip(batch, embeddings):
+                results[i] = embedding
+        return results
+    
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Synchronous wrapper around aembed() (safe from any thread, including inside a running loop)"""
+        if not texts:
+            return []
+        return self.run(self._aembed(texts))
+    
+    def run(self, coroutine: Awaitable):
+        """Run a coroutine on the client's loop and return its result (e.g. to close a provider client)"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+    
+    def close(self):
+        """Stop the client's event loop"""
+        with self._loop_lock:
+            loop, self._loop = self._loop, None
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
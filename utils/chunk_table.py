@@ -0,0 +1,232 @@
+"""
+Chunk Table
+Compact columnar store for chunk metadata with interned strings and hash indexes
+"""
+
+from array import array
+from typing import List, Dict, Iterable, Callable, Optional, Hashable
+
+# Metadata keys stored as their own columns; everything else is an interned "extra" record
+_COLUMNS = ('chunk_id', 'source', 'topic', 'subtopic', 'chunk_index')
+
+
+class Interner:
+    """Maps repeated values to small integer ids and back"""
+    
+    def __init__(self):
+        self.values = []
+        self._ids = {}
+    
+    def intern(self, value: Hashable) -> int:
+        value_id = self._ids.get(value)
+        if value_id is None:
+            value_id = self._ids[value] = len(self.values)
+            self.values.append(value)
+        return value_id
+    
+    def get(self, value: Hashable) -> Optional[int]:
+        return self._ids.get(value)
+    
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class ChunkTable:
+    """
+    Chunks stored as parallel columns, one row per chunk id
+    
+    Topic, subtopic and source strings are interned, and the remaining
+    per-document metadata (file path, type, totals) is interned as a whole, so
+    a row costs a few integers plus its chunk id. Re-adding a chunk id updates
+    its row in place. When a text loader is given (e.g. the vector store), chunk
+    text is not kept here and is fetched by id when chunks are materialized.
+    Topic (case-insensitive) and source lookups go through hash indexes.
+    """
+    
+    def __init__(self, text_loader: Optional[Callable[[List[str]], List[Optional[str]]]] = None):
+        """
+        Args:
+            text_loader: Function returning texts for chunk ids (None keeps texts in memory)
+        """
+        self.text_loader = text_loader
+        self.ids = []
+        self._rows = {}
+        self.strings = Interner()
+        self.extras = Interner()
+        self._topic = array('i')
+        self._subtopic = array('i')
+        self._source = array('i')
+        self._chunk_index = array('i')
+        self._extra = array('i')
+        self._texts = [] if text_loader is None else None
+        # Ordered sets (dicts) of rows, keyed by lowercased topic and by source id
+        self._by_topic = {}
+        self._by_source = {}
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+    
+    def _intern_extra(self, metadata: Dict) -> int:
+        extra = tuple(sorted((key, value) for key, value in metadata.items() if key not in _COLUMNS))
+        try:
+            return self.extras.intern(extra)
+        except TypeError:
+            # Unhashable metadata values: store this record unshared
+            self.extras.values.append(extra)
+            return len(self.extras.values) - 1
+    
+    def _unindex(self, row: int):
+        topic = self.strings.values[self._topic[row]].lower()
+        del self._by_topic[topic][row]
+        if not self._by_topic[topic]:
+            del self._by_topic[topic]
+        source = self._source[row]
+        del self._by_source[source][row]
+        if not self._by_source[source]:
+            del self._by_source[source]
+    
+    def add(self, chunks: Iterable[Dict], id_fn: Callable[[Dict], str]):
+        """
+        Insert or update chunks
+        
+        Args:
+            chunks: Chunk dicts with 'text' and 'metadata'
+            id_fn: Function giving a chunk's id
+        """
+        for chunk in chunks:
+            metadata = chunk.get('metadata', {})
+            chunk_id = id_fn(chunk)
+            topic = metadata.get('topic', '') or ''
+            values = (
+                self.strings.intern(topic),
+                self.strings.intern(metadata.get('subtopic', '') or ''),
+                self.strings.intern(metadata.get('source', '') or ''),
+                int(metadata.get('chunk_index', 0) or 0),
+                self._intern_extra(metadata)
+            )
+            
+            row = self._rows.get(chunk_id)
+            reindex = True
+            if row is None:
+                row = self._rows[chunk_id] = len(self.ids)
+                self.ids.append(chunk_id)
+                for column, value in zip(self._columns(), values):
+                    column.append(value)
+                if self._texts is not None:
+                    self._texts.append(chunk.get('text', ''))
+            else:
+                reindex = (self._topic[row], self._source[row]) != (values[0], values[2])
+                if reindex:
+                    self._unindex(row)
+                for column, value in zip(self._columns(), values):
+                    column[row] = value
+                if self._texts is not None:
+                    self._texts[row] = chunk.get('text', '')
+            
+            if reindex:
+                self._by_topic.setdefault(topic.lower(), {})[row] = None
+                self._by_source.setdefault(values[2], {})[row] = None
+    
+    def _columns(self):
+        return (self._topic, self._subtopic, self._source, self._chunk_index, self._extra)
+    
+    def topics(self) -> List[str]:
+        """Distinct non-empty topics (first spelling seen)"""
+        return [
+            self.strings.values[self._topic[next(iter(rows))]]
+            for topic, rows in self._by_topic.items() if topic
+        ]
+    
+    def topic_rows(self, topic: str) -> List[int]:
+        return list(self._by_topic.get(topic.lower(), ()))
+    
+    def source_rows(self, source: str) -> List[int]:
+        source_id = self.strings.get(source)
+        return list(self._by_source.get(source_id, ())) if source_id is not None else []
+    
+    def id_rows(self, chunk_ids: Iterable[str]) -> List[int]:
+        """Rows of the given chunk ids (unknown ids are skipped)"""
+        return [self._rows[chunk_id] for chunk_id in chunk_ids if chunk_id in self._rows]
+    
+    def ids_by_topic(self) -> Dict[str, List[str]]:
+        """Chunk ids grouped by topic (exact spelling), without loading any text"""
+        grouped = {}
+        for chunk_id, topic in zip(self.ids, self._topic):
+            grouped.setdefault(topic, []).append(chunk_id)
+        return {self.strings.values[topic]: ids for topic, ids in grouped.items()}
+    
+    def _load_texts(self, rows: List[int]) -> List[str]:
+        if self._texts is not None:
+            return [self._texts[row] for row in rows]
+        texts = self.text_loader([self.ids[row] for row in rows]) if rows else []
+        return [text or '' for text in texts]
+    
+    def materialize(self, rows: Optional[List[int]] = None) -> List[Dict]:
+        """Rebuild chunk dicts ('text', 'metadata') for rows (default: all, in insertion order)"""
+        if rows is None:
+            rows = range(len(self.ids))
+        rows = list(rows)
+        strings = self.strings.values
+        chunks = []
+        for row, text in zip(rows, self._load_texts(rows)):
+            metadata = dict(self.extras.values[self._extra[row]])
+            metadata.update(
+                chunk_id=self.ids[row],
+                source=strings[self._source[row]],
+                topic=strings[self._topic[row]],
+                subtopic=strings[self._subtopic[row]],
+                chunk_index=self._chunk_index[row]
+            )
+            chunks.append({'text': text, 'metadata': metadata})
+        return chunks
+    
+    def clear(self):
+        self.__init__(self.text_loader)
+    
+    def to_dict(self) -> Dict:
+        """JSON-serializable columns (texts only when they are kept in memory)"""
+        data = {
+            'ids': self.ids,
+            'strings': self.strings.values,
+            'extras': [list(map(list, extra)) for extra in self.extras.values],
+            'topic': self._topic.tolist(),
+            'subtopic': self._subtopic.tolist(),
+            'source': self._source.tolist(),
+            'chunk_index': self._chunk_index.tolist(),
+            'extra': self._extra.tolist()
+        }
+        if self._texts is not None:
+            data['texts'] = self._texts
+        return data
+    
+    @classmethod
+    def from_dict(cls, data: Dict, text_loader: Optional[Callable[[List[str]], List[Optional[str]]]] = None) -> 'ChunkTable':
+        """Rebuild a table (and its indexes) from to_dict() output"""
+        if text_loader is None and 'texts' not in data:
+            raise ValueError("Snapshot has no chunk texts and no text loader was given")
+        table = cls(text_loader)
+        table.ids = list(data['ids'])
+        table._rows = {chunk_id: row for row, chunk_id in enumerate(table.ids)}
+        for value in data['strings']:
+            table.strings.intern(value)
+        # Row columns refer to extras by position, so keep their order exactly
+        for extra in data['extras']:
+            extra = tuple(tuple(pair) for pair in extra)
+            table.extras.values.append(extra)
+            try:
+                table.extras._ids.setdefault(extra, len(table.extras.values) - 1)
+            except TypeError:
+                pass
+        table._topic = array('i', data['topic'])
+        table._subtopic = array('i', data['subtopic'])
+        table._source = array('i', data['source'])
+        table._chunk_index = array('i', data['chunk_index'])
+        table._extra = array('i', data['extra'])
+        if text_loader is None:
+            table._texts = list(data['texts'])
+        
+        lowered = [value.lower() for value in table.strings.values]
+        for row, (topic, source) in enumerate(zip(table._topic, table._source)):
+            table._by_topic.setdefault(lowered[topic], {})[row] = None
+            table._by_source.setdefault(source, {})[row] = None
+        return table
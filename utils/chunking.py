@@ -0,0 +1,137 @@
+"""
+Content-Defined Chunking
+Splits text on content-anchored boundaries so edits only affect nearby chunks
+"""
+
+import re
+import zlib
+import hashlib
+from typing import List, Tuple
+
+
+# Sentence boundary: terminal punctuation followed by whitespace
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+
+# Assumed average sentence length (chars) used to size the boundary divisor
+AVG_SENTENCE_CHARS = 120
+
+# Number of words hashed when falling back to word-level boundaries
+WORD_WINDOW = 3
+
+
+def chunk_id(text: str, source: str = "") -> str:
+    """
+    Content-addressed chunk ID
+
+    Depends only on the chunk text and its source file, so an unchanged chunk
+    keeps its ID no matter where it lands in a re-processed document.
+    """
+    content = f"{source}\x00{text}"
+    return hashlib.md5(content.encode()).hexdigest()
+
+
+def _piece_hash(piece: str) -> int:
+    """Stable hash of a text piece (independent of PYTHONHASHSEED)"""
+    return zlib.crc32(piece.encode('utf-8'))
+
+
+def _split_long_piece(piece: str, start: int, min_size: int, max_size: int) -> List[Tuple[int, str]]:
+    """Split a sentence longer than max_size on rolling word-window hash boundaries"""
+    pieces = []
+    words = [(m.start(), m.group(0)) for m in re.finditer(r'\S+', piece)]
+    if not words:
+        return pieces
+
+    divisor = max(1, (max_size - min_size) // 40)
+    piece_start = words[0][0]
+
+    for i in range(len(words)):
+        word_end = words[i][0] + len(words[i][1])
+        length = word_end - piece_start
+        window = ' '.join(w for _, w in words[max(0, i - WORD_WINDOW + 1):i + 1])
+
+        is_last = i == len(words) - 1
+        at_boundary = length >= min_size and _piece_hash(window) % divisor == 0
+        if is_last or at_boundary or length >= max_size:
+            pieces.append((start + piece_start, piece[piece_start:word_end]))
+            if not is_last:
+                piece_start = words[i + 1][0]
+
+    return pieces
+
+
+def split_content_defined(
+    text: str,
+    target_size: int = 1000,
+    min_size: int = None,
+    max_size: int = None,
+    overlap: int = 200
+) -> List[Tuple[int, str]]:
+    """
+    Split text into chunks whose boundaries are chosen by content, not position
+
+    A chunk may end after a sentence once it holds at least min_size characters
+    and the sentence's hash hits the boundary divisor; it must end before
+    exceeding max_size. Because the cut decision depends only on local content,
+    inserting or deleting text shifts boundaries only until the next shared
+    boundary, and every later chunk keeps the same text.
+
+    Args:
+        text: Cleaned document text
+        target_size: Desired average chunk size in characters
+        min_size: Minimum chunk size (default: target_size // 2)
+        max_size: Maximum chunk size (default: target_size * 2)
+        overlap: Carry the previous chunk's last sentence into the next chunk
+                 when it is at most this many characters (0 disables overlap)
+
+    Returns:
+        List of (start_offset, chunk_text) tuples
+    """
+    if not text or not text.strip():
+        return []
+
+    min_size = min_size or max(1, target_size // 2)
+    max_size = max_size or target_size * 2
+    divisor = max(1, (target_size - min_size) // AVG_SENTENCE_CHARS)
+
+    # Split into sentence pieces with their offsets
+    pieces = []
+    position = 0
+    for sentence in SENTENCE_BOUNDARY.split(text):
+        start = text.find(sentence, position)
+        position = start + len(sentence)
+        if not sentence.strip():
+            continue
+        if len(sentence) > max_size:
+            pieces.extend(_split_long_piece(sentence, start, min_size, max_size))
+        else:
+            pieces.append((start, sentence))
+
+    chunks = []
+    current = []
+    current_length = 0
+    carried = None
+
+    for start, piece in pieces:
+        if current and current_length + len(piece) + 1 > max_size:
+            chunks.append(current)
+            carried = current[-1]
+            current, current_length = [], 0
+
+        if not current and carried is not None and overlap and len(carried[1]) <= overlap:
+            current.append(carried)
+            current_length = len(carried[1])
+        carried = None
+
+        current.append((start, piece))
+        current_length += len(piece) + 1
+
+        if current_length >= min_size and _piece_hash(piece) % divisor == 0:
+            chunks.append(current)
+            carried = current[-1]
+            current, current_length = [], 0
+
+    if current:
+        chunks.append(current)
+
+    return [(group[0][0], ' '.join(piece for _, piece in group)) for group in chunks]
@@ -0,0 +1,84 @@
+"""
+Clustering
+Numpy k-means over embedding vectors for picking representative chunks
+"""
+
+from typing import List, Tuple
+import numpy as np
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+
+
+def kmeans(vectors: np.ndarray, k: int, iterations: int = 25, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Spherical k-means (cosine similarity) with k-means++ initialization
+    
+    Args:
+        vectors: Array of shape (n, dim)
+        k: Number of clusters (clipped to n)
+        iterations: Maximum Lloyd iterations
+        seed: Random seed
+    
+    Returns:
+        Tuple of (unit-length centroids of shape (k, dim), labels of shape (n,))
+    """
+    vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+    n = len(vectors)
+    k = max(1, min(k, n))
+    rng = np.random.RandomState(seed)
+    
+    # k-means++: spread initial centroids out by sampling proportional to distance
+    centroids = [vectors[rng.randint(n)]]
+    distances = 1.0 - vectors @ centroids[0]
+    for _ in range(1, k):
+        weights = np.clip(distances, 0, None)
+        total = weights.sum()
+        index = rng.choice(n, p=weights / total) if total > 0 else rng.randint(n)
+        centroids.append(vectors[index])
+        distances = np.minimum(distances, 1.0 - vectors @ vectors[index])
+    centroids = np.stack(centroids)
+    
+    labels = np.full(n, -1)
+    for _ in range(iterations):
+        new_labels = np.argmax(vectors @ centroids.T, axis=1)
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        for cluster in range(k):
+            members = vectors[labels == cluster]
+            if len(members):
+                centroids[cluster] = members.sum(axis=0)
+        centroids = _normalize(centroids)
+    
+    return centroids, labels
+
+
+def representatives(vectors: np.ndarray, k: int, per_cluster: int = 3, seed: int = 0) -> List[List[int]]:
+    """
+    Cluster vectors and pick the members closest to each centroid
+    
+    Args:
+        vectors: Array of shape (n, dim)
+        k: Number of clusters
+        per_cluster: Representatives returned per cluster
+        seed: Random seed
+    
+    Returns:
+        One list of row indices per non-empty cluster, most central first,
+        ordered by cluster size (largest first)
+    """
+    if len(vectors) == 0:
+        return []
+    centroids, labels = kmeans(vectors, k, seed=seed)
+    similarity = _normalize(np.asarray(vectors, dtype=np.float32)) @ centroids.T
+    
+    clusters = []
+    for cluster in range(len(centroids)):
+        members = np.flatnonzero(labels == cluster)
+        if len(members):
+            central = members[np.argsort(-similarity[members, cluster])][:per_cluster]
+            clusters.append((len(members), central.tolist()))
+    clusters.sort(key=lambda item: -item[0])
+    return [members for _, members in clusters]
@@ -0,0 +1,157 @@
+"""
+Cohort Planner
+Vectorized revision plans for a whole cohort, stored as flat numpy columns
+"""
+
+from datetime import date, datetime
+from typing import List, Dict, Optional, Sequence, Union
+import numpy as np
+
+# Monday-Friday, as used by PlannerAgent when studying fewer than 7 days a week
+WEEKDAYS = '1111100'
+
+DateLike = Union[str, date, datetime, np.datetime64]
+
+
+def _as_days(values: Union[DateLike, Sequence[Optional[DateLike]], None], count: int, default: np.ndarray) -> np.ndarray:
+    """Dates (scalar or per student, None for default) as a datetime64[D] array"""
+    if values is None:
+        return default.copy()
+    if isinstance(values, (str, date, np.datetime64)):
+        values = [values] * count
+    days = np.array(
+        [np.datetime64(value.date() if isinstance(value, datetime) else value, 'D') if value is not None
+         else np.datetime64('NaT') for value in values],
+        dtype='datetime64[D]'
+    )
+    missing = np.isnat(days)
+    days[missing] = default[missing]
+    return days
+
+
+class CohortPlans:
+    """
+    Revision plans for many students as flat columns
+    
+    Student i's items are rows offsets[i]:offsets[i + 1] of dates, topic_ids
+    and high_priority. Topic names and metadata are stored once in topics.
+    """
+    
+    def __init__(self, topics: List[Dict], offsets: np.ndarray, dates: np.ndarray,
+                 topic_ids: np.ndarray, high_priority: np.ndarray):
+        self.topics = topics
+        self.topic_names = [topic.get('topic', f'Topic {i + 1}') for i, topic in enumerate(topics)]
+        self.offsets = offsets
+        self.dates = dates
+        self.topic_ids = topic_ids
+        self.high_priority = high_priority
+    
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+    
+    @property
+    def total_items(self) -> int:
+        return int(self.offsets[-1])
+    
+    @property
+    def nbytes(self) -> int:
+        return self.offsets.nbytes + self.dates.nbytes + self.topic_ids.nbytes + self.high_priority.nbytes
+    
+    def counts(self) -> np.ndarray:
+        """Number of study days per student"""
+        return np.diff(self.offsets)
+    
+    def plan_for(self, student: int) -> List[Dict]:
+        """One student's plan in the same item format as PlannerAgent.create_revision_plan"""
+        start, end = self.offsets[student], self.offsets[student + 1]
+        plan = []
+        for day, (item_date, topic_id, high) in enumerate(zip(
+            self.dates[start:end].astype(str), self.topic_ids[start:end], self.high_priority[start:end]
+        )):
+            topic = self.topics[topic_id]
+            plan.append({
+                'date': str(item_date),
+                'day': day + 1,
+                'topic': self.topic_names[topic_id],
+                'subtopics': topic.get('subtopics', []),
+                'key_points': topic.get('key_points', []),
+                'status': 'pending',
+                'estimated_time': '1-2 hours',
+                'priority': 'high' if high else 'medium'
+            })
+        return plan
+
+
+def plan_cohort(
+    topics: List[Dict],
+    exam_dates: Union[DateLike, Sequence[Optional[DateLike]]],
+    study_days_per_week: Union[int, Sequence[int]] = 5,
+    weak_topics: Optional[Sequence[Optional[Sequence[str]]]] = None,
+    start_dates: Union[DateLike, Sequence[Optional[DateLike]], None] = None
+) -> CohortPlans:
+    """
+    Build revision plans for every student in one vectorized pass
+    
+    Follows PlannerAgent.create_revision_plan: topics are ordered by number of
+    key points and cycled one per study day, weekends are skipped unless the
+    student studies 7 days a week, and the first 30% of days are high priority.
+    A student's weak topics are added to the front of their cycle, so they come
+    up twice as often.
+    
+    Args:
+        topics: List of topics with metadata
+        exam_dates: Exam date per student (None: 30 days after start)
+        study_days_per_week: Scalar or per-student study days per week
+        weak_topics: Per-student lists of weak topic names
+        start_dates: Scalar or per-student start dates (default: today)
+    
+    Returns:
+        CohortPlans with one plan per exam date
+    """
+    if isinstance(exam_dates, (str, date, np.datetime64)):
+        exam_dates = [exam_dates]
+    students = len(exam_dates)
+    
+    topics = sorted(topics, key=lambda t: len(t.get('key_points', [])), reverse=True)
+    today = np.full(students, np.datetime64(date.today(), 'D'))
+    starts = _as_days(start_dates, students, today)
+    exams = _as_days(exam_dates, students, starts + 30)
+    study_days = np.broadcast_to(np.asarray(study_days_per_week, dtype=np.int64), (students,))
+    
+    total_days = (exams - starts).astype(np.int64)
+    total_days[total_days <= 0] = 30
+    counts = (total_days / 7 * study_days).astype(np.int64)
+    if not topics:
+        counts[:] = 0
+    offsets = np.zeros(students + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    
+    # One row per (student, study day)
+    student = np.repeat(np.arange(students), counts)
+    day = np.arange(offsets[-1]) - offsets[student]
+    
+    dates = starts[student] + day
+    weekdays_only = (study_days < 7)[student]
+    dates[weekdays_only] = np.busday_offset(
+        starts[student[weekdays_only]], day[weekdays_only], roll='forward', weekmask=WEEKDAYS
+    )
+    
+    # Each student's topic cycle: their weak topics, then every topic in priority order
+    topic_count = len(topics)
+    topic_index = {topic.get('topic', f'Topic {i + 1}'): i for i, topic in enumerate(topics)}
+    weak_ids = [
+        sorted({topic_index[name] for name in names if name in topic_index}) if names else []
+        for names in (weak_topics or [None] * students)
+    ]
+    lengths = topic_count + np.fromiter((len(ids) for ids in weak_ids), dtype=np.int64, count=students)
+    width = int(lengths.max()) if students else topic_count
+    cycles = np.empty((students, max(width, 1)), dtype=np.int32)
+    cycles[:] = np.resize(np.arange(topic_count, dtype=np.int32), cycles.shape[1])
+    for i, ids in enumerate(weak_ids):
+        if ids:
+            cycles[i, :len(ids)] = ids
+            cycles[i, len(ids):lengths[i]] = np.arange(topic_count)
+    topic_ids = cycles[student, day % np.maximum(lengths[student], 1)] if len(day) else np.zeros(0, dtype=np.int32)
+    
+    high_priority = day < counts[student] * 0.3
+    return CohortPlans(topics, offsets, dates, topic_ids, high_priority)
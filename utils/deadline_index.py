@@ -0,0 +1,80 @@
+"""
+Deadline Index
+Deadlines kept sorted by date so date-window queries are a bisect plus a slice
+"""
+
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime
+from typing import List, Dict, Iterable, Optional, Set
+
+
+class DeadlineFilter:
+    """A user's subscriptions: deadlines from given sources or mentioning given keywords"""
+    
+    def __init__(self, sources: Optional[Set[str]] = None, keywords: Optional[Set[str]] = None):
+        self.sources = set(sources or ())
+        self.keywords = tuple(keyword.lower() for keyword in keywords or ())
+    
+    @property
+    def everything(self) -> bool:
+        """No subscriptions means every deadline"""
+        return not self.sources and not self.keywords
+    
+    def matches(self, record: Dict) -> bool:
+        if self.everything or record.get('source') in self.sources:
+            return True
+        event = record.get('_event_lower')
+        if event is None:
+            event = (record.get('event') or '').lower()
+        return any(keyword in event for keyword in self.keywords)
+
+
+class DeadlineIndex:
+    """
+    Deadline records sorted by date
+    
+    Dates are parsed once on insert and kept as an ordinal array parallel to
+    the records, so "next N days" is two bisects and a slice.
+    """
+    
+    def __init__(self, deadlines: Iterable[Dict] = ()):
+        entries = sorted(
+            ((parsed.toordinal(), record) for parsed, record in map(self._prepare, deadlines) if parsed),
+            key=lambda entry: entry[0]
+        )
+        self._ordinals = [ordinal for ordinal, _ in entries]
+        self._records = [record for _, record in entries]
+    
+    @staticmethod
+    def _prepare(deadline: Dict):
+        """(date, record with parsed date and lowercased event), or (None, None) if unparseable"""
+        try:
+            parsed = datetime.fromisoformat(deadline['date']).date()
+        except (KeyError, TypeError, ValueError):
+            return None, None
+        return parsed, {**deadline, '_date': parsed, '_event_lower': (deadline.get('event') or '').lower()}
+    
+    def __len__(self) -> int:
+        return len(self._records)
+    
+    def __iter__(self):
+        """Records in date order (with parsed '_date' and lowercased '_event_lower')"""
+        return iter(self._records)
+    
+    def window(self, start: date, end: date, deadline_filter: Optional[DeadlineFilter] = None) -> List[Dict]:
+        """
+        Deadlines dated start..end inclusive, in date order
+        
+        Returned dicts are copies with 'days_until' (relative to start) added.
+        """
+        low = bisect_left(self._ordinals, start.toordinal())
+        high = bisect_right(self._ordinals, end.toordinal())
+        origin = start.toordinal()
+        results = []
+        for i in range(low, high):
+            record = self._records[i]
+            if deadline_filter is None or deadline_filter.matches(record):
+                result = {key: value for key, value in record.items() if not key.startswith('_')}
+                result['days_until'] = self._ordinals[i] - origin
+                results.append(result)
+        return results
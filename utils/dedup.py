@@ -0,0 +1,171 @@
+"""
+Near-Duplicate Detection
+MinHash LSH over word shingles to suppress repeated boilerplate chunks at ingest
+"""
+
+import re
+import zlib
+import logging
+from typing import List, Dict, Optional, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Mersenne prime used as the MinHash modulus
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+# Multipliers stay below 2^31 so a * crc32 + b fits in uint64 without wrapping
+_MAX_COEF = (1 << 31) - 1
+
+
+class NearDuplicateDetector:
+    """
+    Finds chunks whose text is nearly identical to an earlier chunk
+    
+    Each chunk is reduced to a MinHash signature over word shingles. Signatures
+    are split into bands and bucketed (LSH), so only chunks sharing a bucket are
+    compared; a candidate is a duplicate when its estimated Jaccard similarity
+    reaches the threshold. The index is incremental, so chunks can be checked
+    one at a time as they stream in.
+    """
+    
+    def __init__(
+        self,
+        threshold: float = 0.85,
+        num_perm: int = 128,
+        bands: int = 32,
+        shingle_size: int = 5,
+        seed: int = 1
+    ):
+        """
+        Initialize detector
+        
+        Args:
+            threshold: Estimated Jaccard similarity at or above which chunks are duplicates
+            num_perm: Number of MinHash permutations (signature length)
+            bands: Number of LSH bands (num_perm must be divisible by bands)
+            shingle_size: Words per shingle
+            seed: Seed for the permutation coefficients
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, _MAX_COEF, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, _MAX_HASH, size=num_perm, dtype=np.uint64)
+        
+        self.reset()
+    
+    def reset(self):
+        """Forget all indexed chunks"""
+        self._buckets = [{} for _ in range(self.bands)]
+        self._signatures = []
+        self._representatives = []
+        self.duplicates_found = 0
+    
+    def _shingles(self, text: str) -> np.ndarray:
+        """Hash word shingles of the normalized text to 32-bit integers"""
+        words = re.findall(r'\w+', text.lower())
+        if len(words) < self.shingle_size:
+            shingles = {' '.join(words)}
+        else:
+            shingles = {
+                ' '.join(words[i:i + self.shingle_size])
+                for i in range(len(words) - self.shingle_size + 1)
+            }
+        return np.fromiter(
+            (zlib.crc32(s.encode('utf-8')) for s in shingles),
+            dtype=np.uint64,
+            count=len(shingles)
+        )
+    
+    def signature(self, text: str) -> np.ndarray:
+        """Compute the MinHash signature of a text"""
+        hashes = self._shingles(text)
+        # (a * x + b) mod p for every permutation/shingle pair
+        permuted = (np.outer(self._a, hashes) + self._b[:, None]) % _PRIME
+        return permuted.min(axis=1)
+    
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [
+            signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            for band in range(self.bands)
+        ]
+    
+    def check(self, chunk: Dict) -> Optional[Dict]:
+        """
+        Check a chunk against the index and add it if it is new
+        
+        When the chunk is a near-duplicate, it is not indexed; instead the
+        representative chunk's metadata records the duplicate's source in
+        'alt_sources' and increments 'duplicate_count'.
+        
+        Args:
+            chunk: Dict with 'text' and 'metadata' keys
+        
+        Returns:
+            The representative chunk if this chunk is a duplicate, otherwise None
+        """
+        signature = self.signature(chunk.get('text', ''))
+        keys = self._band_keys(signature)
+        
+        candidates = set()
+        for band, key in enumerate(keys):
+            candidates.update(self._buckets[band].get(key, ()))
+        
+        for candidate in sorted(candidates):
+            similarity = float(np.mean(self._signatures[candidate] == signature))
+            if similarity >= self.threshold:
+                representative = self._representatives[candidate]
+                self._merge(representative, chunk)
+                self.duplicates_found += 1
+                return representative
+        
+        index = len(self._signatures)
+        self._signatures.append(signature)
+        self._representatives.append(chunk)
+        for band, key in enumerate(keys):
+            self._buckets[band].setdefault(key, []).append(index)
+        return None
+    
+    def _merge(self, representative: Dict, duplicate: Dict):
+        """Record the duplicate's source on the representative chunk"""
+        metadata = representative.setdefault('metadata', {})
+        source = duplicate.get('metadata', {}).get('source', 'Unknown')
+        
+        # Chroma metadata values must be scalars, so alternates are a comma-joined string
+        alt_sources = [s for s in metadata.get('alt_sources', '').split(',') if s]
+        if source != metadata.get('source') and source not in alt_sources:
+            alt_sources.append(source)
+        metadata['alt_sources'] = ','.join(alt_sources)
+        metadata['duplicate_count'] = metadata.get('duplicate_count', 0) + 1
+    
+    def deduplicate(self, chunks: List[Dict]) -> Tuple[List[Dict], Dict]:
+        """
+        Drop near-duplicate chunks, keeping the first occurrence of each
+        
+        Args:
+            chunks: List of chunks with 'text' and 'metadata' keys
+        
+        Returns:
+            Tuple of (unique chunks, stats dict with 'total', 'unique' and
+            'embeddings_saved' counts)
+        """
+        unique = [chunk for chunk in chunks if self.check(chunk) is None]
+        stats = {
+            'total': len(chunks),
+            'unique': len(unique),
+            'embeddings_saved': len(chunks) - len(unique)
+        }
+        if stats['embeddings_saved']:
+            logger.info(
+                "Near-duplicate suppression skipped %d of %d chunks",
+                stats['embeddings_saved'], stats['total']
+            )
+        return unique, stats
@@ -0,0 +1,124 @@
+"""
+Multi-Process Embedding Pool
+Spreads bulk embedding across persistent worker processes that each hold the model
+"""
+
+import os
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Dict
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Encode function of the model held by each worker process (set by _init_worker)
+_worker_encode = None
+
+
+def _init_worker(backend: str, model_name: str, threads_per_worker: int, onnx_options: Dict):
+    """Load the embedding model once per worker process"""
+    global _worker_encode
+    
+    if backend == "onnx":
+        from utils.onnx_embeddings import OnnxEmbeddingModel
+        _worker_encode = OnnxEmbeddingModel(model_name, num_threads=threads_per_worker, **onnx_options).encode
+    else:
+        os.environ.setdefault("CUDA_VISIBLE_DEVICES", "")
+        import torch
+        # Short sequences scale poorly with intra-op threads; parallelism comes from processes
+        torch.set_num_threads(threads_per_worker)
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(model_name, device="cpu")
+        _worker_encode = lambda texts: model.encode(texts, show_progress_bar=False, convert_to_numpy=True)
+
+
+def _encode_batch(texts: List[str]) -> np.ndarray:
+    """Embed one batch in a worker process"""
+    return np.asarray(_worker_encode(texts), dtype=np.float32)
+
+
+class EmbeddingPool:
+    """
+    Persistent pool of embedding worker processes
+    
+    Workers are started on first use and kept alive for later ingests. Texts
+    are sorted by length before batching so each batch pads to similar lengths,
+    and results are returned in the original order.
+    """
+    
+    def __init__(
+        self,
+        backend: str = "local",
+        model_name: str = "all-MiniLM-L6-v2",
+        num_workers: Optional[int] = None,
+        batch_size: int = 64,
+        threads_per_worker: int = 1,
+        onnx_options: Optional[Dict] = None
+    ):
+        """
+        Initialize pool (workers start lazily)
+        
+        Args:
+            backend: 'local' (SentenceTransformer) or 'onnx'
+            model_name: Sentence transformer model name
+            num_workers: Worker process count (default: CPU count - 1)
+            batch_size: Texts per task sent to a worker
+            threads_per_worker: Intra-op threads per worker
+            onnx_options: Extra OnnxEmbeddingModel kwargs (model_dir, quantize)
+        """
+        self.backend = backend
+        self.model_name = model_name
+        self.num_workers = num_workers or max(1, (os.cpu_count() or 2) - 1)
+        self.batch_size = batch_size
+        self.threads_per_worker = threads_per_worker
+        self.onnx_options = onnx_options or {}
+        self._executor = None
+    
+    def _ensure_started(self):
+        if self._executor is None:
+            logger.info("Starting embedding pool with %d %s workers", self.num_workers, self.backend)
+            # spawn: forking a process that already imported torch is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.num_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.backend, self.model_name, self.threads_per_worker, self.onnx_options)
+            )
+    
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts across the worker pool
+        
+        Args:
+            texts: List of strings to embed
+        
+        Returns:
+            float32 array of embeddings in the same order as texts
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        
+        self._ensure_started()
+        
+        # Sort by length so each batch holds similarly sized texts (minimal padding)
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        batches = [order[i:i + self.batch_size] for i in range(0, len(order), self.batch_size)]
+        futures = [
+            self._executor.submit(_encode_batch, [texts[i] for i in batch])
+            for batch in batches
+        ]
+        
+        results = None
+        for batch, future in zip(batches, futures):
+            embeddings = future.result()
+            if results is None:
+                results = np.empty((len(texts), embeddings.shape[1]), dtype=np.float32)
+            results[batch] = embeddings
+        return results
+    
+    def close(self):
+        """Shut down worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
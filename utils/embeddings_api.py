@@ -5,8 +5,10 @@ Provides fallback embedding generation using OpenAI or Google Gemini APIs
 
 import os
 import logging
+import threading
 from typing import List, Union
 import numpy as np
+from utils.async_embeddings import AsyncEmbeddingClient
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +24,18 @@ class APiEmbeddingsWrapper:
         self.provider = os.getenv("EMB_PROVIDER", "gemini").lower()
         self.api_key = None
         self.client = None
+        self.base_url = os.getenv("OPENAI_BASE_URL") or None
+        self._async_openai = None
+        self._async_openai_lock = threading.Lock()
+        
+        # Batching, concurrency, rate limit and retry settings for API requests
+        self.async_client = AsyncEmbeddingClient(
+            self._aembed_openai_batch,
+            max_batch_size=int(os.getenv("EMB_BATCH_SIZE", "256")),
+            max_concurrency=int(os.getenv("EMB_MAX_CONCURRENCY", "4")),
+            requests_per_second=float(os.getenv("EMB_REQUESTS_PER_SECOND", "5")),
+            max_retries=int(os.getenv("EMB_MAX_RETRIES", "5"))
+        )
         
         # Try to get API key
         if self.provider == "openai":
@@ -29,7 +43,7 @@ class APiEmbeddingsWrapper:
             if self.api_key:
                 try:
                     import openai
-                    self.client = openai.OpenAI(api_key=self.api_key)
+                    self.client = openai.OpenAI(api_key=self.api_key, base_url=self.base_url)
                     logger.info("Initialized OpenAI embeddings client")
                 except ImportError:
                     logger.warning("openai package not installed. Install with: pip install openai")
@@ -59,6 +73,11 @@ class APiEmbeddingsWrapper:
                 f"Embedding calls will raise RuntimeError."
             )
     
+    @property
+    def is_available(self) -> bool:
+        """True if embed() can actually reach a provider (Gemini embeddings are not implemented yet)"""
+        return bool(self.api_key) and self.provider == "openai"
+    
     def embed(self, texts: Union[str, List[str]]) -> List[List[float]]:
         """
         Generate embeddings using API provider
@@ -91,17 +110,39 @@ class APiEmbeddingsWrapper:
             raise RuntimeError(f"Failed to generate embeddings via {self.provider} API: {e}") from e
     
     def _embed_openai(self, texts: List[str]) -> List[List[float]]:
-        """Generate embeddings using OpenAI API"""
+        """Generate embeddings using OpenAI API (batched, concurrent, retried)"""
         try:
-            response = self.client.embeddings.create(
-                model="text-embedding-3-small",  # or text-embedding-ada-002
-                input=texts
-            )
-            return [item.embedding for item in response.data]
+            return self.async_client.embed(texts)
         except Exception as e:
             logger.error(f"OpenAI embedding API error: {e}")
             raise
     
+    async def _aembed_openai_batch(self, texts: List[str]) -> List[List[float]]:
+        """Send one embeddings request through the async OpenAI client"""
+        import openai
+        
+        # httpx connections are bound to an event loop; every request runs on
+        # async_client's single loop, so one client (and its pool) is reused
+        with self._async_openai_lock:
+            if self._async_openai is None:
+                # Retries are handled by AsyncEmbeddingClient
+                self._async_openai = openai.AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0)
+            client = self._async_openai
+        
+        response = await client.embeddings.create(
+            model="text-embedding-3-small",  # or text-embedding-ada-002
+            input=texts
+        )
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+    
+    def close(self):
+        """Close the async OpenAI client's connections and stop the request loop"""
+        with self._async_openai_lock:
+            client, self._async_openai = self._async_openai, None
+        if client is not None:
+            self.async_client.run(client.close())
+        self.async_client.close()
+    
     def _embed_gemini(self, texts: List[str]) -> List[List[float]]:
         """
         Generate embeddings using Google Gemini API
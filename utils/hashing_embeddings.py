@@ -0,0 +1,144 @@
+"""
+Hashing Embeddings
+Dependency-light TF-IDF embeddings via feature hashing (numpy only, no torch)
+"""
+
+import re
+import zlib
+import logging
+from pathlib import Path
+from typing import List, Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+
+class HashingEmbeddingModel:
+    """
+    Embeds text as hashed, IDF-weighted unigram and bigram counts
+    
+    Each feature is hashed (crc32) into one of `dim` buckets with a hashed
+    sign, term counts are log-scaled, weighted by inverse document frequency
+    and L2-normalized, so cosine distance behaves like TF-IDF similarity.
+    There is no model to load: startup is a numpy import plus an optional
+    small document-frequency file.
+    """
+    
+    def __init__(self, dim: int = 1024, state_path: Optional[str] = None, cache_size: int = 500_000,
+                 batch_size: int = 1024):
+        """
+        Initialize hashing embedder
+        
+        Args:
+            dim: Embedding dimension (number of hash buckets)
+            state_path: .npz file holding fitted document frequencies
+            cache_size: Maximum cached feature -> bucket lookups
+            batch_size: Texts per dense term matrix (bounds memory to batch_size x dim)
+        """
+        self.dim = dim
+        self.batch_size = batch_size
+        self.state_path = Path(state_path) if state_path else None
+        self.cache_size = cache_size
+        self._cache = {}
+        self.doc_freq = np.zeros(dim, dtype=np.float64)
+        self.doc_count = 0
+        
+        if self.state_path and self.state_path.exists():
+            self.load()
+    
+    @property
+    def fitted(self) -> bool:
+        """True once document frequencies have been learned"""
+        return self.doc_count > 0
+    
+    def _bucket(self, feature: str) -> int:
+        """Signed bucket for a feature: +(i + 1) or -(i + 1)"""
+        bucket = self._cache.get(feature)
+        if bucket is None:
+            h = zlib.crc32(feature.encode('utf-8'))
+            bucket = (h % self.dim) + 1
+            if (h >> 31) & 1:
+                bucket = -bucket
+            if len(self._cache) >= self.cache_size:
+                self._cache.clear()
+            self._cache[feature] = bucket
+        return bucket
+    
+    def _features(self, text: str) -> List[int]:
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        features = [self._bucket(token) for token in tokens]
+        features.extend(self._bucket(f"{a} {b}") for a, b in zip(tokens, tokens[1:]))
+        return features
+    
+    def _term_matrix(self, texts: List[str]) -> np.ndarray:
+        """Signed hashed term counts, shape (len(texts), dim)"""
+        rows, buckets = [], []
+        for row, text in enumerate(texts):
+            features = self._features(text)
+            rows.append(np.full(len(features), row, dtype=np.int64))
+            buckets.append(np.asarray(features, dtype=np.int64))
+        
+        if not rows:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        
+        rows = np.concatenate(rows)
+        buckets = np.concatenate(buckets)
+        columns = np.abs(buckets) - 1
+        signs = np.sign(buckets).astype(np.float32)
+        flat = np.bincount(rows * self.dim + columns, weights=signs, minlength=len(texts) * self.dim)
+        return flat.astype(np.float32).reshape(len(texts), self.dim)
+    
+    def fit(self, texts: List[str]):
+        """Accumulate document frequencies from texts"""
+        texts = list(texts)
+        for start in range(0, len(texts), self.batch_size):
+            self.doc_freq += np.count_nonzero(self._term_matrix(texts[start:start + self.batch_size]), axis=0)
+        self.doc_count += len(texts)
+    
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts
+        
+        Args:
+            texts: List of strings to embed
+        
+        Returns:
+            float32 array of shape (len(texts), dim) with unit-length rows
+            (all-zero rows for texts without tokens)
+        """
+        texts = list(texts)
+        idf = None
+        if self.fitted:
+            idf = (np.log((1 + self.doc_count) / (1 + self.doc_freq)) + 1).astype(np.float32)
+        
+        # Dense float32 batches: peak memory stays batch_size x dim regardless of corpus size
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for start in range(0, len(texts), self.batch_size):
+            weights = self._term_matrix(texts[start:start + self.batch_size])
+            np.multiply(np.sign(weights), np.log1p(np.abs(weights)), out=weights)
+            if idf is not None:
+                weights *= idf
+            norms = np.linalg.norm(weights, axis=1, keepdims=True)
+            out[start:start + len(weights)] = weights / np.clip(norms, 1e-12, None)
+        return out
+    
+    def save(self, path: Optional[str] = None):
+        """Persist document frequencies"""
+        path = Path(path) if path else self.state_path
+        if path is None:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'wb') as f:
+            np.savez(f, doc_freq=self.doc_freq, doc_count=self.doc_count, dim=self.dim)
+    
+    def load(self, path: Optional[str] = None):
+        """Load persisted document frequencies"""
+        path = Path(path) if path else self.state_path
+        state = np.load(path)
+        if int(state['dim']) != self.dim:
+            logger.warning("Ignoring hashing state %s with dim=%d (expected %d)", path, int(state['dim']), self.dim)
+            return
+        self.doc_freq = state['doc_freq'].astype(np.float64)
+        self.doc_count = int(state['doc_count'])
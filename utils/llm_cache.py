@@ -0,0 +1,107 @@
+"""
+LLM Response Cache
+SQLite-backed cache of chat model responses with TTL and LRU size bound
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Optional, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class CachedResponse:
+    """Response message restored from the cache (exposes .content like a chat model reply)"""
+    
+    def __init__(self, content: str, usage_metadata: Optional[Dict] = None):
+        self.content = content
+        self.usage_metadata = usage_metadata or {}
+        self.cached = True
+
+
+class LLMResponseCache:
+    """
+    Persistent cache of LLM responses keyed by a request hash
+    
+    Entries expire after ttl_seconds. When more than max_entries are stored,
+    the least recently used entries are evicted.
+    """
+    
+    def __init__(self, path: str, ttl_seconds: float = 7 * 86400, max_entries: int = 5000):
+        """
+        Initialize cache
+        
+        Args:
+            path: SQLite database file
+            ttl_seconds: Entry lifetime
+            max_entries: Maximum stored responses
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, model TEXT, content TEXT NOT NULL, usage TEXT, "
+                "created REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses (last_access)")
+    
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5)
+    
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """Cached response for key, or None if missing or expired"""
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT content, usage, created FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                content, usage, created = row
+                if now - created > self.ttl_seconds:
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    return None
+                conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+        except sqlite3.Error as e:
+            logger.warning("LLM cache read failed: %s", e)
+            return None
+        return CachedResponse(content, json.loads(usage) if usage else None)
+    
+    def put(self, key: str, model: str, response):
+        """Store a response (only its content and usage metadata are kept)"""
+        now = time.time()
+        usage = getattr(response, 'usage_metadata', None)
+        try:
+            with self._lock, self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, model, content, usage, created, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, model, str(response.content), json.dumps(dict(usage)) if usage else None, now, now)
+                )
+                (count,) = conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+                if count > self.max_entries:
+                    conn.execute(
+                        "DELETE FROM responses WHERE key IN "
+                        "(SELECT key FROM responses ORDER BY last_access LIMIT ?)",
+                        (count - self.max_entries,)
+                    )
+        except (sqlite3.Error, TypeError, ValueError, AttributeError) as e:
+            logger.warning("LLM cache write failed: %s", e)
+    
+    def clear(self):
+        """Remove every cached response"""
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM responses")
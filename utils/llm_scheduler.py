@@ -0,0 +1,156 @@
+"""
+LLM Request Scheduler
+Priority classes, per-user fair queuing and global concurrency/token-rate limits for LLM calls
+
+Requests wait in one queue per priority class (interactive chat before
+on-demand generation before background ingest work). Within a class, users
+take turns round-robin so one user's bulk job cannot starve another's. A
+request starts only when a concurrency slot is free and the token bucket
+holds enough tokens for its estimated prompt size.
+"""
+
+import time
+import logging
+import threading
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 0
+GENERATION = 1
+BACKGROUND = 2
+PRIORITY_NAMES = {INTERACTIVE: 'interactive', GENERATION: 'generation', BACKGROUND: 'background'}
+
+_current_user: ContextVar[str] = ContextVar("current_user", default="default")
+
+
+def set_current_user(user_id: str):
+    """Attribute LLM calls made in the current context (request/session) to user_id"""
+    _current_user.set(user_id)
+
+
+def get_current_user() -> str:
+    return _current_user.get()
+
+
+class SchedulerTimeout(TimeoutError):
+    """Raised when a request is still queued at its deadline"""
+
+
+class _Ticket:
+    __slots__ = ('priority', 'user', 'tokens', 'enqueued_at')
+    
+    def __init__(self, priority: int, user: str, tokens: float):
+        self.priority = priority
+        self.user = user
+        self.tokens = tokens
+        self.enqueued_at = time.monotonic()
+
+
+class LLMScheduler:
+    """Admits LLM requests by priority, fairly across users, within global limits"""
+    
+    def __init__(self, max_concurrency: int = 4, tokens_per_minute: float = 0.0, burst_tokens: Optional[float] = None):
+        """
+        Initialize scheduler
+        
+        Args:
+            max_concurrency: Upstream requests allowed in flight at once
+            tokens_per_minute: Sustained prompt-token budget (0 = unlimited)
+            burst_tokens: Token bucket capacity (default: one minute of budget)
+        """
+        self.max_concurrency = max_concurrency
+        self.tokens_per_second = tokens_per_minute / 60.0
+        self.capacity = burst_tokens or tokens_per_minute
+        self._tokens = self.capacity
+        self._refilled_at = time.monotonic()
+        self._in_flight = 0
+        # priority -> OrderedDict(user -> deque of tickets); dict order is the round-robin order
+        self._queues = {priority: OrderedDict() for priority in PRIORITY_NAMES}
+        self._condition = threading.Condition()
+    
+    def _refill(self):
+        if not self.tokens_per_second:
+            return
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._refilled_at) * self.tokens_per_second)
+        self._refilled_at = now
+    
+    def _next_ticket(self) -> Optional[_Ticket]:
+        """The ticket that should be admitted next (highest priority, next user in turn)"""
+        for priority in sorted(self._queues):
+            users = self._queues[priority]
+            if users:
+                return next(iter(users.values()))[0]
+        return None
+    
+    def _dequeue(self, ticket: _Ticket):
+        users = self._queues[ticket.priority]
+        tickets = users[ticket.user]
+        tickets.popleft()
+        del users[ticket.user]
+        if tickets:
+            users[ticket.user] = tickets  # back of the rotation
+    
+    def queue_depth(self) -> int:
+        with self._condition:
+            return sum(len(tickets) for users in self._queues.values() for tickets in users.values())
+    
+    def acquire(self, priority: int = GENERATION, user: Optional[str] = None, tokens: float = 0.0, timeout: Optional[float] = None) -> float:
+        """
+        Wait for this request's turn and take a concurrency slot
+        
+        Args:
+            priority: INTERACTIVE, GENERATION or BACKGROUND
+            user: User the request belongs to (default: current context's user)
+            tokens: Estimated prompt tokens, charged to the rate limit
+            timeout: Seconds to wait before giving up
+        
+        Returns:
+            Seconds spent queued
+        
+        Raises:
+            SchedulerTimeout: If the request is still queued after timeout
+        """
+        ticket = _Ticket(priority, user or get_current_user(), min(tokens, self.capacity) if self.capacity else 0.0)
+        deadline = None if timeout is None else ticket.enqueued_at + timeout
+        
+        with self._condition:
+            self._queues[priority].setdefault(ticket.user, deque()).append(ticket)
+            try:
+                while True:
+                    wait = None
+                    if self._next_ticket() is ticket and self._in_flight < self.max_concurrency:
+                        self._refill()
+                        if not self.tokens_per_second or self._tokens >= ticket.tokens:
+                            break
+                        wait = (ticket.tokens - self._tokens) / self.tokens_per_second
+                    
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise SchedulerTimeout(f"LLM request queued for more than {timeout:.1f}s")
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self._condition.wait(wait)
+            except BaseException:
+                self._queues[priority][ticket.user].remove(ticket)
+                if not self._queues[priority][ticket.user]:
+                    del self._queues[priority][ticket.user]
+                self._condition.notify_all()
+                raise
+            
+            self._dequeue(ticket)
+            self._in_flight += 1
+            if self.tokens_per_second:
+                self._tokens -= ticket.tokens
+            # The next ticket in line may be admissible now as well
+            self._condition.notify_all()
+        return time.monotonic() - ticket.enqueued_at
+    
+    def release(self):
+        """Return a concurrency slot taken by acquire()"""
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
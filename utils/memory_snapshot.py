@@ -0,0 +1,70 @@
+"""
+Memory Snapshot
+Saves ingest results to disk with the manifest of documents they were built from
+"""
+
+import os
+import json
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+
+def document_manifest(directory: str, extensions: Iterable[str]) -> Dict[str, List[int]]:
+    """Size and modification time (ns) of every supported document in a directory"""
+    directory = Path(directory)
+    if not directory.exists():
+        return {}
+    extensions = {extension.lower() for extension in extensions}
+    manifest = {}
+    for path in directory.iterdir():
+        if path.is_file() and path.suffix.lower() in extensions:
+            stat = path.stat()
+            manifest[path.name] = [stat.st_size, stat.st_mtime_ns]
+    return manifest
+
+
+def save_snapshot(path: str, state: Dict, manifest: Dict[str, List[int]]):
+    """Write a snapshot atomically (readers never see a partial file)"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'version': SNAPSHOT_VERSION,
+            'created': datetime.now().isoformat(),
+            'manifest': manifest,
+            'state': state
+        }, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(path: str, manifest: Dict[str, List[int]]) -> Optional[Dict]:
+    """
+    Load a snapshot's state if it was built from exactly these documents
+    
+    Returns:
+        The saved state, or None when the snapshot is missing, unreadable,
+        from another format version, or the documents have changed
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning("Ignoring unreadable memory snapshot %s: %s", path, e)
+        return None
+    
+    if snapshot.get('version') != SNAPSHOT_VERSION:
+        logger.info("Ignoring memory snapshot %s from format version %s", path, snapshot.get('version'))
+        return None
+    if snapshot.get('manifest') != manifest:
+        logger.info("Documents changed since memory snapshot %s; re-ingest needed", path)
+        return None
+    return snapshot['state']
@@ -0,0 +1,228 @@
+"""
+Metrics
+In-process counters, gauges and histograms, persisted to a small SQLite time series
+    
+    metrics = get_metrics()
+    metrics.counter("search.queries").inc()
+    with metrics.timer("search.latency_ms"):
+        ...
+    metrics.gauge("index.size").set(collection.count())
+
+Snapshots are appended to METRICS_DB (default outputs/metrics.db) at most
+every METRICS_FLUSH_SECONDS, so the dashboard can plot values over time.
+Set METRICS_DB to an empty string to keep metrics in memory only.
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+PERCENTILES = (50, 95, 99)
+
+
+class Counter:
+    """Monotonically increasing count"""
+    
+    kind = 'counter'
+    
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+    
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+    
+    def snapshot(self) -> Dict:
+        return {'value': self.value}
+
+
+class Gauge:
+    """Value that can go up and down (last write wins)"""
+    
+    kind = 'gauge'
+    
+    def __init__(self):
+        self.value = 0.0
+    
+    def set(self, value: float):
+        self.value = float(value)
+    
+    def snapshot(self) -> Dict:
+        return {'value': self.value}
+
+
+class Histogram:
+    """Distribution of observations; percentiles are over the most recent window"""
+    
+    kind = 'histogram'
+    
+    def __init__(self, window: int = 2048):
+        self.count = 0
+        self.total = 0.0
+        self._values = deque(maxlen=window)
+        self._lock = threading.Lock()
+    
+    def observe(self, value: float):
+        with self._lock:
+            self.count += 1
+            self.total += value
+            self._values.append(value)
+    
+    def percentiles(self) -> Dict[str, float]:
+        with self._lock:
+            values = np.fromiter(self._values, dtype=np.float64, count=len(self._values))
+        if not len(values):
+            return {f"p{p}": 0.0 for p in PERCENTILES}
+        return dict(zip((f"p{p}" for p in PERCENTILES), np.percentile(values, PERCENTILES).tolist()))
+    
+    def snapshot(self) -> Dict:
+        return {'count': self.count, 'mean': self.total / self.count if self.count else 0.0, **self.percentiles()}
+
+
+class MetricsRegistry:
+    """Named metrics plus periodic persistence to SQLite"""
+    
+    def __init__(self, db_path: Optional[str] = None, flush_seconds: float = 60.0, retention_days: float = 30.0):
+        """
+        Initialize registry
+        
+        Args:
+            db_path: SQLite file for the time series (None keeps metrics in memory)
+            flush_seconds: Minimum interval between persisted snapshots
+            retention_days: Samples older than this are deleted on flush
+        """
+        self.db_path = db_path
+        self.flush_seconds = flush_seconds
+        self.retention_days = retention_days
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.time()
+        
+        if self.db_path:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with self._connect() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS samples ("
+                    "ts REAL NOT NULL, name TEXT NOT NULL, field TEXT NOT NULL, value REAL NOT NULL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_samples_name_ts ON samples (name, field, ts)")
+    
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=5)
+    
+    def _get(self, name: str, cls):
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.setdefault(name, cls())
+        self.maybe_flush()
+        return metric
+    
+    def counter(self, name: str) -> Counter:
+        return self._get(name, Counter)
+    
+    def gauge(self, name: str) -> Gauge:
+        return self._get(name, Gauge)
+    
+    def histogram(self, name: str) -> Histogram:
+        return self._get(name, Histogram)
+    
+    @contextmanager
+    def timer(self, name: str):
+        """Observe the duration of the block in milliseconds"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.histogram(name).observe((time.perf_counter() - start) * 1000)
+    
+    def snapshot(self) -> Dict[str, Dict]:
+        """Current value of every metric"""
+        return {name: {'kind': metric.kind, **metric.snapshot()} for name, metric in list(self._metrics.items())}
+    
+    def maybe_flush(self):
+        """Flush if METRICS_FLUSH_SECONDS have passed since the last flush"""
+        if self.db_path and time.time() - self._last_flush >= self.flush_seconds:
+            self.flush()
+    
+    def flush(self):
+        """Append a snapshot of every metric to the time series"""
+        if not self.db_path:
+            return
+        now = time.time()
+        self._last_flush = now
+        rows = [
+            (now, name, field, float(value))
+            for name, values in self.snapshot().items()
+            for field, value in values.items()
+            if field != 'kind'
+        ]
+        try:
+            with self._connect() as conn:
+                conn.executemany("INSERT INTO samples (ts, name, field, value) VALUES (?, ?, ?, ?)", rows)
+                conn.execute("DELETE FROM samples WHERE ts < ?", (now - self.retention_days * 86400,))
+        except sqlite3.Error as e:
+            logger.warning("Failed to persist metrics: %s", e)
+    
+    def history(self, name: str, field: str = 'value', since: Optional[float] = None) -> List[Tuple[float, float]]:
+        """
+        Persisted samples of one metric field
+        
+        Args:
+            name: Metric name
+            field: 'value' for counters/gauges; 'p50', 'p95', 'p99', 'count' or 'mean' for histograms
+            since: Only samples at or after this Unix timestamp
+        
+        Returns:
+            List of (timestamp, value) tuples, oldest first
+        """
+        if not self.db_path:
+            return []
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT ts, value FROM samples WHERE name = ? AND field = ? AND ts >= ? ORDER BY ts",
+                (name, field, since or 0)
+            ).fetchall()
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_metrics() -> MetricsRegistry:
+    """Process-wide metrics registry (configured by METRICS_DB and METRICS_FLUSH_SECONDS)"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = MetricsRegistry(
+                    db_path=os.getenv("METRICS_DB", "outputs/metrics.db") or None,
+                    flush_seconds=float(os.getenv("METRICS_FLUSH_SECONDS", "60"))
+                )
+    return _registry
+
+
+@contextmanager
+def track_llm_call():
+    """Count an LLM call, its latency and whether it raised"""
+    metrics = get_metrics()
+    metrics.counter("llm.calls").inc()
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        metrics.counter("llm.errors").inc()
+        raise
+    finally:
+        metrics.histogram("llm.latency_ms").observe((time.perf_counter() - start) * 1000)
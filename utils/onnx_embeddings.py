@@ -0,0 +1,188 @@
+"""
+ONNX Runtime Embeddings
+CPU embedding backend running all-MiniLM-L6-v2 exported to ONNX, optionally int8-quantized
+"""
+
+import os
+import logging
+from pathlib import Path
+from typing import List, Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class OnnxEmbeddingModel:
+    """
+    Sentence embeddings through onnxruntime without importing torch
+    
+    Reproduces the SentenceTransformer pipeline for MiniLM-style models:
+    tokenize, run the transformer, mean-pool over the attention mask and
+    L2-normalize. Texts are sorted by token length and padded per batch,
+    so short chunks are not padded to the length of the longest one.
+    """
+    
+    def __init__(
+        self,
+        model_name: str = "all-MiniLM-L6-v2",
+        model_dir: Optional[str] = None,
+        quantize: bool = False,
+        num_threads: Optional[int] = None,
+        batch_size: int = 32,
+        max_length: int = 256
+    ):
+        """
+        Initialize ONNX embedding model
+        
+        Args:
+            model_name: Sentence transformer model name
+            model_dir: Directory holding model.onnx and tokenizer.json
+                       (default: ./onnx_models/<model_name>); exported on first use if missing
+            quantize: Use a dynamically int8-quantized copy of the model
+            num_threads: Intra-op thread count for onnxruntime (default: library choice)
+            batch_size: Texts per inference batch
+            max_length: Maximum tokens per text (MiniLM was trained with 256)
+        """
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+        
+        self.model_name = model_name
+        self.model_dir = Path(model_dir or Path("onnx_models") / model_name)
+        self.batch_size = batch_size
+        self.max_length = max_length
+        
+        if not (self.model_dir / "model.onnx").exists():
+            export_model(model_name, str(self.model_dir))
+        
+        self.model_path = self.model_dir / "model.onnx"
+        if quantize:
+            quantized_path = self.model_dir / "model_quantized.onnx"
+            if not quantized_path.exists():
+                quantize_model(str(self.model_path), str(quantized_path))
+            self.model_path = quantized_path
+        
+        self.tokenizer = Tokenizer.from_file(str(self.model_dir / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.no_padding()
+        
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+            options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(
+            str(self.model_path),
+            sess_options=options,
+            providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+    
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts
+        
+        Args:
+            texts: List of strings to embed
+        
+        Returns:
+            float32 array of shape (len(texts), dim) with unit-length rows,
+            in the same order as texts
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        
+        encodings = self.tokenizer.encode_batch(list(texts))
+        order = np.argsort([len(encoding.ids) for encoding in encodings], kind="stable")
+        
+        results = [None] * len(texts)
+        for batch_start in range(0, len(order), self.batch_size):
+            batch_indices = order[batch_start:batch_start + self.batch_size]
+            batch = [encodings[i] for i in batch_indices]
+            for i, vector in zip(batch_indices, self._encode_batch(batch)):
+                results[i] = vector
+        
+        return np.vstack(results)
+    
+    def _encode_batch(self, batch) -> np.ndarray:
+        """Run one batch padded to its own longest sequence"""
+        seq_len = max(len(encoding.ids) for encoding in batch)
+        input_ids = np.zeros((len(batch), seq_len), dtype=np.int64)
+        attention_mask = np.zeros((len(batch), seq_len), dtype=np.int64)
+        token_type_ids = np.zeros((len(batch), seq_len), dtype=np.int64)
+        
+        for row, encoding in enumerate(batch):
+            length = len(encoding.ids)
+            input_ids[row, :length] = encoding.ids
+            attention_mask[row, :length] = encoding.attention_mask
+            token_type_ids[row, :length] = encoding.type_ids
+        
+        feeds = {
+            'input_ids': input_ids,
+            'attention_mask': attention_mask,
+            'token_type_ids': token_type_ids
+        }
+        feeds = {name: value for name, value in feeds.items() if name in self.input_names}
+        token_embeddings = self.session.run(None, feeds)[0]
+        
+        # Mean pooling over real tokens, then L2 normalization (as in SentenceTransformer)
+        mask = attention_mask[:, :, None].astype(np.float32)
+        summed = (token_embeddings * mask).sum(axis=1)
+        pooled = summed / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.clip(norms, 1e-12, None)).astype(np.float32)
+
+
+def export_model(model_name: str, model_dir: str):
+    """
+    Export a sentence-transformers model to ONNX (one-off; needs optimum + torch)
+    
+    Args:
+        model_name: Sentence transformer model name
+        model_dir: Output directory for model.onnx and tokenizer.json
+    """
+    try:
+        from optimum.onnxruntime import ORTModelForFeatureExtraction
+        from transformers import AutoTokenizer
+    except ImportError as e:
+        raise RuntimeError(
+            f"ONNX model not found in {model_dir} and optimum is not installed to export it. "
+            f"Install with: pip install optimum[onnxruntime], or copy an exported model.onnx "
+            f"and tokenizer.json into ONNX_MODEL_DIR."
+        ) from e
+    
+    repo_id = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+    logger.info("Exporting %s to ONNX in %s", repo_id, model_dir)
+    os.makedirs(model_dir, exist_ok=True)
+    model = ORTModelForFeatureExtraction.from_pretrained(repo_id, export=True)
+    model.save_pretrained(model_dir)
+    AutoTokenizer.from_pretrained(repo_id).save_pretrained(model_dir)
+
+
+def quantize_model(model_path: str, quantized_path: str):
+    """
+    Apply dynamic int8 quantization to an ONNX model
+    
+    Args:
+        model_path: Source model.onnx
+        quantized_path: Destination for the quantized model
+    """
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    
+    logger.info("Quantizing %s to int8", model_path)
+    quantize_dynamic(model_path, quantized_path, weight_type=QuantType.QInt8)
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Export an embedding model to ONNX")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--output", default=None, help="Output directory (default: onnx_models/<model>)")
+    parser.add_argument("--quantize", action="store_true", help="Also write an int8-quantized copy")
+    args = parser.parse_args()
+    
+    output_dir = args.output or str(Path("onnx_models") / args.model)
+    export_model(args.model, output_dir)
+    if args.quantize:
+        quantize_model(str(Path(output_dir) / "model.onnx"), str(Path(output_dir) / "model_quantized.onnx"))
+    print(f"Exported {args.model} to {output_dir}")
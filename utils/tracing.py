@@ -0,0 +1,191 @@
+"""
+Tracing
+Lightweight nested spans with attributes, exported to a local JSONL file
+
+Spans follow the current request through contextvars, so nested calls
+(controller → agent → vector store → LLM) form one trace. Tracing is off
+unless TRACE_FILE is set (or configure_tracing() is called); while off,
+span() returns a shared no-op span and traced() calls straight through.
+    
+    with get_tracer().span("rag.retrieve", n_results=5) as span:
+        chunks = vector_store.search(question)
+        span.set_attribute("chunks", len(chunks))
+
+Each finished span is written as one JSON line shaped like an OTLP span
+(traceId, spanId, parentSpanId, name, start/end nanoseconds, attributes, status).
+"""
+
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+import functools
+from contextvars import ContextVar
+from typing import Dict, Optional, Callable
+
+logger = logging.getLogger(__name__)
+
+# Rough characters-per-token ratio for prompt size attributes
+CHARS_PER_TOKEN = 4
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class _NoopSpan:
+    """Span stand-in used while tracing is disabled"""
+    
+    def set_attribute(self, key: str, value):
+        pass
+    
+    def set_attributes(self, **attributes):
+        pass
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    """A timed operation with attributes, nested under the current span"""
+    
+    def __init__(self, tracer: "Tracer", name: str, attributes: Dict):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = dict(attributes)
+        self.parent = _current_span.get()
+        self.trace_id = self.parent.trace_id if self.parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.start_ns = None
+        self.end_ns = None
+        self.error = None
+        self._token = None
+    
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+    
+    def set_attributes(self, **attributes):
+        self.attributes.update(attributes)
+    
+    def __enter__(self):
+        self.start_ns = time.time_ns()
+        self._token = _current_span.set(self)
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.end_ns = time.time_ns()
+        _current_span.reset(self._token)
+        if exc is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        self.tracer.export(self)
+        return False
+    
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+    
+    def to_dict(self) -> Dict:
+        return {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'parentSpanId': self.parent.span_id if self.parent else None,
+            'name': self.name,
+            'startTimeUnixNano': self.start_ns,
+            'endTimeUnixNano': self.end_ns,
+            'durationMs': round(self.duration_ms, 3),
+            'attributes': self.attributes,
+            'status': {'code': 'ERROR', 'message': self.error} if self.error else {'code': 'OK'}
+        }
+
+
+class JsonlSpanExporter:
+    """Appends finished spans to a JSONL file (one span per line)"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+    
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+
+
+class Tracer:
+    """Creates spans and hands finished ones to an exporter"""
+    
+    def __init__(self, exporter=None):
+        self.exporter = exporter
+    
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+    
+    def span(self, name: str, **attributes):
+        """Start a span (use as a context manager)"""
+        if self.exporter is None:
+            return NOOP_SPAN
+        return Span(self, name, attributes)
+    
+    def export(self, span: Span):
+        try:
+            self.exporter.export(span)
+        except Exception as e:
+            logger.warning("Failed to export span %s: %s", span.name, e)
+
+
+_tracer = Tracer(JsonlSpanExporter(os.environ["TRACE_FILE"]) if os.getenv("TRACE_FILE") else None)
+
+
+def get_tracer() -> Tracer:
+    """Process-wide tracer (enabled by the TRACE_FILE env var)"""
+    return _tracer
+
+
+def configure_tracing(path: Optional[str] = None, exporter=None):
+    """Enable tracing to a JSONL file or custom exporter, or disable it (no arguments)"""
+    _tracer.exporter = exporter or (JsonlSpanExporter(path) if path else None)
+
+
+def current_span():
+    """The active span, or the no-op span if there is none"""
+    return _current_span.get() or NOOP_SPAN
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """Decorator running the function inside a span named after it"""
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+        
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _tracer.exporter is None:
+                return func(*args, **kwargs)
+            with _tracer.span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def set_llm_usage(span, messages, response):
+    """Record prompt/completion token counts (reported usage if available, else estimated)"""
+    if span is NOOP_SPAN:
+        return
+    usage = getattr(response, 'usage_metadata', None) or {}
+    prompt_chars = sum(len(str(getattr(m, 'content', m))) for m in messages)
+    completion_chars = len(str(getattr(response, 'content', '')))
+    span.set_attributes(
+        prompt_tokens=usage.get('input_tokens', prompt_chars // CHARS_PER_TOKEN),
+        completion_tokens=usage.get('output_tokens', completion_chars // CHARS_PER_TOKEN),
+        usage_reported=bool(usage)
+    )
@@ -5,7 +5,9 @@ Handles embedding generation and vector database operations
 
 # CRITICAL: Set environment variables BEFORE any torch-related imports
 import os
+import time
 import logging
+import threading
 
 # Prevent torch from attempting to use CUDA/MPS when not available
 os.environ.setdefault("CUDA_VISIBLE_DEVICES", "")
@@ -16,24 +18,36 @@ os.environ.setdefault("PYTORCH_ENABLE_MPS_FALLBACK", "0")
 
 logger = logging.getLogger(__name__)
 
-# Import torch FIRST and force CPU mode
-import torch
-# Force CPU mode - compatible with all torch versions
-if hasattr(torch, 'cuda'):
-    # Monkey patch to always return False for CUDA availability
-    original_is_available = torch.cuda.is_available
-    torch.cuda.is_available = lambda: False
-    # Also disable CUDA device count
-    if hasattr(torch.cuda, 'device_count'):
-        original_device_count = torch.cuda.device_count
-        torch.cuda.device_count = lambda: 0
+
+def _load_torch():
+    """
+    Import torch and force CPU mode
+    
+    Deferred until the local SentenceTransformer backend is actually used, so the
+    ONNX and API backends start without paying for the torch import.
+    """
+    import torch
+    # Force CPU mode - compatible with all torch versions
+    if hasattr(torch, 'cuda'):
+        # Monkey patch to always return False for CUDA availability
+        torch.cuda.is_available = lambda: False
+        # Also disable CUDA device count
+        if hasattr(torch.cuda, 'device_count'):
+            torch.cuda.device_count = lambda: 0
+    return torch
+
 
 import chromadb
 from chromadb.config import Settings
-from typing import List, Dict, Optional, Union
+from typing import List, Dict, Optional, Union, Tuple
 from pathlib import Path
-import hashlib
 import numpy as np
+from utils.chunking import chunk_id
+from utils.tracing import get_tracer, traced, current_span
+from utils.metrics import get_metrics
+
+# Chroma's value for each HNSW setting a collection's metadata leaves out
+CHROMA_HNSW_DEFAULTS = {"hnsw:space": "l2", "hnsw:M": 16, "hnsw:construction_ef": 100, "hnsw:search_ef": 10}
 
 
 class VectorStore:
@@ -42,7 +56,9 @@ class VectorStore:
     
     Robust initialization:
     - Prefers local SentenceTransformer on CPU
+    - Optional ONNX Runtime backend (EMBEDDING_BACKEND=onnx) for CPU-only nodes
     - Falls back to API-based embeddings (OpenAI/Gemini) if local model fails
+    - Falls back to torch-free hashing TF-IDF embeddings if no API is usable
     - Configurable via EMBEDDING_BACKEND environment variable
     """
     
@@ -50,7 +66,8 @@ class VectorStore:
         self, 
         persist_directory: str = "./vector_db", 
         model_name: str = "all-MiniLM-L6-v2",
-        embedding_backend: Optional[str] = None
+        embedding_backend: Optional[str] = None,
+        hnsw_params: Optional[Dict] = None
     ):
         """
         Initialize vector store with robust embedding backend
@@ -58,16 +75,27 @@ class VectorStore:
         Args:
             persist_directory: Directory to persist ChromaDB data
             model_name: Sentence transformer model name (for local backend)
-            embedding_backend: Backend type ('local', 'api', or 'auto'). 
+            embedding_backend: Backend type ('local', 'onnx', 'api', 'hashing', or 'auto'). 
                               Can be overridden by EMBEDDING_BACKEND env var.
+            hnsw_params: HNSW settings: 'M' and 'construction_ef' (fixed when the
+                         collection is built) and 'search_ef' (query-time).
+                         Defaults come from HNSW_M, HNSW_CONSTRUCTION_EF and
+                         HNSW_SEARCH_EF env vars, else Chroma's own defaults.
         """
         self.persist_directory = persist_directory
         self.model_name = model_name
+        self.collection_metadata = self._hnsw_metadata(hnsw_params)
         
         # Allow override by env/config
         self.embedding_backend = embedding_backend or os.getenv("EMBEDDING_BACKEND", "auto").lower()
         self.embedding_model = None
         
+        # Bulk ingests at or above this many chunks are embedded by a worker pool
+        self.bulk_embed_threshold = int(os.getenv("BULK_EMBED_THRESHOLD", "256"))
+        self.embed_workers = int(os.getenv("EMBED_WORKERS", "0")) or max(1, (os.cpu_count() or 2) - 1)
+        self._embedding_pool = None
+        self._fit_lock = threading.Lock()
+        
         # If explicitly set to 'api', skip local model
         if self.embedding_backend == "api":
             logger.info("Embedding backend forced to 'api' - skipping SentenceTransformer init")
@@ -75,9 +103,26 @@ class VectorStore:
             self._init_chromadb()
             return
         
+        # If explicitly set to 'hashing', use the numpy-only embedder (no model to load)
+        if self.embedding_backend == "hashing":
+            self._init_hashing_backend()
+            self._init_chromadb()
+            return
+        
+        # If explicitly set to 'onnx', use ONNX Runtime and skip torch entirely
+        if self.embedding_backend == "onnx":
+            try:
+                self._init_onnx_backend()
+                self._init_chromadb()
+                return
+            except Exception as e:
+                logger.exception("Error initializing ONNX embedding backend: %s", e)
+                logger.warning("Falling back to local SentenceTransformer backend.")
+        
         # Try to initialize local SentenceTransformer on CPU
         try:
             # Import locally here after setting env vars to avoid device auto-selection issues
+            torch = _load_torch()
             from sentence_transformers import SentenceTransformer
             
             device = torch.device("cpu")
@@ -147,24 +192,28 @@ class VectorStore:
                     except (NotImplementedError, Exception) as e3:
                         logger.exception("All local initialization strategies failed. Last error: %s", e3)
                         raise
-                        
+        
         except NotImplementedError as nie:
             logger.exception("NotImplementedError initializing SentenceTransformer: %s", nie)
             logger.warning("Falling back to API-based embeddings backend.")
-            self._init_api_backend()
+            self._init_api_backend(allow_hashing_fallback=True)
         except Exception as e:
             # Catch any other initialization errors (torch device, import errors, resource issues)
             logger.exception("Error initializing SentenceTransformer: %s", e)
             logger.warning("Falling back to API-based embeddings backend.")
-            self._init_api_backend()
+            self._init_api_backend(allow_hashing_fallback=True)
         
         # Initialize ChromaDB
         self._init_chromadb()
     
-    def _init_api_backend(self):
+    def _init_api_backend(self, allow_hashing_fallback: bool = False):
         """
         Initialize an API-based embeddings backend (OpenAI / Gemini / configured provider).
         This method sets attributes so the rest of the app can call embed_text().
+        
+        Args:
+            allow_hashing_fallback: Use the hashing backend instead if no API
+                                    provider is usable (auto mode)
         """
         try:
             # Try to import the API embeddings wrapper
@@ -182,6 +231,48 @@ class VectorStore:
             logger.exception("Failed to initialize API embedding wrapper: %s", e)
             self.embedding_model = None
             self.embedding_backend = "api_unavailable"
+        
+        usable = self.embedding_model is not None and self.embedding_model.is_available
+        if allow_hashing_fallback and not usable:
+            logger.warning("No usable embeddings API. Falling back to hashing embeddings backend.")
+            self._init_hashing_backend()
+    
+    def _init_hashing_backend(self):
+        """
+        Initialize the numpy-only hashing TF-IDF embedding backend.
+        Configured via HASHING_DIM; fitted document frequencies persist in persist_directory.
+        """
+        from utils.hashing_embeddings import HashingEmbeddingModel
+        
+        self.embedding_model = HashingEmbeddingModel(
+            dim=int(os.getenv("HASHING_DIM", "1024")),
+            state_path=os.path.join(self.persist_directory, "hashing_embedder.npz")
+        )
+        self.embedding_backend = "hashing"
+        logger.info("Using hashing embeddings backend (dim=%d, fitted=%s)", self.embedding_model.dim, self.embedding_model.fitted)
+    
+    def _init_onnx_backend(self):
+        """
+        Initialize the ONNX Runtime embedding backend (optionally int8-quantized).
+        Configured via ONNX_MODEL_DIR, ONNX_QUANTIZE and ONNX_NUM_THREADS env vars.
+        """
+        from utils.onnx_embeddings import OnnxEmbeddingModel
+        
+        num_threads = os.getenv("ONNX_NUM_THREADS")
+        self.embedding_model = OnnxEmbeddingModel(
+            model_name=self.model_name,
+            num_threads=int(num_threads) if num_threads else None,
+            **self._onnx_options()
+        )
+        self.embedding_backend = "onnx"
+        logger.info("Using ONNX Runtime embeddings backend: %s", self.embedding_model.model_path)
+    
+    def _onnx_options(self) -> Dict:
+        """ONNX model location and quantization settings from env vars"""
+        return {
+            'model_dir': os.getenv("ONNX_MODEL_DIR"),
+            'quantize': os.getenv("ONNX_QUANTIZE", "0").lower() in ("1", "true", "yes")
+        }
     
     def _init_chromadb(self):
         """Initialize ChromaDB client and collection"""
@@ -192,11 +283,68 @@ class VectorStore:
         )
         
         # Get or create collection
-        self.collection = self.client.get_or_create_collection(
+        self.collection = self._get_or_create_collection()
+    
+    def _hnsw_metadata(self, hnsw_params: Optional[Dict] = None) -> Dict:
+        """Collection metadata with the HNSW settings from arguments or env vars"""
+        hnsw_params = hnsw_params or {}
+        metadata = {"hnsw:space": "cosine"}
+        for key, env_var in (("M", "HNSW_M"), ("construction_ef", "HNSW_CONSTRUCTION_EF"), ("search_ef", "HNSW_SEARCH_EF")):
+            value = hnsw_params.get(key) or os.getenv(env_var)
+            if value:
+                metadata[f"hnsw:{key}"] = int(value)
+        return metadata
+    
+    def _get_or_create_collection(self):
+        """Open the collection, creating it with the configured HNSW settings"""
+        collection = self.client.get_or_create_collection(
             name="campus_compass",
-            metadata={"hnsw:space": "cosine"}
+            metadata=self.collection_metadata
         )
+        
+        # Settings an existing collection's metadata leaves out are Chroma's defaults
+        stored = collection.metadata or {}
+        mismatched = {
+            key: stored.get(key, CHROMA_HNSW_DEFAULTS.get(key))
+            for key, value in self.collection_metadata.items()
+            if stored.get(key, CHROMA_HNSW_DEFAULTS.get(key)) != value
+        }
+        
+        # search_ef only affects queries, so it can be changed in place
+        if "hnsw:search_ef" in mismatched:
+            if self._apply_search_ef(collection, self.collection_metadata["hnsw:search_ef"]):
+                del mismatched["hnsw:search_ef"]
+        
+        # space, M and construction_ef are fixed when the index is built
+        if mismatched:
+            logger.warning(
+                "Existing collection was created with %s; clear it to apply %s",
+                mismatched, self.collection_metadata
+            )
+        return collection
     
+    def set_search_ef(self, search_ef: int) -> bool:
+        """
+        Change the query-time HNSW search_ef of the open collection
+        
+        Returns False if the installed chromadb cannot change it in place
+        (before 0.6 it is only read when the collection is created).
+        """
+        if not self._apply_search_ef(self.collection, search_ef):
+            return False
+        self.collection_metadata["hnsw:search_ef"] = int(search_ef)
+        return True
+    
+    @staticmethod
+    def _apply_search_ef(collection, search_ef: int) -> bool:
+        try:
+            collection.modify(configuration={"hnsw": {"ef_search": int(search_ef)}})
+        except (TypeError, ValueError) as e:
+            logger.debug("Cannot change search_ef of an existing collection: %s", e)
+            return False
+        return True
+    
+    @traced("vector_store.embed_text")
     def embed_text(self, texts: Union[str, List[str]]) -> List[List[float]]:
         """
         Unified embedding function used by the rest of the code.
@@ -204,10 +352,11 @@ class VectorStore:
         
         Args:
             texts: Single string or list of strings to embed
-            
+        
         Returns:
             List of embedding vectors (lists of floats)
         """
+        current_span().set_attributes(backend=self.embedding_backend, texts=1 if isinstance(texts, str) else len(texts))
         if self.embedding_backend == "local" and self.embedding_model is not None:
             # Normalize input to list
             if isinstance(texts, str):
@@ -218,6 +367,10 @@ class VectorStore:
             if isinstance(embeddings, np.ndarray):
                 return embeddings.tolist()
             return embeddings
+        elif self.embedding_backend in ("onnx", "hashing") and self.embedding_model is not None:
+            if isinstance(texts, str):
+                texts = [texts]
+            return self.embedding_model.encode(texts).tolist()
         elif self.embedding_backend.startswith("api"):
             # Use API wrapper
             if self.embedding_model is None:
@@ -229,43 +382,249 @@ class VectorStore:
         else:
             raise RuntimeError(
                 f"No valid embedding backend available. Backend: {self.embedding_backend}. "
-                f"Set EMBEDDING_BACKEND=local or EMBEDDING_BACKEND=api"
+                "Set EMBEDDING_BACKEND=local, onnx, api or hashing"
             )
     
+    def _embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed document texts, using the multi-process pool for large local batches
+        
+        Falls back to in-process embed_text() if the pool cannot be used.
+        """
+        use_pool = (
+            self.embedding_backend in ("local", "onnx")
+            and len(texts) >= self.bulk_embed_threshold
+            and self.embed_workers > 1
+        )
+        if use_pool:
+            try:
+                if self._embedding_pool is None:
+                    from utils.embedding_pool import EmbeddingPool
+                    self._embedding_pool = EmbeddingPool(
+                        backend=self.embedding_backend,
+                        model_name=self.model_name,
+                        num_workers=self.embed_workers,
+                        onnx_options=self._onnx_options() if self.embedding_backend == "onnx" else None
+                    )
+                return self._embedding_pool.encode(texts).tolist()
+            except Exception as e:
+                logger.exception("Embedding pool failed, embedding in-process instead: %s", e)
+                self.close()
+        return self.embed_text(texts)
+    
+    def close(self):
+        """Shut down the bulk embedding worker pool, if started"""
+        if self._embedding_pool is not None:
+            self._embedding_pool.close()
+            self._embedding_pool = None
+    
     def _generate_id(self, text: str, metadata: Dict) -> str:
-        """Generate unique ID for a chunk"""
-        content = f"{text}_{metadata.get('source', '')}_{metadata.get('chunk_index', 0)}"
-        return hashlib.md5(content.encode()).hexdigest()
+        """Generate content-addressed ID for a chunk (independent of chunk position)"""
+        return metadata.get('chunk_id') or chunk_id(text, metadata.get('source', ''))
+    
+    def _prepare_chunks(self, chunks: List[Dict]) -> Dict[str, Dict]:
+        """Map chunk IDs to chunks, keeping the first occurrence of repeated content"""
+        prepared = {}
+        for chunk in chunks:
+            doc_id = self._generate_id(chunk['text'], chunk['metadata'])
+            if doc_id not in prepared:
+                prepared[doc_id] = chunk
+        return prepared
     
-    def add_documents(self, chunks: List[Dict]):
+    def _get_existing_ids(self, ids: List[str]) -> set:
+        """Return the subset of ids already stored in the collection"""
+        if not ids:
+            return set()
+        existing = self.collection.get(ids=ids, include=[])
+        return set(existing.get('ids', []))
+    
+    def add_documents(self, chunks: List[Dict]) -> Dict:
         """
         Add document chunks to vector store
         
+        Chunks whose content-addressed ID is already stored are not re-embedded;
+        only their metadata (chunk_index, topic, ...) is refreshed.
+        
         Args:
             chunks: List of dicts with 'text' and 'metadata' keys
+        
+        Returns:
+            Dict with 'added' and 'reused' chunk counts
         """
         if not chunks:
-            return
+            return {'added': 0, 'reused': 0}
+        
+        return self.write_batch(self.embed_batch(chunks))
+    
+    @property
+    def needs_fit(self) -> bool:
+        """True if the embedding backend still has to learn corpus statistics (unfitted hashing)"""
+        return self.embedding_backend == "hashing" and not self.embedding_model.fitted
+    
+    def fit_embeddings(self, texts: List[str]):
+        """
+        Learn the hashing backend's IDF weights, once
         
-        texts = [chunk['text'] for chunk in chunks]
-        metadatas = [chunk['metadata'] for chunk in chunks]
-        ids = [self._generate_id(chunk['text'], chunk['metadata']) for chunk in chunks]
+        The weights are kept fixed afterwards so vectors already stored stay
+        comparable with new ones. Safe to call from several embed workers: only
+        the first call fits and saves; later calls (and other backends) are no-ops.
+        """
+        with self._fit_lock:
+            if not self.needs_fit or not texts:
+                return
+            self.embedding_model.fit(texts)
+            self.embedding_model.save()
+    
+    @traced("vector_store.embed_batch")
+    def embed_batch(self, chunks: List[Dict]) -> Dict:
+        """
+        Embed the chunks of a batch that are not stored yet (first half of add_documents)
         
-        # Generate embeddings using unified interface
-        logger.info(f"Generating embeddings for {len(texts)} chunks using backend: {self.embedding_backend}")
-        embeddings = self.embed_text(texts)
+        Args:
+            chunks: List of dicts with 'text' and 'metadata' keys
         
-        # Add to ChromaDB
-        self.collection.add(
-            embeddings=embeddings,
-            documents=texts,
-            metadatas=metadatas,
-            ids=ids
-        )
+        Returns:
+            Batch dict to pass to write_batch()
+        """
+        prepared = self._prepare_chunks(chunks)
+        existing_ids = self._get_existing_ids(list(prepared.keys()))
+        
+        batch = {
+            'prepared': prepared,
+            'reused_ids': [doc_id for doc_id in prepared if doc_id in existing_ids],
+            'new_ids': [doc_id for doc_id in prepared if doc_id not in existing_ids],
+            'embeddings': []
+        }
+        current_span().set_attributes(chunks=len(prepared), new=len(batch['new_ids']), cache_hits=len(batch['reused_ids']))
+        get_metrics().counter("embedding.cache_hits").inc(len(batch['reused_ids']))
+        get_metrics().counter("embedding.cache_misses").inc(len(batch['new_ids']))
+        
+        if batch['new_ids']:
+            texts = [prepared[doc_id]['text'] for doc_id in batch['new_ids']]
+            
+            # Callers that can see the whole corpus (IngestPipeline) fit first;
+            # otherwise the first batch embedded decides the IDF weights
+            self.fit_embeddings(texts)
+            
+            # Generate embeddings using unified interface
+            logger.info(f"Generating embeddings for {len(texts)} chunks using backend: {self.embedding_backend}")
+            batch['embeddings'] = self._embed_documents(texts)
+        
+        return batch
+    
+    @traced("vector_store.write_batch")
+    def write_batch(self, batch: Dict) -> Dict:
+        """
+        Store a batch from embed_batch() (second half of add_documents)
+        
+        Args:
+            batch: Batch dict returned by embed_batch()
+        
+        Returns:
+            Dict with 'added' and 'reused' chunk counts
+        """
+        prepared = batch['prepared']
+        reused_ids = batch['reused_ids']
+        new_ids = batch['new_ids']
+        
+        # Refresh metadata of unchanged chunks without re-embedding them
+        if reused_ids:
+            self.update_metadata([prepared[doc_id] for doc_id in reused_ids])
+        
+        if new_ids:
+            # Add to ChromaDB
+            self.collection.add(
+                embeddings=batch['embeddings'],
+                documents=[prepared[doc_id]['text'] for doc_id in new_ids],
+                metadatas=[prepared[doc_id]['metadata'] for doc_id in new_ids],
+                ids=new_ids
+            )
+        
+        logger.info(f"Added {len(new_ids)} chunks to vector store, reused {len(reused_ids)} unchanged chunks")
+        current_span().set_attributes(added=len(new_ids), reused=len(reused_ids))
+        get_metrics().gauge("index.size").set(self.collection.count())
+        return {'added': len(new_ids), 'reused': len(reused_ids)}
+    
+    def update_metadata(self, chunks: List[Dict]):
+        """
+        Overwrite the stored metadata of chunks that are already in the collection
+        
+        Args:
+            chunks: List of dicts with 'text' and 'metadata' keys
+        """
+        prepared = self._prepare_chunks(chunks)
+        if prepared:
+            self.collection.update(
+                ids=list(prepared.keys()),
+                metadatas=[chunk['metadata'] for chunk in prepared.values()]
+            )
+    
+    @traced("vector_store.remove_stale")
+    def remove_stale(self, keep_ids: set) -> int:
+        """
+        Delete every stored chunk whose ID is not in keep_ids
+        
+        Args:
+            keep_ids: IDs of chunks that are still current
+        
+        Returns:
+            Number of chunks removed
+        """
+        stored_ids = self.collection.get(include=[]).get('ids', [])
+        stale_ids = [doc_id for doc_id in stored_ids if doc_id not in keep_ids]
+        if stale_ids:
+            self.collection.delete(ids=stale_ids)
+            logger.info(f"Removed {len(stale_ids)} stale chunks from vector store")
+            get_metrics().gauge("index.size").set(self.collection.count())
+        return len(stale_ids)
+    
+    @traced("vector_store.sync_documents")
+    def sync_documents(self, chunks: List[Dict]) -> Dict:
+        """
+        Make the collection hold exactly the given chunks
+        
+        Unchanged chunks are reused, new or edited chunks are embedded, and
+        chunks that no longer exist in any document are removed.
+        
+        Args:
+            chunks: Complete list of current chunks
         
-        logger.info(f"Added {len(texts)} chunks to vector store")
+        Returns:
+            Dict with 'added', 'reused' and 'removed' chunk counts
+        """
+        stats = self.add_documents(chunks)
+        stats['removed'] = self.remove_stale(set(self._prepare_chunks(chunks).keys()))
+        return stats
+    
+    def get_stored_chunks(self) -> Tuple[List[Dict], np.ndarray]:
+        """
+        Read every stored chunk together with its embedding
+        
+        Returns:
+            Tuple of (chunks with 'id', 'text' and 'metadata' keys, embeddings array
+            of shape (len(chunks), dim))
+        """
+        stored = self.collection.get(include=["documents", "metadatas", "embeddings"])
+        chunks = [
+            {'id': doc_id, 'text': text, 'metadata': metadata or {}}
+            for doc_id, text, metadata in zip(stored['ids'], stored['documents'], stored['metadatas'])
+        ]
+        embeddings = stored.get('embeddings')
+        if embeddings is None or len(embeddings) == 0:
+            return chunks, np.zeros((0, 0), dtype=np.float32)
+        return chunks, np.asarray(embeddings, dtype=np.float32)
+    
+    def get_texts(self, ids: List[str], batch_size: int = 5000) -> List[Optional[str]]:
+        """Stored chunk texts for chunk IDs, in the same order (None where missing)"""
+        texts = {}
+        for start in range(0, len(ids), batch_size):
+            stored = self.collection.get(ids=ids[start:start + batch_size], include=["documents"])
+            texts.update(zip(stored['ids'], stored['documents']))
+        return [texts.get(doc_id) for doc_id in ids]
     
-    def search(self, query: str, n_results: int = 5, prioritize_source: Optional[str] = None) -> List[Dict]:
+    @traced("vector_store.search")
+    def search(self, query: str, n_results: int = 5, prioritize_source: Optional[str] = None,
+               query_embedding: Optional[List[float]] = None) -> List[Dict]:
         """
         Search for similar chunks
         
@@ -273,21 +632,26 @@ class VectorStore:
             query: Search query
             n_results: Number of results to return
             prioritize_source: If provided, prioritize chunks from this source (filename)
-            
+            query_embedding: Precomputed embedding of query (skips embedding it again)
+        
         Returns:
             List of dicts with 'text', 'metadata', and 'distance' keys
         """
+        start = time.perf_counter()
+        
         # Generate query embedding using unified interface
-        query_embeddings = self.embed_text([query])
-        query_embedding = query_embeddings[0]
+        if query_embedding is None:
+            query_embedding = self.embed_text([query])[0]
         
         # Search in ChromaDB - retrieve more results if we need to prioritize
         search_n = n_results * 2 if prioritize_source else n_results
         
-        results = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=search_n
-        )
+        with get_tracer().span("vector_store.query", n_results=search_n) as span:
+            results = self.collection.query(
+                query_embeddings=[query_embedding],
+                n_results=search_n
+            )
+            span.set_attribute("results", len(results['ids'][0]) if results.get('ids') else 0)
         
         # Format results
         formatted_results = []
@@ -315,16 +679,16 @@ class VectorStore:
             # Combine: prioritized chunks first, then others, limit to n_results
             formatted_results = (prioritized + others)[:n_results]
         
+        current_span().set_attributes(n_results=n_results, results=len(formatted_results))
+        get_metrics().counter("search.queries").inc()
+        get_metrics().histogram("search.latency_ms").observe((time.perf_counter() - start) * 1000)
         return formatted_results
     
     def clear_collection(self):
         """Clear all documents from the collection"""
         try:
             self.client.delete_collection(name="campus_compass")
-            self.collection = self.client.get_or_create_collection(
-                name="campus_compass",
-                metadata={"hnsw:space": "cosine"}
-            )
+            self.collection = self._get_or_create_collection()
             logger.info("Vector store cleared")
         except Exception as e:
             logger.error(f"Error clearing collection: {e}")
@@ -341,10 +705,7 @@ class VectorStore:
             logger.warning(f"Error getting collection count: {e}")
             # Try to recreate collection if it was deleted
             try:
-                self.collection = self.client.get_or_create_collection(
-                    name="campus_compass",
-                    metadata={"hnsw:space": "cosine"}
-                )
+                self.collection = self._get_or_create_collection()
                 return self.collection.count()
             except:
                 return 0